@@ -5,3 +5,6 @@ from django.apps import AppConfig
 
 class Common_libConfig(AppConfig):
     name = 'common_lib'
+
+    def ready(self):
+        from . import db  # noqa: F401 connects 'connection_created'
@@ -0,0 +1,144 @@
+"""
+Minimal ASGI plumbing for the project: Django 2.2 is WSGI only, so its
+application is run in a thread pool behind :class:'WsgiToAsgi', while
+long-lived responses like server-sent events are plain ASGI coroutines.
+"""
+
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qsl
+
+
+def header_value(scope, name):
+    """ Return the value of the request header 'name' (bytes) or "". """
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin1")
+    return ""
+
+
+def query_params(scope):
+    return dict(parse_qsl(scope["query_string"].decode("latin1")))
+
+
+def cookies(scope):
+    cookie = SimpleCookie()
+    cookie.load(header_value(scope, b"cookie"))
+    return {key: morsel.value for key, morsel in cookie.items()}
+
+
+def sse_message(event=None, data=None, comment=None):
+    """ Encode a server-sent events message. """
+    lines = []
+    if comment is not None:
+        lines.append(f": {comment}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    if data is not None:
+        lines.extend(f"data: {line}" for line in data.split("\n"))
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+async def wait_for_disconnect(receive):
+    """ Return when the client of an HTTP connection goes away. """
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def lifespan(receive, send):
+    """ Acknowledge startup and shutdown of the server. """
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def build_environ(scope, body):
+    """ Return WSGI environ of an ASGI HTTP request with a read body. """
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        # WSGI strings are bytes decoded as latin-1
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("latin1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for key, value in scope["headers"]:
+        name = key.decode("latin1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        value = value.decode("latin1")
+        if name in environ:
+            value = f"{environ[name]},{value}"
+        environ[name] = value
+    return environ
+
+
+class WsgiToAsgi:
+    """
+    Serve a WSGI application over ASGI HTTP. Requests are read whole and
+    run in a thread pool of 'max_workers', responses are sent whole too.
+    """
+
+    def __init__(self, wsgi_application, max_workers=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(max_workers,
+                                           thread_name_prefix="wsgi")
+
+    async def __call__(self, scope, receive, send):
+        body = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+
+        environ = build_environ(scope, b"".join(body))
+        loop = asyncio.get_running_loop()
+        status, headers, content = await loop.run_in_executor(
+            self.executor, self.run, environ
+        )
+        await send({"type": "http.response.start", "status": status,
+                    "headers": headers})
+        await send({"type": "http.response.body", "body": content})
+
+    def run(self, environ):
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = [
+                (name.lower().encode("latin1"), value.encode("latin1"))
+                for name, value in headers
+            ]
+
+        response = self.wsgi_application(environ, start_response)
+        try:
+            content = b"".join(response)
+        finally:
+            if hasattr(response, "close"):
+                response.close()
+        return started["status"], started["headers"], content
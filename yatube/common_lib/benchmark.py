@@ -0,0 +1,188 @@
+"""
+Helpers to benchmark views through the real WSGI handler: latency
+percentiles, SQL query counts and peak Python memory per request.
+"""
+
+import gc
+import json
+import math
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from io import BytesIO
+from urllib.parse import urlencode, urlsplit
+
+import django
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.middleware.csrf import _get_new_csrf_token
+from django.test import Client
+
+# Not listed in 'INTERNAL_IPS', so the debug toolbar stays out of the way.
+REMOTE_ADDR = "10.255.255.1"
+
+
+class WSGIClient:
+    """
+    Minimal client calling a 'WSGIHandler' like a WSGI server does,
+    without the instrumentation of the test client. CSRF checks stay on,
+    every request carries a valid token.
+    """
+
+    def __init__(self, user=None):
+        self.handler = WSGIHandler()
+        self.csrf_token = _get_new_csrf_token()
+        self.cookies = {settings.CSRF_COOKIE_NAME: self.csrf_token}
+        if user is not None:
+            client = Client()
+            client.force_login(user)
+            self.cookies.update(
+                (name, morsel.value) for name, morsel in client.cookies.items()
+            )
+
+    def environ(self, method, url, data=None):
+        parts = urlsplit(url)
+        body = urlencode(data or {}).encode()
+        return {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": parts.path,
+            "QUERY_STRING": parts.query,
+            "SERVER_NAME": "testserver",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "REMOTE_ADDR": REMOTE_ADDR,
+            "HTTP_HOST": "testserver",
+            "HTTP_COOKIE": "; ".join(
+                f"{name}={value}" for name, value in self.cookies.items()
+            ),
+            "HTTP_X_CSRFTOKEN": self.csrf_token,
+            "CONTENT_TYPE": "application/x-www-form-urlencoded",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": BytesIO(body),
+            "wsgi.errors": BytesIO(),
+            "wsgi.multiprocess": True,
+            "wsgi.multithread": False,
+            "wsgi.run_once": False,
+        }
+
+    def request(self, method, url, data=None):
+        """ Run a request and return its status code. """
+        status = []
+
+        def start_response(status_line, headers, exc_info=None):
+            status.append(int(status_line.split()[0]))
+
+        response = self.handler(self.environ(method, url, data),
+                                start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+        return status[0]
+
+
+class QueryCounter:
+    """
+    Database execute wrapper collecting SQL of the wrapped requests.
+    Unlike 'CaptureQueriesContext' it survives 'reset_queries', which
+    the handler calls on every request.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+
+def percentiles(samples):
+    """ Return nearest-rank p50, p95 and p99 of 'samples'. """
+    if not samples:
+        return 0.0, 0.0, 0.0
+    ordered = sorted(samples)
+    return tuple(ordered[max(math.ceil(len(ordered) * rank / 100), 1) - 1]
+                 for rank in (50, 95, 99))
+
+
+def measure(client, method, url, data=None, iterations=50, warmup=5,
+            before=None):
+    """
+    Request 'url' 'iterations' times after 'warmup' requests and return
+    latency percentiles in milliseconds, the query count of a single
+    request and its peak traced memory in KiB. 'before' is called ahead
+    of every measured request and is not timed.
+    """
+    before = before or (lambda: None)
+    for _ in range(warmup):
+        client.request(method, url, data)
+
+    before()
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        status = client.request(method, url, data)
+
+    before()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        client.request(method, url, data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings = []
+    for _ in range(iterations):
+        before()
+        start = time.perf_counter()
+        client.request(method, url, data)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    p50, p95, p99 = percentiles(timings)
+    return {
+        "status": status,
+        "iterations": iterations,
+        "p50_ms": round(p50, 3),
+        "p95_ms": round(p95, 3),
+        "p99_ms": round(p99, 3),
+        "mean_ms": round(statistics.mean(timings), 3),
+        "queries": len(counter.queries),
+        "peak_memory_kib": round(peak / 1024, 1),
+    }
+
+
+def git_revision():
+    """ Return the current commit of the working tree, if any. """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """ Describe the run so results of different commits are comparable. """
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "platform": platform.platform(),
+        "database": connection.vendor,
+    }
+
+
+def write_results(path, results, **meta):
+    """ Write benchmark 'results' with run metadata as JSON to 'path'. """
+    document = {"environment": environment(), **meta, "results": results}
+    with open(path, "w", encoding="utf-8") as output:
+        json.dump(document, output, ensure_ascii=False, indent=2)
+    return document
@@ -0,0 +1,105 @@
+""" Cache helpers for applications in project. """
+
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_KEY_PREFIX = "generation"
+# Time of the latest bump of any generation counter.
+GENERATION_BUMPED_KEY = "generation-bumped"
+
+
+def generation_key(scope):
+    return f"{GENERATION_KEY_PREFIX}:{scope}"
+
+
+def initial_generation():
+    """
+    Start counters from the current time in milliseconds, so a counter
+    evicted from the cache never restarts from an already used value.
+    """
+    return int(time.time() * 1000)
+
+
+def get_generations(scopes):
+    """ Return current generation counters of 'scopes' in the same order. """
+    keys = [generation_key(scope) for scope in scopes]
+    values = cache.get_many(keys)
+
+    for key in keys:
+        if key not in values:
+            initial = initial_generation()
+            cache.add(key, initial, None)
+            values[key] = cache.get(key, initial)
+
+    return [values[key] for key in keys]
+
+
+def bump_generation(*scopes):
+    """ Increment generation counters of 'scopes'. """
+    for scope in scopes:
+        key = generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, initial_generation(), None)
+    cache.set(GENERATION_BUMPED_KEY, time.time(), None)
+
+
+def bumped_within(seconds):
+    """ Tell if any generation counter was bumped in the last 'seconds'. """
+    return time.time() - cache.get(GENERATION_BUMPED_KEY, 0) < seconds
+
+
+def invalidate_generations(*scopes):
+    """
+    Bump generation counters of 'scopes' now and after the current
+    transaction commits. A concurrent reader may see the first bump but
+    not the uncommitted rows and cache them under the new counters, the
+    second bump makes such entries obsolete.
+    """
+    bump_generation(*scopes)
+    transaction.on_commit(lambda: bump_generation(*scopes))
+
+
+class CacheStats:
+    """ Thread safe hit/miss counter of a cache layer. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+# Statistics of '{% generation_cache %}' template fragments in this process.
+fragment_stats = CacheStats()
+
+# Statistics of 'anonymous_page_cache' decorated views in this process.
+page_stats = CacheStats()
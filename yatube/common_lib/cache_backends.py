@@ -0,0 +1,330 @@
+"""
+Two-tier cache backend: a small per-process LRU in front of a SQLite
+file shared by all worker processes on the host.
+
+Every L2 write gives the entry a new version stamp. L1 entries remember
+the stamp they were loaded with and are trusted for 'L1_TIMEOUT' seconds,
+after that a single stamp lookup in L2 tells if they are still valid,
+so an invalidation in one worker reaches the others within 'L1_TIMEOUT'.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'common_lib.cache_backends.TwoTierCache',
+            'LOCATION': '/var/tmp/yatube_cache.sqlite3',
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'MAX_ENTRIES': 100000,
+                'L1_MAX_ENTRIES': 1000,
+                'L1_TIMEOUT': 1,
+            },
+        }
+    }
+"""
+
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .cache import CacheStats
+
+# L1 stores and their statistics are shared by all threads of the process,
+# keyed by the L2 location, like 'LocMemCache' does.
+_l1_caches = {}
+_l1_locks = {}
+_stats = {}
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        cache_key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires REAL,
+        stamp INTEGER NOT NULL
+    )
+"""
+
+
+class TwoTierCache(BaseCache):
+    cull_every = 100
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._location = location
+        self._l1_max_entries = int(options.get("L1_MAX_ENTRIES", 1000))
+        self._l1_timeout = float(options.get("L1_TIMEOUT", 1))
+
+        self._l1 = _l1_caches.setdefault(location, OrderedDict())
+        self._l1_lock = _l1_locks.setdefault(location, threading.Lock())
+        self._stats = _stats.setdefault(
+            location, {"l1": CacheStats(), "l2": CacheStats()}
+        )
+        self._local = threading.local()
+
+    # L2 store
+
+    @property
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self._location, timeout=30,
+                                 isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(SCHEMA)
+            self._local.db = db
+            self._local.writes = 0
+        return db
+
+    @staticmethod
+    def _new_stamp():
+        return random.getrandbits(62)
+
+    def _l2_select(self, keys, columns="value, expires, stamp"):
+        rows = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            rows.update(
+                (row[0], row[1:]) for row in self._db.execute(
+                    f"SELECT cache_key, {columns} FROM cache_entries "
+                    f"WHERE cache_key IN ({placeholders})", chunk
+                )
+            )
+        return rows
+
+    def _l2_write(self, entries):
+        """ Upsert '(key, pickled, expires)' entries in one transaction. """
+        rows = [(key, pickled, expires, self._new_stamp())
+                for key, pickled, expires in entries]
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(cache_key, value, expires, stamp) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        for key, pickled, expires, stamp in rows:
+            self._l1_store(key, pickled, expires, stamp)
+        self._maybe_cull(len(rows))
+
+    def _maybe_cull(self, writes):
+        self._local.writes += writes
+        if self._local.writes < self.cull_every:
+            return
+        self._local.writes = 0
+
+        db = self._db
+        db.execute("DELETE FROM cache_entries WHERE expires < ?",
+                   (time.time(),))
+        count = db.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        if count > self._max_entries:
+            db.execute(
+                "DELETE FROM cache_entries WHERE cache_key IN ("
+                "SELECT cache_key FROM cache_entries "
+                "ORDER BY expires IS NULL, expires LIMIT ?)",
+                (count // self._cull_frequency,)
+            )
+
+    # L1 store
+
+    def _l1_store(self, key, pickled, expires, stamp):
+        with self._l1_lock:
+            self._l1[key] = (pickled, expires, stamp, time.monotonic())
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_discard(self, keys):
+        with self._l1_lock:
+            for key in keys:
+                self._l1.pop(key, None)
+
+    def _l1_lookup(self, keys):
+        """
+        Return pickled values of fresh L1 entries, revalidating the stamps
+        of entries older than 'L1_TIMEOUT' with a single L2 query.
+        """
+        now, clock = time.time(), time.monotonic()
+        found, stale = {}, {}
+        with self._l1_lock:
+            for key in keys:
+                entry = self._l1.get(key)
+                if entry is None:
+                    continue
+                pickled, expires, stamp, checked = entry
+                if expires is not None and expires <= now:
+                    del self._l1[key]
+                elif clock - checked < self._l1_timeout:
+                    found[key] = pickled
+                    self._l1.move_to_end(key)
+                else:
+                    stale[key] = entry
+
+        if stale:
+            stamps = self._l2_select(list(stale), columns="stamp")
+            for key, (pickled, expires, stamp, _) in stale.items():
+                if stamps.get(key, (None,))[0] == stamp:
+                    found[key] = pickled
+                    self._l1_store(key, pickled, expires, stamp)
+                else:
+                    self._l1_discard([key])
+        return found
+
+    # Cache API
+
+    def _fetch(self, keys):
+        """ Return a mapping of found keys to their unpickled values. """
+        l1_stats, l2_stats = self._stats["l1"], self._stats["l2"]
+        found = self._l1_lookup(keys)
+        for _ in found:
+            l1_stats.hit()
+
+        missing = [key for key in keys if key not in found]
+        if missing:
+            now = time.time()
+            rows = self._l2_select(missing)
+            for key in missing:
+                l1_stats.miss()
+                row = rows.get(key)
+                if row is None or (row[1] is not None and row[1] <= now):
+                    l2_stats.miss()
+                    continue
+                l2_stats.hit()
+                pickled, expires, stamp = row
+                found[key] = pickled
+                self._l1_store(key, pickled, expires, stamp)
+
+        return {key: pickle.loads(value) for key, value in found.items()}
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        made_keys = {}
+        for key in keys:
+            made_key = self.make_key(key, version=version)
+            self.validate_key(made_key)
+            made_keys[made_key] = key
+        found = self._fetch(list(made_keys))
+        return {made_keys[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        entries = []
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            entries.append(
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires)
+            )
+        if entries:
+            self._l2_write(entries)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        expires = self.get_backend_timeout(timeout)
+        stamp = self._new_stamp()
+
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = db.execute(
+                "INSERT INTO cache_entries (cache_key, value, expires, stamp) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT(cache_key) DO UPDATE SET "
+                "value = excluded.value, expires = excluded.expires, "
+                "stamp = excluded.stamp "
+                "WHERE cache_entries.expires <= ?",
+                (key, pickled, expires, stamp, time.time())
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+        if cursor.rowcount:
+            self._l1_store(key, pickled, expires, stamp)
+        return bool(cursor.rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT value, expires FROM cache_entries "
+                "WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= time.time()):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            stamp = self._new_stamp()
+            db.execute(
+                "UPDATE cache_entries SET value = ?, stamp = ? "
+                "WHERE cache_key = ?", (pickled, stamp, key)
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+        self._l1_store(key, pickled, row[1], stamp)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        cursor = self._db.execute(
+            "UPDATE cache_entries SET expires = ?, stamp = ? "
+            "WHERE cache_key = ?",
+            (self.get_backend_timeout(timeout), self._new_stamp(), key)
+        )
+        self._l1_discard([key])
+        return bool(cursor.rowcount)
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key in self._fetch([key])
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        for key in keys:
+            self.validate_key(key)
+        self._db.executemany(
+            "DELETE FROM cache_entries WHERE cache_key = ?",
+            [(key,) for key in keys]
+        )
+        self._l1_discard(keys)
+
+    def clear(self):
+        self._db.execute("DELETE FROM cache_entries")
+        with self._l1_lock:
+            self._l1.clear()
+
+    def stats(self):
+        """ Return hit/miss statistics of both tiers in this process. """
+        return {tier: stats.as_dict() for tier, stats in self._stats.items()}
@@ -0,0 +1,56 @@
+""" Database connection setup for applications in project. """
+
+import sqlite3
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Run 'PRAGMA' statements of 'SQLITE_PRAGMAS' setting on every new
+    SQLite connection, most pragmas are not stored in the database file.
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@contextmanager
+def write_transaction(using=None):
+    """
+    'transaction.atomic' block taking the SQLite write lock upfront with
+    'BEGIN IMMEDIATE'. Django begins deferred transactions, and one that
+    reads before its first write fails at once with 'database is locked'
+    if another writer commits meanwhile, 'busy_timeout' does not cover
+    it. Waiting for the lock at 'BEGIN' does not have the problem.
+    """
+    connection = transaction.get_connection(using)
+    outermost = not connection.in_atomic_block
+    with transaction.atomic(using):
+        if outermost and connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                # replace the empty deferred transaction begun by 'atomic'
+                cursor.execute("COMMIT")
+                cursor.execute("BEGIN IMMEDIATE")
+        yield
+
+
+def copy_sqlite_database(path, using="default"):
+    """
+    Copy SQLite database 'using' to the file 'path' with the online
+    backup API, readers of the copy see either the old or the new state.
+    """
+    source = connections[using]
+    source.ensure_connection()
+    target = sqlite3.connect(path)
+    try:
+        source.connection.backup(target)
+    finally:
+        target.close()
@@ -1,8 +1,20 @@
 """ Decorators for applications in project. """
 
+import hashlib
+import random
+import time
 from functools import wraps
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connection
 from django.shortcuts import redirect
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from .cache import get_generations, page_stats
+from .db import write_transaction
+from .routers import may_fill_cache
 
 
 def author_required(func):
@@ -37,3 +49,83 @@ def login_required_for_page(reverse_address_list=None):
             return redirect("login")
         return wrapper
     return decorator
+
+
+def anonymous_page_cache(scopes_func, timeout):
+    """
+    Decorator for views that caches whole responses for anonymous users.
+
+    Cache key and ETag are built from the request path and generation
+    counters of the scopes returned by 'scopes_func(request, **kwargs)',
+    so a bumped scope makes the cached page obsolete immediately.
+    Conditional GET requests are answered with 304 without running
+    the view. There is no 'Last-Modified', with whole seconds it could
+    not tell apart bumps within one second. Pages read from a possibly
+    lagging replica are neither cached nor given the ETag.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ("GET", "HEAD")
+                    or request.user.is_authenticated):
+                return func(request, *args, **kwargs)
+
+            scopes = scopes_func(request, *args, **kwargs)
+            generations = get_generations(scopes)
+            signature = f"{request.get_full_path()}|{generations}"
+            etag = quote_etag(hashlib.md5(signature.encode()).hexdigest())
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = cache.get(f"page:{etag}")
+
+            if response is None:
+                page_stats.miss()
+                fill = may_fill_cache()
+                response = func(request, *args, **kwargs)
+                if (response.status_code != 200 or response.cookies
+                        or not fill):
+                    return response
+
+                def store(response):
+                    cache.set(f"page:{etag}", response, timeout)
+
+                if hasattr(response, "render") and callable(response.render):
+                    response.add_post_render_callback(store)
+                else:
+                    store(response)
+            else:
+                page_stats.hit()
+
+            response["ETag"] = etag
+            patch_cache_control(response, max_age=0, must_revalidate=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def retry_on_locked(func):
+    """
+    Decorator running 'func' in a 'write_transaction' and retrying it with
+    exponential backoff and full jitter while SQLite reports 'database is
+    locked', up to 'DATABASE_LOCKED_RETRIES' times, 0 runs 'func' as is.
+    Inside an outer transaction the error is raised as is, only the whole
+    outer transaction could be retried.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        retries = settings.DATABASE_LOCKED_RETRIES
+        if not retries:
+            return func(*args, **kwargs)
+        for attempt in range(retries + 1):
+            outermost = not connection.in_atomic_block
+            try:
+                with write_transaction():
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if ("database is locked" not in str(error)
+                        or attempt == retries or not outermost):
+                    raise
+            time.sleep(random.uniform(
+                0, settings.DATABASE_LOCKED_BACKOFF * 2 ** attempt
+            ))
+    return wrapper
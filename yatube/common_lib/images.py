@@ -0,0 +1,123 @@
+"""
+Normalization of uploaded images before they are stored.
+
+An upload is checked by file size, format and pixel count from the image
+header, then decoded once, scaled down to 'max_edge' (JPEG is decoded
+already reduced), turned upright by its EXIF orientation and re-encoded
+to WebP with no EXIF data. The stored master image is what thumbnails
+are made of, so they no longer decode full size camera photos.
+"""
+
+import os
+from io import BytesIO
+
+from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile, UploadedFile
+from PIL import Image
+
+EXIF_ORIENTATION = 0x0112
+
+# Transpositions turning an image with an EXIF orientation upright.
+ORIENTATION_TRANSPOSE = {
+    2: Image.FLIP_LEFT_RIGHT,
+    3: Image.ROTATE_180,
+    4: Image.FLIP_TOP_BOTTOM,
+    5: Image.TRANSPOSE,
+    6: Image.ROTATE_270,
+    7: Image.TRANSVERSE,
+    8: Image.ROTATE_90,
+}
+
+OUTPUT_FORMAT = "WEBP"
+OUTPUT_EXTENSION = ".webp"
+OUTPUT_CONTENT_TYPE = "image/webp"
+
+ERROR_MESSAGES = {
+    "invalid_image": ("Загрузите корректное изображение. Файл повреждён "
+                      "или не является изображением."),
+    "file_too_large": "Файл больше {limit} МБ.",
+    "invalid_format": "Поддерживаются форматы: {formats}.",
+    "too_many_pixels": "Изображение больше {limit} мегапикселей.",
+}
+
+
+def image_error(code, **params):
+    return forms.ValidationError(ERROR_MESSAGES[code].format(**params),
+                                 code=code)
+
+
+def normalize_image(file_, max_edge):
+    """
+    Return the uploaded 'file_' re-encoded as an upright WebP image with
+    the longest edge of at most 'max_edge', raise 'ValidationError' for
+    files that are not accepted. Uploads saved to a temporary file are
+    read from it, in-memory ones are read in place.
+    """
+    if file_.size > settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise image_error("file_too_large",
+                          limit=settings.IMAGE_UPLOAD_MAX_SIZE // 2 ** 20)
+
+    file_.seek(0)
+    source = (file_.temporary_file_path()
+              if hasattr(file_, "temporary_file_path") else file_)
+    try:
+        # reads the header only
+        image = Image.open(source)
+    except Exception as e:
+        raise image_error("invalid_image") from e
+
+    output = BytesIO()
+    with image:
+        if image.format not in settings.IMAGE_UPLOAD_FORMATS:
+            raise image_error(
+                "invalid_format",
+                formats=", ".join(settings.IMAGE_UPLOAD_FORMATS)
+            )
+        if image.width * image.height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+            raise image_error(
+                "too_many_pixels",
+                limit=settings.IMAGE_UPLOAD_MAX_PIXELS // 10 ** 6
+            )
+
+        try:
+            orientation = image.getexif().get(EXIF_ORIENTATION)
+            icc_profile = image.info.get("icc_profile")
+            # decodes the image, a JPEG at the smallest scale still not
+            # below 'max_edge', the rest is done by resampling
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS,
+                            reducing_gap=1.0)
+        except Exception as e:
+            raise image_error("invalid_image") from e
+
+        # transposing the scaled down image is cheaper
+        if orientation in ORIENTATION_TRANSPOSE:
+            image = image.transpose(ORIENTATION_TRANSPOSE[orientation])
+        transparent = (image.mode in ("RGBA", "LA", "PA")
+                       or "transparency" in image.info)
+        mode = "RGBA" if transparent else "RGB"
+        if image.mode != mode:
+            image = image.convert(mode)
+
+        # EXIF and XMP are not passed, so they are dropped
+        image.save(output, OUTPUT_FORMAT,
+                   quality=settings.IMAGE_UPLOAD_QUALITY, method=4,
+                   icc_profile=icc_profile)
+
+    size = output.tell()
+    output.seek(0)
+    name = os.path.splitext(os.path.basename(file_.name))[0]
+    return InMemoryUploadedFile(
+        output, getattr(file_, "field_name", None),
+        f"{name}{OUTPUT_EXTENSION}", OUTPUT_CONTENT_TYPE, size, None
+    )
+
+
+def normalize_upload(value, max_edge):
+    """
+    Normalize a new upload in cleaned data of an ImageField, files
+    already stored and cleared fields are returned as they are.
+    """
+    if isinstance(value, UploadedFile):
+        return normalize_image(value, max_edge)
+    return value
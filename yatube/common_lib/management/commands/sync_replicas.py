@@ -0,0 +1,43 @@
+""" Refresh SQLite read replicas from the primary database. """
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from common_lib.db import copy_sqlite_database
+from common_lib.routers import PRIMARY
+
+
+class Command(BaseCommand):
+    help = ("Copy the primary SQLite database over every alias of "
+            "DATABASE_REPLICAS, standing in for replication locally.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=float, default=0,
+            help="Repeat every N seconds until interrupted."
+        )
+
+    def handle(self, *args, **options):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            raise CommandError("No DATABASE_REPLICAS configured.")
+        if any(connections[alias].vendor != "sqlite"
+               for alias in (PRIMARY, *replicas)):
+            raise CommandError("Replicas are copied for SQLite only.")
+
+        while True:
+            started = time.monotonic()
+            for alias in replicas:
+                connections[alias].close()
+                copy_sqlite_database(connections[alias].settings_dict["NAME"],
+                                     using=PRIMARY)
+            self.stdout.write(self.style.SUCCESS(
+                f"Synced {', '.join(replicas)} in "
+                f"{time.monotonic() - started:.2f}s."
+            ))
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
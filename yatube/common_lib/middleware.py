@@ -0,0 +1,167 @@
+""" Middleware for applications in project. """
+
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger("common_lib.timing")
+
+# Timings of the request handled by the current thread.
+_local = threading.local()
+_install_lock = threading.Lock()
+_installed = False
+
+CACHE_METHODS = ("get", "get_many", "set", "set_many", "add", "incr",
+                 "decr", "delete", "delete_many", "has_key", "touch",
+                 "clear")
+
+# Server-Timing metric names of timed categories.
+METRICS = (("sql", "SQL"), ("tpl", "Templates"), ("cache", "Cache"),
+           ("view", "View"))
+
+
+class RequestTimings:
+    """
+    Exclusive time spent per category during one request: time of nested
+    categories, like SQL run while rendering a template, is charged to the
+    inner one only. Time outside of any category is charged to the view.
+    """
+
+    def __init__(self):
+        self.durations = dict.fromkeys((name for name, _ in METRICS), 0.0)
+        self.queries = 0
+        self.start = self._mark = time.perf_counter()
+        self._stack = ["view"]
+
+    def _switch(self):
+        now = time.perf_counter()
+        self.durations[self._stack[-1]] += now - self._mark
+        self._mark = now
+
+    def enter(self, category):
+        self._switch()
+        self._stack.append(category)
+
+    def exit(self):
+        self._switch()
+        self._stack.pop()
+
+    def finish(self):
+        self._switch()
+        self.total = self._mark - self.start
+
+
+def timed(category, func):
+    """ Wrap 'func' to charge its time to 'category' of current request. """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = getattr(_local, "timings", None)
+        if timings is None:
+            return func(*args, **kwargs)
+        timings.enter(category)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.exit()
+    wrapper.timed = True
+    return wrapper
+
+
+def time_sql(execute, sql, params, many, context):
+    """ Database execute wrapper charging queries to the 'sql' category. """
+    timings = getattr(_local, "timings", None)
+    if timings is None:
+        return execute(sql, params, many, context)
+    timings.queries += 1
+    timings.enter("sql")
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.exit()
+
+
+def install():
+    """
+    Wrap template rendering and methods of configured cache backends once
+    per process, the wrappers do nothing outside timed requests.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        if not getattr(Template.render, "timed", False):
+            Template.render = timed("tpl", Template.render)
+        for alias in settings.CACHES:
+            backend = type(caches[alias])
+            for name in CACHE_METHODS:
+                method = getattr(backend, name)
+                if not getattr(method, "timed", False):
+                    setattr(backend, name, timed("cache", method))
+        _installed = True
+
+
+class RequestTimingMiddleware:
+    """
+    Measure time of every request spent in SQL (with query count),
+    template rendering, cache operations and the rest of the view code.
+    Adds a 'Server-Timing' header and logs a JSON line tagged with the
+    resolved URL name to 'common_lib.timing' logger.
+    Should be the first middleware to cover all the others.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        timings = _local.timings = RequestTimings()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(time_sql))
+                response = self.get_response(request)
+        finally:
+            _local.timings = None
+        timings.finish()
+
+        if settings.REQUEST_TIMING_HEADER:
+            response["Server-Timing"] = self.server_timing(timings)
+        self.log(request, response, timings)
+        return response
+
+    @staticmethod
+    def server_timing(timings):
+        metrics = []
+        for name, description in METRICS:
+            if name == "sql":
+                description = f"{timings.queries} queries"
+            metrics.append(
+                f'{name};dur={timings.durations[name] * 1000:.2f};'
+                f'desc="{description}"'
+            )
+        metrics.append(f"total;dur={timings.total * 1000:.2f}")
+        return ", ".join(metrics)
+
+    @staticmethod
+    def log(request, response, timings):
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        match = request.resolver_match
+        logger.info(json.dumps({
+            "url_name": match.view_name if match else None,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": timings.queries,
+            **{f"{name}_ms": round(timings.durations[name] * 1000, 2)
+               for name, _ in METRICS},
+            "total_ms": round(timings.total * 1000, 2),
+        }))
@@ -0,0 +1,288 @@
+""" Paginators for applications in project. """
+
+import base64
+import binascii
+
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Paginator
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .routers import may_fill_cache
+
+
+COUNT_KEY_PREFIX = "paginator_count"
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor_token(value, pk):
+    """ Pack an ordering value and a primary key in an url-safe token. """
+    raw = f"{value}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor_token(token):
+    """ Unpack a token of 'encode_cursor_token' to a '(value, pk)' pair. """
+    try:
+        padding = "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(token + padding).decode()
+        value, pk = raw.rsplit("|", 1)
+        return value, int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("Неверный курсор страницы")
+
+
+class CursorPage:
+    """
+    A single page of a keyset paginated queryset.
+
+    Unlike :class:'django.core.paginator.Page' it knows nothing about
+    the total number of objects, only about its neighbours.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, number, next_cursor, previous_cursor,
+                 paginator):
+        self.object_list = object_list
+        self.number = number
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.paginator = paginator
+
+    def __repr__(self):
+        return f"<Cursor page {self.number or 'first'}>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset paginator over '(<date field>, pk)' in descending order.
+
+    Every page is fetched with a single 'LIMIT per_page + 1' query starting
+    from the cursor, so the cost of a page does not depend on its depth.
+    Cursors are opaque url-safe tokens passed in 'after' (next page) or
+    'before' (previous page) query string parameters.
+    """
+    after_kwarg = "after"
+    before_kwarg = "before"
+
+    def __init__(self, queryset, per_page, ordering_field="pub_date"):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering_field = ordering_field
+
+    @staticmethod
+    def encode_cursor(value, pk):
+        return encode_cursor_token(value.isoformat(), pk)
+
+    @staticmethod
+    def decode_cursor(token):
+        value, pk = decode_cursor_token(token)
+        value = parse_datetime(value)
+        if value is None:
+            raise InvalidCursor("Неверный курсор страницы")
+        return value, pk
+
+    def cursor_for(self, obj):
+        return self.encode_cursor(getattr(obj, self.ordering_field), obj.pk)
+
+    def fetch(self, limit, after=None, before=None):
+        """
+        Return 'limit' objects following the '(value, pk)' key 'after' in
+        descending order or preceding the key 'before' in ascending order.
+        Object lists with a 'keyset' method of the same signature, like
+        feeds merged from several querysets, fetch the objects on their own.
+        """
+        keyset = getattr(self.queryset, "keyset", None)
+        if keyset is not None:
+            return keyset(limit, after=after, before=before)
+
+        field = self.ordering_field
+        if before:
+            value, pk = before
+            queryset = (self.queryset
+                            .filter(Q(**{f"{field}__gt": value})
+                                    | Q(**{field: value, "pk__gt": pk}))
+                            .order_by(field, "pk"))
+        else:
+            queryset = self.queryset.order_by(f"-{field}", "-pk")
+            if after:
+                value, pk = after
+                queryset = queryset.filter(Q(**{f"{field}__lt": value})
+                                           | Q(**{field: value, "pk__lt": pk}))
+        return list(queryset[:limit])
+
+    def page(self, after=None, before=None):
+        """ Return a :class:'CursorPage' for the given cursor tokens. """
+        object_list = self.fetch(
+            self.per_page + 1,
+            after=self.decode_cursor(after) if after and not before else None,
+            before=self.decode_cursor(before) if before else None
+        )
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+
+        if before:
+            object_list.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(after)
+
+        next_cursor = (self.cursor_for(object_list[-1])
+                       if has_next and object_list else None)
+        previous_cursor = (self.cursor_for(object_list[0])
+                           if has_previous and object_list else None)
+
+        return CursorPage(object_list, after or before or "", next_cursor,
+                          previous_cursor, self)
+
+
+def estimate_count(model, using="default"):
+    """
+    Return an estimated number of rows of the 'model' table without
+    scanning it: planner statistics of 'ANALYZE' when they exist,
+    otherwise the largest primary key, which overestimates after deletes.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master "
+                           "WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s",
+                               [table])
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+    elif connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE relname = %s",
+                           [table])
+            row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return int(row[0])
+
+    last_pk = (model._default_manager.using(using)
+                                     .order_by("-pk")
+                                     .values_list("pk", flat=True)
+                                     .first())
+    return last_pk or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator of a whole table that estimates its size instead of running
+    'COUNT(*)', for admin changelists of huge tables. Filtered querysets
+    are counted exactly, filters narrow them down to an index range.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if getattr(queryset, "query", None) is None or queryset.query.where:
+            return super().count
+        return estimate_count(queryset.model, queryset.db)
+
+
+def count_key(name):
+    return f"{COUNT_KEY_PREFIX}:{name}"
+
+
+def invalidate_counts(*names):
+    """
+    Drop cached counts of :class:'CachedCountPaginator' with 'count_name'
+    in 'names', now and after the current transaction commits, so a count
+    of rows committed meanwhile is not kept.
+    """
+    keys = [count_key(name) for name in names]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def elided_page_range(num_pages, number, on_each_side=2, on_ends=1):
+    """
+    Return page numbers around 'number' plus 'on_ends' first and last
+    ones, gaps between them are None.
+    """
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        return list(range(1, num_pages + 1))
+
+    pages = []
+    if number > on_each_side + on_ends + 1:
+        pages.extend(range(1, on_ends + 1))
+        pages.append(None)
+        start = number - on_each_side
+    else:
+        start = 1
+    if number < num_pages - on_each_side - on_ends:
+        pages.extend(range(start, number + on_each_side + 1))
+        pages.append(None)
+        pages.extend(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        pages.extend(range(start, num_pages + 1))
+    return pages
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator counting objects once per 'count_name': the count is cached
+    for 'count_timeout' seconds or until 'invalidate_counts' drops it.
+    Querysets are counted by primary keys only, so annotations do not get
+    into the 'COUNT(*)' subquery. With 'estimate_above', unfiltered
+    querysets of tables estimated larger than that are not counted, the
+    estimate may overcount and leave the last pages empty.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True, count_name=None,
+                 count_timeout=None, estimate_above=None):
+        super().__init__(object_list, per_page, orphans,
+                         allow_empty_first_page)
+        self.count_name = count_name
+        self.count_timeout = count_timeout
+        self.estimate_above = estimate_above
+
+    @cached_property
+    def count(self):
+        if self.count_name is None:
+            return self.count_objects()
+
+        key = count_key(self.count_name)
+        count = cache.get(key)
+        if count is None:
+            count = self.count_objects()
+            if may_fill_cache():
+                cache.set(key, count, self.count_timeout)
+        return count
+
+    def count_objects(self):
+        queryset = self.object_list
+        if getattr(queryset, "query", None) is None:
+            return super().count
+
+        if self.estimate_above is not None and not queryset.query.where:
+            estimate = estimate_count(queryset.model, queryset.db)
+            if estimate > self.estimate_above:
+                return estimate
+        return queryset.order_by().values("pk").count()
@@ -0,0 +1,94 @@
+"""
+Publish/subscribe of events between request handlers of one process.
+
+Publishers are synchronous code, like model signals run by WSGI worker
+threads, subscribers are coroutines of the ASGI event loop. The broker
+class is set by 'EVENTS_BROKER' setting, the in-process one stands in
+for a shared broker when the site runs in several processes.
+"""
+
+import asyncio
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class Subscription:
+    """
+    Events of a channel for a single subscriber, read with 'await get()'.
+    The queue is bounded, events for a subscriber that does not keep up
+    are dropped and counted in 'dropped'.
+    """
+
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def put(self, event):
+        """ Queue the event, must be called in the subscriber's loop. """
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """ Deliver events to subscriptions of the current process. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, channel, maxsize=100):
+        """ Subscribe to 'channel', must be called in a running loop. """
+        subscription = Subscription(self, channel, maxsize)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def has_subscribers(self, channel):
+        return channel in self._subscriptions
+
+    def publish(self, channel, event):
+        """ Send the event to every subscription, safe from any thread. """
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put,
+                                                       event)
+            except RuntimeError:
+                # the subscriber's loop is closed
+                self.unsubscribe(subscription)
+        return len(subscriptions)
+
+
+def get_broker():
+    """ Return the broker of 'EVENTS_BROKER' setting, one per process. """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.EVENTS_BROKER)()
+    return _broker
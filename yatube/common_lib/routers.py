@@ -0,0 +1,105 @@
+"""
+Database router sending reads to replicas and writes to the primary.
+
+Replicas lag behind the primary, so reads of a client go to the primary
+for 'REPLICA_PIN_SECONDS' after any request of the client that wrote.
+The pin is a cookie set by :class:'ReplicaPinningMiddleware', within the
+writing request itself the router notices the write on its own.
+
+Cached pages, fragments, cards and counts are shared by clients, so for
+the same time after a bump of any cache generation they are not filled
+from replica reads, see :func:'may_fill_cache'. Otherwise the first
+reader after a write would store rows of a lagging replica under the new
+generation.
+"""
+
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .cache import bumped_within
+
+PRIMARY = DEFAULT_DB_ALIAS
+REPLICA_PIN_COOKIE = "pin_primary"
+
+# Routing state of the request handled by the current thread.
+_state = threading.local()
+
+
+def reset_state(pinned=False):
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+def wrote():
+    """ Tell if the current request has asked for a write database. """
+    return getattr(_state, "wrote", False)
+
+
+def is_pinned():
+    return getattr(_state, "pinned", False) or wrote()
+
+
+def may_fill_cache():
+    """
+    Tell if what the current request has read may be stored in caches
+    shared by clients: it was read from the primary or no cache
+    generation was bumped in the last 'REPLICA_PIN_SECONDS'.
+    """
+    return (not settings.DATABASE_REPLICAS or is_pinned()
+            or not bumped_within(settings.REPLICA_PIN_SECONDS))
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads to a random alias of 'DATABASE_REPLICAS' and writes to the
+    primary. Reads stay on the primary when no replica is configured, in
+    a transaction of the primary and for pinned requests.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or is_pinned()
+                or connections[PRIMARY].in_atomic_block):
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get the schema together with the data of the primary
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaPinningMiddleware:
+    """
+    Pin reads of a client to the primary database while its pin cookie
+    lives, and set the cookie on responses of requests which wrote.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reset_state(pinned=REPLICA_PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            if wrote() and settings.DATABASE_REPLICAS:
+                response.set_cookie(
+                    REPLICA_PIN_COOKIE, "1",
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True, samesite="Lax",
+                )
+        finally:
+            reset_state()
+        return response
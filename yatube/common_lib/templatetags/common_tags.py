@@ -1,6 +1,14 @@
 """ Custom template tags for applications in project. """
 
 from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.template.base import NodeList
+from django.templatetags.cache import CacheNode
+
+from common_lib.cache import fragment_stats, get_generations
+from common_lib.paginators import elided_page_range
+from common_lib.routers import may_fill_cache
 
 register = template.Library()
 
@@ -9,3 +17,96 @@ register = template.Library()
 def addclass(field, css):
     """ Custom template tag that add input css attribute to html tag. """
     return field.as_widget(attrs={"class": css})
+
+
+@register.simple_tag
+def page_window(page, on_each_side=2, on_ends=1):
+    """
+    Return numbers of pages to link from the page: a window around it,
+    the first and the last ones. Gaps between them are None.
+    """
+    return elided_page_range(page.paginator.num_pages, page.number,
+                             on_each_side, on_ends)
+
+
+class MissCountingNodeList(NodeList):
+    """ NodeList that is rendered only on a fragment cache miss. """
+
+    def render(self, context):
+        context["generation_cache_miss"] = True
+        return super().render(context)
+
+
+class GenerationCacheNode(CacheNode):
+    """
+    CacheNode that adds generation counters of the given scopes to the
+    fragment key and counts cache hits and misses. Fragments rendered
+    from a possibly lagging replica are not stored.
+    """
+
+    def __init__(self, nodelist, expire_time_var, fragment_name, vary_on,
+                 generations_var):
+        super().__init__(MissCountingNodeList(nodelist), expire_time_var,
+                         fragment_name, vary_on, None)
+        self.generations_var = generations_var
+
+    def render(self, context):
+        scopes = self.generations_var.resolve(context) or []
+        with context.push(generation_cache_values=get_generations(scopes),
+                          generation_cache_miss=False):
+            if may_fill_cache():
+                value = super().render(context)
+            else:
+                value = self.render_uncached(context)
+            if context["generation_cache_miss"]:
+                fragment_stats.miss()
+            else:
+                fragment_stats.hit()
+        return value
+
+    def render_uncached(self, context):
+        """ Return the cached fragment or render it without storing. """
+        try:
+            fragment_cache = caches["template_fragments"]
+        except InvalidCacheBackendError:
+            fragment_cache = caches["default"]
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        value = fragment_cache.get(
+            make_template_fragment_key(self.fragment_name, vary_on)
+        )
+        if value is None:
+            value = self.nodelist.render(context)
+        return value
+
+
+@register.tag("generation_cache")
+def do_generation_cache(parser, token):
+    """
+    Cache the contents of a template fragment until one of the generation
+    counters of its scopes is bumped.
+
+    Usage::
+
+        {% generation_cache [expire_time] [fragment_name] [var1] ..
+                            generations=[scopes] %}
+            .. some expensive processing ..
+        {% endgeneration_cache %}
+    """
+    nodelist = parser.parse(("endgeneration_cache",))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 4 or not tokens[-1].startswith("generations="):
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires expire time, fragment name "
+            "and 'generations' argument."
+        )
+    generations_var = parser.compile_filter(
+        tokens[-1][len("generations="):]
+    )
+    return GenerationCacheNode(
+        nodelist, parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(t) for t in tokens[3:-1]]
+        + [parser.compile_filter("generation_cache_values")],
+        generations_var,
+    )
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+
+from django.test import SimpleTestCase
+
+from common_lib.asgi import WsgiToAsgi, sse_message
+from common_lib.pubsub import InProcessBroker
+from common_lib.testutils import AsgiConnection
+
+
+def echo_application(environ, start_response):
+    start_response('201 Created', [('Content-Type', 'text/plain'),
+                                   ('X-Path', environ['PATH_INFO'])])
+    return [environ['QUERY_STRING'].encode(), b'|',
+            environ['HTTP_X_TEST'].encode(), b'|',
+            environ['wsgi.input'].read()]
+
+
+class WsgiToAsgiTests(SimpleTestCase):
+    def test_request_and_response_translated(self):
+        async def scenario():
+            connection = AsgiConnection(
+                WsgiToAsgi(echo_application, max_workers=1),
+                '/path/', 'a=1', headers=[('x-test', 'value')]
+            )
+            connection.requests = asyncio.Queue()
+            connection.requests.put_nowait({'type': 'http.request',
+                                            'body': b'one',
+                                            'more_body': True})
+            connection.requests.put_nowait({'type': 'http.request',
+                                            'body': b'two'})
+            connection.start()
+            body = await connection.next_body()
+            await connection.finish()
+            return connection, body
+
+        connection, body = asyncio.run(scenario())
+        self.assertEqual(connection.status, 201)
+        self.assertEqual(connection.headers['x-path'], '/path/')
+        self.assertEqual(body, 'a=1|value|onetwo')
+
+    def test_sse_message(self):
+        self.assertEqual(sse_message('post', '{"id": 1}'),
+                         b'event: post\ndata: {"id": 1}\n\n')
+        self.assertEqual(sse_message(data='a\nb'), b'data: a\ndata: b\n\n')
+        self.assertEqual(sse_message(comment='keepalive'),
+                         b': keepalive\n\n')
+
+
+class InProcessBrokerTests(SimpleTestCase):
+    def test_publish_from_other_thread(self):
+        broker = InProcessBroker()
+
+        async def scenario():
+            subscription = broker.subscribe('channel')
+            other = broker.subscribe('other')
+            thread = threading.Thread(target=broker.publish,
+                                      args=('channel', {'id': 1}))
+            thread.start()
+            event = await asyncio.wait_for(subscription.get(), 5)
+            thread.join()
+            subscription.close()
+            return event, other.queue.qsize()
+
+        event, other_size = asyncio.run(scenario())
+        self.assertEqual(event, {'id': 1})
+        self.assertEqual(other_size, 0)
+        self.assertFalse(broker.has_subscribers('channel'))
+
+    def test_slow_subscriber_drops_events(self):
+        broker = InProcessBroker()
+
+        async def scenario():
+            subscription = broker.subscribe('channel', maxsize=2)
+            for number in range(5):
+                broker.publish('channel', number)
+            await asyncio.sleep(0)
+            return subscription
+
+        subscription = asyncio.run(scenario())
+        self.assertEqual(subscription.queue.qsize(), 2)
+        self.assertEqual(subscription.dropped, 3)
@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from os import path
+
+from django.test import SimpleTestCase
+
+from common_lib.cache_backends import TwoTierCache
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+
+    def make_cache(self, l1_timeout=60, separate_process=False):
+        cache = TwoTierCache(
+            path.join(self.cache_dir, 'cache.sqlite3'),
+            {'OPTIONS': {'L1_MAX_ENTRIES': 2, 'L1_TIMEOUT': l1_timeout}}
+        )
+        if separate_process:
+            cache._l1 = OrderedDict()
+        return cache
+
+    def test_basic_operations(self):
+        cache = self.make_cache()
+        cache.set('key', {'value': 1})
+        self.assertEqual(cache.get('key'), {'value': 1})
+
+        self.assertFalse(cache.add('key', 2))
+        self.assertTrue(cache.add('new_key', 2))
+        self.assertEqual(cache.incr('new_key', 3), 5)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+
+        cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(cache.get_many(['a', 'b', 'c', 'd']),
+                         {'a': 1, 'b': 2, 'c': 3})
+
+        cache.delete('a')
+        self.assertIsNone(cache.get('a'))
+
+        cache.set('expiring', 1, timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('expiring'))
+
+        cache.clear()
+        self.assertEqual(cache.get_many(['b', 'c', 'key']), {})
+
+    def test_invalidation_reaches_other_processes(self):
+        cache = self.make_cache(l1_timeout=0)
+        other = self.make_cache(separate_process=True)
+
+        cache.set('key', 1)
+        other.set('key', 2)
+        self.assertEqual(cache.get('key'), 2)
+
+        other.delete('key')
+        self.assertIsNone(cache.get('key'))
+
+    def test_stats_per_tier(self):
+        cache = self.make_cache()
+        other = self.make_cache(separate_process=True)
+        for stats in cache._stats.values():
+            stats.reset()
+
+        cache.set('key', 1)
+        cache.get('key')
+        other.get('key')
+        cache.get('missing')
+
+        self.assertEqual(cache.stats(), {
+            'l1': {'hits': 1, 'misses': 2, 'hit_rate': 1 / 3},
+            'l2': {'hits': 1, 'misses': 1, 'hit_rate': 0.5},
+        })
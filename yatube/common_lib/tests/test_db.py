@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from common_lib.benchmark import QueryCounter
+from common_lib.db import write_transaction
+from common_lib.decorators import retry_on_locked
+
+
+class SQLitePragmasTests(TestCase):
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1234,
+                                       'busy_timeout': 4321})
+    def test_pragmas_applied_to_new_connections(self):
+        new_connection = connection.copy()
+        self.addCleanup(new_connection.close)
+
+        with new_connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -1234)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 4321)
+
+
+@override_settings(DATABASE_LOCKED_RETRIES=3, DATABASE_LOCKED_BACKOFF=0.01)
+class RetryOnLockedTests(TransactionTestCase):
+    def setUp(self):
+        patcher = mock.patch('common_lib.decorators.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def failing(self, failures, error='database is locked'):
+        calls = []
+
+        @retry_on_locked
+        def func():
+            calls.append(connection.in_atomic_block)
+            if len(calls) <= failures:
+                raise OperationalError(error)
+            return 'ok'
+        return func, calls
+
+    def test_retried_in_transaction_until_success(self):
+        func, calls = self.failing(2)
+
+        self.assertEqual(func(), 'ok')
+        self.assertEqual(calls, [True] * 3)
+        self.assertEqual(self.sleep.call_count, 2)
+        first_delay, second_delay = (call.args[0]
+                                     for call in self.sleep.call_args_list)
+        self.assertLessEqual(first_delay, 0.01)
+        self.assertLessEqual(second_delay, 0.02)
+
+    def test_error_raised_when_retries_exhausted(self):
+        func, calls = self.failing(10)
+
+        with self.assertRaisesMessage(OperationalError, 'database is locked'):
+            func()
+        self.assertEqual(len(calls), 4)
+
+    def test_other_errors_not_retried(self):
+        func, calls = self.failing(1, error='no such table: posts_post')
+
+        with self.assertRaises(OperationalError):
+            func()
+        self.assertEqual(len(calls), 1)
+
+    def test_not_retried_inside_outer_transaction(self):
+        func, calls = self.failing(1)
+
+        with self.assertRaises(OperationalError):
+            with transaction.atomic():
+                func()
+        self.assertEqual(len(calls), 1)
+
+    @override_settings(DATABASE_LOCKED_RETRIES=0)
+    def test_disabled_runs_in_autocommit(self):
+        func, calls = self.failing(0)
+
+        self.assertEqual(func(), 'ok')
+        self.assertEqual(calls, [False])
+
+    def test_write_transaction_takes_write_lock_upfront(self):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            with write_transaction():
+                pass
+        self.assertIn('BEGIN IMMEDIATE', counter.queries)
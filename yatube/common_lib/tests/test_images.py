@@ -0,0 +1,80 @@
+from io import BytesIO
+
+from django import forms
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from common_lib.images import (EXIF_ORIENTATION, normalize_image,
+                               normalize_upload)
+
+EXIF_MAKE = 0x010F
+
+
+def upload(name, image_format, size=(300, 200), mode='RGB', color='red',
+           **params):
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, image_format, **params)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+def open_result(result):
+    image = Image.open(result)
+    image.load()
+    return image
+
+
+class NormalizeImageTests(SimpleTestCase):
+    def test_photo_scaled_upright_without_exif(self):
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = 6
+        exif[EXIF_MAKE] = 'Camera'
+        photo = upload('photo.jpg', 'JPEG', size=(3000, 2000),
+                       exif=exif.tobytes(), quality=95)
+
+        result = normalize_image(photo, 600)
+        image = open_result(result)
+
+        self.assertEqual(result.name, 'photo.webp')
+        self.assertEqual(result.content_type, 'image/webp')
+        self.assertEqual(image.format, 'WEBP')
+        self.assertEqual(image.size, (400, 600))
+        self.assertEqual(dict(image.getexif()), {})
+        self.assertLess(result.size, photo.size)
+
+    def test_small_images_not_upscaled_transparency_kept(self):
+        image = open_result(normalize_image(
+            upload('icon.png', 'PNG', size=(32, 16), mode='RGBA',
+                   color=(255, 0, 0, 128)), 600
+        ))
+        self.assertEqual(image.size, (32, 16))
+        self.assertEqual(image.mode, 'RGBA')
+
+    def test_rejected_uploads(self):
+        truncated = upload('broken.jpg', 'JPEG')
+        truncated = SimpleUploadedFile('broken.jpg', truncated.read()[:200])
+        cases = (
+            (upload('image.bmp', 'BMP'), 'invalid_format'),
+            (SimpleUploadedFile('text.jpg', b'not an image'), 'invalid_image'),
+            (truncated, 'invalid_image'),
+        )
+        for file_, code in cases:
+            with self.subTest(code=code), \
+                    self.assertRaises(forms.ValidationError) as error:
+                normalize_image(file_, 600)
+            self.assertEqual(error.exception.code, code)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=100, IMAGE_UPLOAD_MAX_PIXELS=100)
+    def test_limits(self):
+        with self.assertRaises(forms.ValidationError) as error:
+            normalize_image(upload('big.png', 'PNG'), 600)
+        self.assertEqual(error.exception.code, 'file_too_large')
+
+        with self.assertRaises(forms.ValidationError) as error:
+            normalize_image(upload('big.gif', 'GIF', size=(20, 20)), 600)
+        self.assertEqual(error.exception.code, 'too_many_pixels')
+
+    def test_stored_files_kept(self):
+        for value in (None, False, 'posts/stored.webp'):
+            with self.subTest(value=value):
+                self.assertEqual(normalize_upload(value, 600), value)
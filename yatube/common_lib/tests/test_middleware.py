@@ -0,0 +1,56 @@
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class RequestTimingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        Post.objects.create(text='Текст тестового поста', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('index'))
+
+        metrics = dict(
+            re.match(r'(\w+);dur=([\d.]+)', metric).groups()
+            for metric in response['Server-Timing'].split(', ')
+        )
+        self.assertEqual(set(metrics),
+                         {'sql', 'tpl', 'cache', 'view', 'total'})
+        self.assertGreater(float(metrics['sql']), 0)
+        self.assertGreater(float(metrics['tpl']), 0)
+        self.assertGreater(float(metrics['cache']), 0)
+        self.assertAlmostEqual(
+            sum(float(metrics[name]) for name in ('sql', 'tpl', 'cache',
+                                                  'view')),
+            float(metrics['total']), delta=0.1
+        )
+        self.assertRegex(response['Server-Timing'],
+                         r'sql;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    def test_log_line_with_url_name(self):
+        link = reverse('profile', kwargs={'username': self.user.username})
+        with self.assertLogs('common_lib.timing', 'INFO') as logs:
+            self.client.get(link)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['url_name'], 'profile')
+        self.assertEqual(record['path'], link)
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreaterEqual(record['total_ms'], record['sql_ms'])
@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from common_lib.paginators import (CachedCountPaginator, elided_page_range,
+                                   estimate_count)
+from posts.cache import POSTS_SCOPE, follow_scope, group_scope
+from posts.models import Follow, Group, Post
+from posts.views import PostsListView
+from yatube.settings import PAGINATOR_PAGE_SIZE
+
+User = get_user_model()
+
+
+class ElidedPageRangeTests(SimpleTestCase):
+    def test_window_with_first_and_last_pages(self):
+        self.assertEqual(elided_page_range(5, 3), [1, 2, 3, 4, 5])
+        self.assertEqual(elided_page_range(100, 1), [1, 2, 3, None, 100])
+        self.assertEqual(elided_page_range(100, 50),
+                         [1, None, 48, 49, 50, 51, 52, None, 100])
+        self.assertEqual(elided_page_range(100, 99),
+                         [1, None, 97, 98, 99, 100])
+
+
+class CachedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        Post.objects.bulk_create(
+            Post(text=f'Текст поста {number}', author=cls.user,
+                 group=cls.group if number % 2 else None)
+            for number in range(6)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def paginator(self, queryset=None, name=POSTS_SCOPE, **kwargs):
+        if queryset is None:
+            queryset = PostsListView().get_posts_queryset()
+        return CachedCountPaginator(queryset, 2, count_name=name, **kwargs)
+
+    def test_counted_once_without_annotations(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.paginator().count, 6)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('posts_comment', queries[0]['sql'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.paginator().count, 6)
+
+    def test_counts_invalidated_by_posts(self):
+        group_posts = Post.objects.filter(group=self.group)
+        self.assertEqual(self.paginator().count, 6)
+        self.assertEqual(self.paginator(group_posts, group_scope('group'))
+                         .count, 3)
+
+        post = Post.objects.create(text='Новый пост', author=self.user,
+                                   group=self.group)
+        self.assertEqual(self.paginator().count, 7)
+        self.assertEqual(self.paginator(group_posts, group_scope('group'))
+                         .count, 4)
+
+        post.group = None
+        post.save()
+        self.assertEqual(self.paginator(group_posts, group_scope('group'))
+                         .count, 3)
+
+        post.delete()
+        self.assertEqual(self.paginator().count, 6)
+
+    def test_follow_count_invalidated_by_follow(self):
+        reader = User.objects.create_user(username='reader')
+        name = follow_scope(reader.pk)
+        followed = Post.objects.filter(author__following__user=reader)
+        self.assertEqual(self.paginator(followed, name).count, 0)
+
+        Follow.objects.create(user=reader, author=self.user)
+        self.assertEqual(self.paginator(followed, name).count, 6)
+
+    def test_estimate_of_unfiltered_queryset(self):
+        Post.objects.filter(pk=Post.objects.order_by('pk').first().pk) \
+                    .delete()
+
+        self.assertEqual(self.paginator(estimate_above=0).count,
+                         estimate_count(Post))
+        self.assertEqual(
+            self.paginator(Post.objects.filter(group=self.group),
+                           group_scope('group'), estimate_above=0).count,
+            3
+        )
+        cache.clear()
+        self.assertEqual(self.paginator(estimate_above=1000).count, 5)
+
+    def test_feed_links_windowed(self):
+        Post.objects.bulk_create(
+            Post(text=f'Еще пост {number}', author=self.user)
+            for number in range(PAGINATOR_PAGE_SIZE * 30)
+        )
+        response = self.client.get(reverse('index'), {'page': 15})
+        page = response.context['page']
+
+        self.assertEqual(page.paginator.num_pages, 31)
+        for number in (1, 13, 17, 31):
+            self.assertContains(response, f'href="?page={number}"')
+        for number in (2, 12, 18, 30):
+            self.assertNotContains(response, f'href="?page={number}"')
+        self.assertContains(response, '&hellip;', count=2)
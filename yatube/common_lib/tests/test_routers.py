@@ -0,0 +1,165 @@
+import shutil
+import sqlite3
+import tempfile
+from os import path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+
+from common_lib import routers
+from common_lib.cache import bump_generation
+from common_lib.db import copy_sqlite_database
+from common_lib.routers import (PRIMARY, REPLICA_PIN_COOKIE,
+                                PrimaryReplicaRouter,
+                                ReplicaPinningMiddleware)
+from posts.models import Post
+
+User = get_user_model()
+REPLICAS = ['replica_1', 'replica_2']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_PIN_SECONDS=5)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        routers.reset_state()
+        self.addCleanup(routers.reset_state)
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_go_to_replicas(self):
+        self.assertIn(self.router.db_for_read(Post), REPLICAS)
+
+    def test_writes_go_to_primary_and_pin_reads(self):
+        self.assertEqual(self.router.db_for_write(Post), PRIMARY)
+        self.assertEqual(self.router.db_for_read(Post), PRIMARY)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_reads_go_to_primary_without_replicas(self):
+        self.assertEqual(self.router.db_for_read(Post), PRIMARY)
+
+    def test_replicas_not_migrated(self):
+        self.assertTrue(self.router.allow_migrate(PRIMARY, 'posts'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'posts'))
+
+    def middleware_call(self, view, **cookies):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies)
+        return ReplicaPinningMiddleware(view)(request)
+
+    def test_request_with_write_sets_pin_cookie(self):
+        def view(request):
+            self.router.db_for_write(Post)
+            return HttpResponse()
+
+        response = self.middleware_call(view)
+        self.assertEqual(response.cookies[REPLICA_PIN_COOKIE]['max-age'], 5)
+        self.assertFalse(routers.is_pinned(),
+                         'Состояние запроса должно сбрасываться')
+
+    def test_pinned_client_reads_primary(self):
+        databases = []
+
+        def view(request):
+            databases.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = self.middleware_call(view, **{REPLICA_PIN_COOKIE: '1'})
+        self.middleware_call(view)
+
+        self.assertEqual(databases[0], PRIMARY)
+        self.assertIn(databases[1], REPLICAS)
+        self.assertNotIn(REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_replica_reads_after_generation_bump_not_cached(self):
+        self.assertTrue(routers.may_fill_cache())
+        bump_generation('posts')
+        self.assertFalse(routers.may_fill_cache())
+
+        self.router.db_for_write(Post)
+        self.assertTrue(routers.may_fill_cache())
+
+        routers.reset_state()
+        with override_settings(REPLICA_PIN_SECONDS=0):
+            self.assertTrue(routers.may_fill_cache())
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertTrue(routers.may_fill_cache())
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class PrimaryReplicaRouterTransactionTests(TestCase):
+    def test_reads_in_transaction_go_to_primary(self):
+        routers.reset_state()
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(Post), PRIMARY)
+
+
+class CopySQLiteDatabaseTests(TransactionTestCase):
+    def test_copy_has_committed_rows(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        replica = path.join(directory, 'replica.sqlite3')
+        user = User.objects.create_user(username='TestUser')
+        Post.objects.create(text='Текст тестового поста', author=user)
+
+        copy_sqlite_database(replica)
+
+        copy = sqlite3.connect(replica)
+        self.addCleanup(copy.close)
+        self.assertEqual(
+            copy.execute('SELECT text FROM posts_post').fetchall(),
+            [('Текст тестового поста',)]
+        )
+
+
+class LaggingReplicaTests(TransactionTestCase):
+    """ Cached pages with a replica lagging behind the primary. """
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.user = User.objects.create_user(username='TestUser')
+        Post.objects.create(text='Пост в реплике', author=self.user)
+
+        self.replica = path.join(directory, 'replica.sqlite3')
+        connections.databases['replica_lag'] = {
+            **connections.databases[PRIMARY],
+            'NAME': self.replica,
+        }
+        self.addCleanup(connections.databases.pop, 'replica_lag')
+        self.addCleanup(lambda: connections['replica_lag'].close())
+
+    def sync_replica(self):
+        connections['replica_lag'].close()
+        copy_sqlite_database(self.replica)
+
+    @override_settings(DATABASE_REPLICAS=['replica_lag'],
+                       REPLICA_PIN_SECONDS=5)
+    def test_caches_not_filled_from_lagging_replica(self):
+        reader = Client()
+        reader.force_login(self.user)
+        self.sync_replica()
+        cache.clear()
+        guest = Client()
+        for client in (guest, reader):
+            self.assertContains(client.get('/'), 'Пост в реплике')
+
+        Post.objects.create(text='Новый пост', author=self.user)
+
+        # replication lag
+        for client in (guest, reader):
+            response = client.get('/')
+            self.assertNotContains(response, 'Новый пост')
+            self.assertFalse(response.has_header('ETag'))
+
+        self.sync_replica()
+        for client in (guest, reader):
+            with self.subTest(client=client):
+                response = client.get('/')
+                self.assertContains(response, 'Новый пост')
+                self.assertEqual(
+                    response.context['paginator'].count, 2
+                )
@@ -0,0 +1,27 @@
+import importlib
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import clear_url_caches
+
+from yatube import settings_production
+
+
+class ProductionSettingsTests(SimpleTestCase):
+    def test_debug_off(self):
+        self.assertFalse(settings_production.DEBUG)
+        self.assertNotIn('testserver', settings_production.ALLOWED_HOSTS)
+        self.assertNotIn('debug_toolbar', settings_production.INSTALLED_APPS)
+        self.assertFalse([
+            middleware for middleware in settings_production.MIDDLEWARE
+            if middleware.startswith('debug_toolbar.')
+        ])
+
+    def test_debug_urls_not_routed(self):
+        from yatube import urls
+
+        self.addCleanup(clear_url_caches)
+        self.addCleanup(importlib.reload, urls)
+        with override_settings(DEBUG=settings_production.DEBUG):
+            importlib.reload(urls)
+        routes = [str(pattern.pattern) for pattern in urls.urlpatterns]
+        self.assertNotIn('__debug__/', routes)
@@ -0,0 +1,31 @@
+from unittest import mock
+
+from django.template import engines
+from django.template.loaders.filesystem import Loader as FilesystemLoader
+from django.test import SimpleTestCase, override_settings
+
+from common_lib.warmup import warm_templates
+from yatube.settings_production import TEMPLATES as PRODUCTION_TEMPLATES
+
+
+class WarmTemplatesTests(SimpleTestCase):
+    def test_nothing_compiled_without_cached_loader(self):
+        self.assertEqual(warm_templates(), 0)
+
+    @override_settings(TEMPLATES=PRODUCTION_TEMPLATES)
+    def test_project_templates_compiled_once(self):
+        count = warm_templates()
+
+        cached = engines['django'].engine.template_loaders[0]
+        names = set(cached.get_template_cache)
+        self.assertEqual(len(names), count)
+        self.assertLessEqual({'base.html', 'misc/404.html', 'posts_view.html',
+                              'post_profile.html', 'live_updates.html'},
+                             names)
+        # apps outside the project and nested template directories
+        self.assertNotIn('admin/base.html', names)
+        self.assertNotIn('includes/post_profile.html', names)
+
+        with mock.patch.object(FilesystemLoader, 'get_contents') as read:
+            engines['django'].get_template('posts_view.html')
+        read.assert_not_called()
@@ -1,11 +1,93 @@
+import asyncio
+import time
+
+from django.core.cache import cache
 from django.core.paginator import Page, Paginator
+from django.db import connection
 from django.db.models import QuerySet
 from django.urls import reverse
 
+from common_lib.benchmark import QueryCounter
 from yatube.settings import PAGINATOR_PAGE_SIZE
 
 
+class AsgiConnection:
+    """
+    Run an ASGI HTTP request in the running loop: 'start()' the
+    application, read what it sends with 'next_body()', then
+    'disconnect()' and 'await finish()'.
+    """
+
+    def __init__(self, application, path, query_string="", headers=()):
+        self.application = application
+        self.scope = {
+            "type": "http",
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "root_path": "",
+            "query_string": query_string.encode(),
+            "headers": [(name.encode(), value.encode())
+                        for name, value in headers],
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+        self.requests = asyncio.Queue()
+        self.requests.put_nowait({"type": "http.request", "body": b"",
+                                  "more_body": False})
+        self.responses = asyncio.Queue()
+        self.start_message = None
+
+    def start(self):
+        self.task = asyncio.ensure_future(
+            self.application(self.scope, self.requests.get, self.send)
+        )
+        return self
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+        else:
+            self.responses.put_nowait(message)
+
+    async def next_body(self, timeout=5):
+        message = await asyncio.wait_for(self.responses.get(), timeout)
+        return message["body"].decode()
+
+    def disconnect(self):
+        self.requests.put_nowait({"type": "http.disconnect"})
+
+    async def finish(self, timeout=5):
+        await asyncio.wait_for(self.task, timeout)
+
+    @property
+    def status(self):
+        return self.start_message["status"]
+
+    @property
+    def headers(self):
+        return {name.decode(): value.decode()
+                for name, value in self.start_message["headers"]}
+
+
 class AppTestBase:
+    """
+    Entries of 'self.urls' and 'self.test_config' may declare budgets of a
+    single request: 'max_queries' SQL queries and 'max_time' seconds.
+    Subclasses can define 'add_page_objects()' to fill pages with more
+    objects, budgets are checked again after it and the query count of
+    every page must not grow.
+    """
+
+    QUERIES_BUDGET_MSG = ('Страница {link} выполняет {count} SQL-запросов '
+                          'при бюджете {budget}:\n{sql}')
+    TIME_BUDGET_MSG = ('Страница {link} отвечает {elapsed:.3f} с '
+                       'при бюджете {budget} с.')
+    QUERIES_GROWTH_MSG = ('Число SQL-запросов страницы {link} растет с '
+                          'числом объектов на ней: {before} -> {after}:\n'
+                          '{sql}')
+
     def __init__(self):
         self.current_client = None
 
@@ -14,6 +96,78 @@ class AppTestBase:
                                if not login_required else
                                self.authorized_client)
 
+    def measure_request(self, link):
+        """
+        Request 'link' with the current client on a cold cache after a
+        warm-up request, return the executed SQL and the elapsed time.
+        """
+        self.current_client.get(link)
+        cache.clear()
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            self.current_client.get(link)
+            elapsed = time.perf_counter() - start
+        return counter.queries, elapsed
+
+    @staticmethod
+    def format_queries(queries):
+        return '\n'.join(
+            f'{number}. {sql}' for number, sql in enumerate(queries, 1)
+        )
+
+    def check_budgets(self, config, link_key):
+        """ Check budgets of 'config' entries, return the query counts. """
+        counts = {}
+        for config_item in config:
+            max_queries = config_item.get('max_queries')
+            max_time = config_item.get('max_time')
+            if max_queries is None and max_time is None:
+                continue
+
+            link = config_item[link_key]
+            with self.subTest(link=link):
+                self.switch_client(config_item['login_required'])
+                queries, elapsed = self.measure_request(link)
+                counts[link] = queries
+
+                if max_queries is not None:
+                    self.assertLessEqual(
+                        len(queries), max_queries,
+                        self.QUERIES_BUDGET_MSG.format(
+                            link=link, count=len(queries),
+                            budget=max_queries,
+                            sql=self.format_queries(queries)
+                        )
+                    )
+                if max_time is not None:
+                    self.assertLessEqual(
+                        elapsed, max_time,
+                        self.TIME_BUDGET_MSG.format(
+                            link=link, elapsed=elapsed, budget=max_time
+                        )
+                    )
+        return counts
+
+    def check_budgets_growth(self, config, link_key):
+        before = self.check_budgets(config, link_key)
+        add_page_objects = getattr(self, 'add_page_objects', None)
+        if not before or add_page_objects is None:
+            return
+
+        add_page_objects()
+        after = self.check_budgets(config, link_key)
+        for link, queries in after.items():
+            with self.subTest(link=link):
+                self.assertLessEqual(
+                    len(queries), len(before[link]),
+                    self.QUERIES_GROWTH_MSG.format(
+                        link=link, before=len(before[link]),
+                        after=len(queries), sql=self.format_queries(queries)
+                    )
+                )
+
 
 class AppUrlsTestBase(AppTestBase):
 
@@ -24,15 +178,16 @@ class AppUrlsTestBase(AppTestBase):
     LOGIN_URL = reverse('login')
 
     def test_page_links(self):
-        for url, link, _, _ in [url_dict.values() for url_dict in self.urls]:
+        for url_item in self.urls:
+            url, link = url_item['url'], url_item['link']
             with self.subTest(url=url, link=link):
                 self.assertEqual(url, link, self.URL_GENERATION_MSG)
 
     def test_page_exists_at_desired_location(self):
-        values = [url_dict.values() for url_dict in self.urls]
-        for _, link, login_required, _ in values:
+        for url_item in self.urls:
+            link = url_item['link']
             with self.subTest(link=link):
-                self.switch_client(login_required)
+                self.switch_client(url_item['login_required'])
 
                 response = self.current_client.get(link)
                 self.assertEqual(
@@ -41,7 +196,8 @@ class AppUrlsTestBase(AppTestBase):
 
     def test_page_redirect_anonymous(self):
         urls = [url for url in self.urls if url['login_required']]
-        for _, link, _, _ in [url_dict.values() for url_dict in urls]:
+        for url_item in urls:
+            link = url_item['link']
             with self.subTest(link=link):
                 response = self.guest_client.get(link, follow=True)
                 self.assertRedirects(
@@ -50,16 +206,19 @@ class AppUrlsTestBase(AppTestBase):
                 )
 
     def test_page_template(self):
-        values = [url_dict.values() for url_dict in self.urls]
-        for _, link, login_required, template in values:
+        for url_item in self.urls:
+            link = url_item['link']
             with self.subTest(link=link):
-                self.switch_client(login_required)
+                self.switch_client(url_item['login_required'])
 
                 response = self.current_client.get(link)
                 self.assertTemplateUsed(
-                    response, template, self.INCORRECT_TEMPLATE
+                    response, url_item['template'], self.INCORRECT_TEMPLATE
                 )
 
+    def test_page_budgets(self):
+        self.check_budgets_growth(self.urls, 'link')
+
 
 class AppViewsTestBase(AppTestBase):
 
@@ -106,6 +265,9 @@ class AppViewsTestBase(AppTestBase):
                                 PAGINATOR_PAGE_SIZE
                             )
 
+    def test_view_budgets(self):
+        self.check_budgets_growth(self.test_config, 'url')
+
     def test_object_in_query_set(self):
 
         for config_item in self.test_config:
@@ -0,0 +1,96 @@
+""" Background generation of sorl thumbnails off the request path. """
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from yatube.settings import THUMBNAIL_WORKERS
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def get_executor():
+    """ Return the process wide thumbnail worker pool. """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=THUMBNAIL_WORKERS,
+                thread_name_prefix="thumbnails"
+            )
+    return _executor
+
+
+def cached_thumbnail(file_, geometry_string, **options):
+    """
+    Return the thumbnail if it is already generated, None otherwise.
+    Mirrors the lookup part of 'ThumbnailBackend.get_thumbnail'.
+    """
+    backend = default.backend
+    source = ImageFile(file_)
+
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault("format", backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+
+    name = backend._get_thumbnail_filename(source, geometry_string, options)
+    return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def generate_thumbnails(name, geometries, callback=None):
+    """
+    Generate thumbnails of the image 'name' for all the geometries and
+    call 'callback' when they are ready.
+    """
+    close_old_connections()
+    try:
+        for geometry_string, options in geometries:
+            get_thumbnail(name, geometry_string, **options)
+        if callback is not None:
+            callback()
+    except Exception:
+        logger.exception("Thumbnail generation failed for '%s'", name)
+    finally:
+        with _pending_lock:
+            _pending.discard(name)
+        close_old_connections()
+
+
+def schedule_thumbnails(file_, geometries, callback=None):
+    """
+    Queue generation of the image thumbnails after the current transaction
+    commits. Generation runs inline when 'THUMBNAIL_WORKERS' is 0.
+    """
+    name = getattr(file_, "name", file_)
+    if not name:
+        return
+
+    def submit():
+        with _pending_lock:
+            if name in _pending:
+                return
+            _pending.add(name)
+
+        if THUMBNAIL_WORKERS:
+            get_executor().submit(generate_thumbnails, name, geometries,
+                                  callback)
+        else:
+            generate_thumbnails(name, geometries, callback)
+
+    transaction.on_commit(submit)
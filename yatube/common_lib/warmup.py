@@ -0,0 +1,66 @@
+"""
+Startup warm-up of template engines with cached loaders, called by
+'yatube/wsgi.py' and 'yatube/asgi.py' before the first request.
+"""
+
+import os
+
+from django.conf import settings
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+
+
+def project_template_dirs(loaders):
+    """
+    Return template directories of 'loaders' inside the project, like
+    'templates/' and the app 'templates/includes' directories, skipping
+    the ones of installed third-party packages.
+    """
+    dirs = []
+    for loader in loaders:
+        for directory in loader.get_dirs():
+            directory = os.path.abspath(directory)
+            if (directory.startswith(settings.BASE_DIR + os.sep)
+                    and os.path.isdir(directory) and directory not in dirs):
+                dirs.append(directory)
+    return dirs
+
+
+def template_names(dirs):
+    """
+    Yield names of the files of 'dirs' relative to their directory.
+    Subdirectories that are template directories themselves, like
+    'templates/includes', are left to their own names.
+    """
+    for directory in dirs:
+        for root, subdirs, files in os.walk(directory):
+            subdirs[:] = sorted(
+                name for name in subdirs
+                if not name.startswith(".")
+                and os.path.join(root, name) not in dirs
+            )
+            for name in sorted(files):
+                yield os.path.relpath(os.path.join(root, name), directory)
+
+
+def warm_templates():
+    """
+    Compile every project template into the cached loaders of Django
+    template engines and return the number of templates. Engines without
+    a cached loader are skipped, compiling would not be kept there.
+    """
+    count = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for loader in engine.engine.template_loaders:
+            if not isinstance(loader, CachedLoader):
+                continue
+            names = dict.fromkeys(
+                template_names(project_template_dirs(loader.loaders))
+            )
+            for name in names:
+                engine.engine.get_template(name)
+            count += len(names)
+    return count
@@ -1,20 +1,86 @@
 """ Admin models for 'posts' application. """
 
+from datetime import datetime
+
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.utils import timezone
+
+from common_lib.paginators import EstimatedCountPaginator
 
+from . import search
 from .models import Group, Post
 
 
+class PubDateYearFilter(admin.SimpleListFilter):
+    """
+    Filter posts by year of publication over the 'pub_date' index. Years
+    from the first to the last post are offered, both ends are read with
+    'ORDER BY pub_date LIMIT 1' queries, a year is a 'pub_date' range.
+    Replaces 'date_hierarchy', which scans the whole table for its
+    'MIN/MAX' and 'DISTINCT' date queries.
+    """
+    title = "год публикации"
+    parameter_name = "year"
+
+    def lookups(self, request, model_admin):
+        dates = (model_admin.get_queryset(request)
+                            .order_by("pub_date")
+                            .values_list("pub_date", flat=True))
+        first, last = dates.first(), dates.last()
+        if first is None:
+            return []
+        years = range(timezone.localtime(last).year,
+                      timezone.localtime(first).year - 1, -1)
+        return [(str(year), str(year)) for year in years]
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        try:
+            year = int(self.value())
+            start, end = (timezone.make_aware(datetime(year, 1, 1)),
+                          timezone.make_aware(datetime(year + 1, 1, 1)))
+        except (ValueError, OverflowError) as e:
+            raise IncorrectLookupParameters(e)
+        return queryset.filter(pub_date__gte=start, pub_date__lt=end)
+
+
 class PostAdmin(admin.ModelAdmin):
     """
     Encapsulate admin options and functionality
     for :model:posts.Post.
     """
-    list_display = ("text", "pub_date", "author")
+    list_display = ("text", "pub_date", "author", "group")
+    list_select_related = ("author", "group")
     search_fields = ("text",)
-    list_filter = ("pub_date",)
+    # date ranges, filtered over the 'pub_date' index
+    list_filter = (PubDateYearFilter, "pub_date")
+    autocomplete_fields = ("author", "group")
     empty_value_display = "-пусто-"
 
+    # Large table: estimate the total instead of counting it
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search post texts in the full-text index instead of
+        a 'LIKE' scan of the whole table.
+        """
+        if not search_term or not search.is_available():
+            return super().get_search_results(request, queryset,
+                                              search_term)
+        if not search.match_expression(search_term):
+            return queryset.none(), False
+
+        # 'pk__in=RawSQL(...)' would be wrapped into a scalar subquery
+        sql, params = search.matching_posts_sql(search_term)
+        table = queryset.model._meta.db_table
+        queryset = queryset.extra(where=[f'"{table}"."id" IN ({sql})'],
+                                  params=params)
+        return queryset, False
+
 
 class GroupAdmin(admin.ModelAdmin):
     """
@@ -22,10 +88,13 @@ class GroupAdmin(admin.ModelAdmin):
     for :model:posts.Group.
     """
     list_display = ("title", "slug")
-    search_fields = ("slug",)
-    list_filter = ("title",)
+    search_fields = ("title", "slug")
+    ordering = ("slug",)
     empty_value_display = "-пусто-"
 
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
@@ -0,0 +1,202 @@
+"""
+Read-only JSON API over the feeds and post pages of 'posts' application.
+
+Views reuse querysets and feed filters of :class:'PostsListView' and
+:class:'PostDetailView'. The 'fields' query string parameter selects
+serialized fields and narrows the SQL projection, relations, the comment
+count subquery and comments prefetch to what the fields need.
+"""
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import conditional_page
+
+from common_lib.paginators import CursorPaginator, InvalidCursor
+from yatube.settings import COMMENTS_PREVIEW_SIZE
+
+from .models import Group, Post
+from .views import (PostDetailView, PostsListView, User,
+                    comment_count_annotation, comments_prefetch)
+
+# Columns of every serialized field, 'id' and 'pub_date' are always
+# loaded for cursors.
+FIELDS = {
+    "id": (),
+    "pub_date": (),
+    "text": ("text",),
+    "author": ("author_id", "author__id", "author__username"),
+    "group": ("group_id", "group__id", "group__title", "group__slug"),
+    "image": ("image",),
+    "comment_count": (),
+    "comments": (),
+}
+RELATIONS = ("author", "group")
+
+LIST_FIELDS = ("id", "pub_date", "text", "author", "group", "image",
+               "comment_count")
+DETAIL_FIELDS = LIST_FIELDS + ("comments",)
+
+JSON_PARAMS = {"separators": (",", ":"), "ensure_ascii": False}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(value, default):
+    """ Return requested field names of a 'fields' parameter value. """
+    if not value:
+        return default
+    fields = tuple(dict.fromkeys(
+        name.strip() for name in value.split(",") if name.strip()
+    ))
+    if not fields:
+        raise InvalidFields("Не указаны поля")
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown:
+        raise InvalidFields(f"Неизвестные поля: {', '.join(unknown)}")
+    return fields
+
+
+def serialize_comment(comment):
+    return {
+        "id": comment.pk,
+        "author": comment.author.username,
+        "text": comment.text,
+        "created": comment.created,
+    }
+
+
+def serialize_post(post, fields):
+    """ Return a dict with 'fields' of the post. """
+    values = {
+        "id": lambda: post.pk,
+        "pub_date": lambda: post.pub_date,
+        "text": lambda: post.text,
+        "author": lambda: post.author.username,
+        "group": lambda: (
+            {"slug": post.group.slug, "title": post.group.title}
+            if post.group_id else None
+        ),
+        "image": lambda: post.image.url if post.image else None,
+        "comment_count": lambda: post.comment_count,
+        "comments": lambda: [serialize_comment(comment)
+                             for comment in post.comments_list],
+    }
+    return {name: values[name]() for name in fields}
+
+
+def error_response(message, status):
+    return JsonResponse({"detail": message}, status=status,
+                        json_dumps_params=JSON_PARAMS)
+
+
+class PostsApiMixin:
+    """
+    Build posts querysets with the projection of requested fields and
+    answer with compact JSON. Responses to anonymous users are cached
+    like pages, every response gets an ETag.
+    """
+    default_fields = LIST_FIELDS
+    comments_limit = None
+
+    def get_posts_queryset(self):
+        columns = [column for name in self.fields for column in FIELDS[name]]
+        queryset = Post.objects.only("id", "pub_date", *columns)
+
+        relations = [name for name in RELATIONS if name in self.fields]
+        if relations:
+            queryset = queryset.select_related(*relations)
+        if "comment_count" in self.fields:
+            queryset = queryset.annotate(
+                comment_count=comment_count_annotation()
+            )
+        if "comments" in self.fields:
+            queryset = queryset.prefetch_related(
+                comments_prefetch(limit=self.comments_limit)
+            )
+        return queryset
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            self.fields = parse_fields(request.GET.get("fields"),
+                                       self.default_fields)
+        except InvalidFields as e:
+            return error_response(str(e), 400)
+        response = super().dispatch(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, max_age=0,
+                                must_revalidate=True)
+        return response
+
+    def json_response(self, data):
+        return JsonResponse(data, encoder=DjangoJSONEncoder,
+                            json_dumps_params=JSON_PARAMS)
+
+
+@method_decorator(conditional_page, name="dispatch")
+class PostsListApiView(PostsApiMixin, PostsListView):
+    """ Cursor paginated posts of the index, group, profile or follow feed. """
+    follow_feed = False
+    comments_limit = COMMENTS_PREVIEW_SIZE
+
+    def is_follow_feed(self):
+        return self.follow_feed
+
+    def get(self, request, *args, **kwargs):
+        if self.follow_feed and not request.user.is_authenticated:
+            return error_response("Требуется авторизация", 401)
+
+        paginator = CursorPaginator(self.get_queryset(), self.paginate_by)
+        try:
+            page = paginator.page(
+                after=request.GET.get(paginator.after_kwarg),
+                before=request.GET.get(paginator.before_kwarg)
+            )
+        except InvalidCursor as e:
+            return error_response(str(e), 400)
+
+        if not page.object_list and not self.feed_exists():
+            return error_response("Лента не найдена", 404)
+
+        return self.json_response({
+            "results": [serialize_post(post, self.fields) for post in page],
+            "next": self.page_link(paginator.after_kwarg, page.next_cursor),
+            "previous": self.page_link(paginator.before_kwarg,
+                                       page.previous_cursor),
+        })
+
+    def feed_exists(self):
+        """ Tell if the group or the author of an empty feed exists. """
+        if self.kwargs.get("slug"):
+            return Group.objects.filter(slug=self.kwargs["slug"]).exists()
+        if self.kwargs.get("username"):
+            return User.objects.filter(
+                username=self.kwargs["username"]
+            ).exists()
+        return True
+
+    def page_link(self, kwarg, cursor):
+        if cursor is None:
+            return None
+        params = self.request.GET.copy()
+        for name in (CursorPaginator.after_kwarg,
+                     CursorPaginator.before_kwarg):
+            params.pop(name, None)
+        params[kwarg] = cursor
+        return f"{self.request.path}?{params.urlencode()}"
+
+
+@method_decorator(conditional_page, name="dispatch")
+class PostDetailApiView(PostsApiMixin, PostDetailView):
+    """ A single post with all its comments. """
+    default_fields = DETAIL_FIELDS
+
+    def get(self, request, *args, **kwargs):
+        try:
+            post = self.get_object()
+        except Http404:
+            return error_response("Пост не найден", 404)
+        return self.json_response(serialize_post(post, self.fields))
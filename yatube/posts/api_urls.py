@@ -0,0 +1,17 @@
+""" Url pathes of JSON API of 'posts' application. """
+
+from django.urls import path
+
+from .api import PostDetailApiView as PostDetail
+from .api import PostsListApiView as PostsList
+
+app_name = "api"
+
+urlpatterns = [
+    path("posts/", PostsList.as_view(), name="index"),
+    path("follow/", PostsList.as_view(follow_feed=True),
+         name="follow_index"),
+    path("group/<slug:slug>/", PostsList.as_view(), name="group"),
+    path("<str:username>/", PostsList.as_view(), name="profile"),
+    path("<str:username>/<int:post_id>/", PostDetail.as_view(), name="post"),
+]
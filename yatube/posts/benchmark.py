@@ -0,0 +1,99 @@
+""" Synthetic data of 'posts' application for benchmarks. """
+
+import random
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+USERNAME_PREFIX = "bench_user_"
+GROUP_SLUG_PREFIX = "bench-group-"
+
+# Follows of the first seeded user, who reads the follow feed.
+READER_FOLLOWS = 50
+
+
+def spread_dates(queryset, field, rng, days=365):
+    """ Give rows of 'queryset' random dates over the last 'days' days. """
+    now = timezone.now()
+    objs = list(queryset.only("pk"))
+    for obj in objs:
+        setattr(obj, field, now - timedelta(seconds=rng.randrange(
+            days * 24 * 60 * 60
+        )))
+    queryset.model.objects.bulk_update(objs, [field], batch_size=500)
+
+
+def seed_data(users=200, groups=20, posts=5000, comments=20000,
+              follows=2000, seed=0):
+    """
+    Bulk create reproducible users, groups, posts, comments and follows,
+    then rebuild denormalized counters and follow feeds. Batch sizes
+    are left to the database backend.
+    """
+    rng = random.Random(seed)
+
+    with transaction.atomic():
+        User.objects.bulk_create(
+            (User(username=f"{USERNAME_PREFIX}{i}", password="!")
+             for i in range(users))
+        )
+        user_ids = list(
+            User.objects.filter(username__startswith=USERNAME_PREFIX)
+                        .order_by("pk")
+                        .values_list("pk", flat=True)
+        )
+
+        Group.objects.bulk_create(
+            (Group(title=f"Группа {i}", slug=f"{GROUP_SLUG_PREFIX}{i}",
+                   description=f"Описание группы {i}")
+             for i in range(groups))
+        )
+        group_ids = list(
+            Group.objects.filter(slug__startswith=GROUP_SLUG_PREFIX)
+                         .values_list("pk", flat=True)
+        )
+
+        Post.objects.bulk_create(
+            (Post(text=f"Текст поста {i} " * rng.randint(1, 20),
+                  author_id=rng.choice(user_ids),
+                  group_id=rng.choice(group_ids + [None]))
+             for i in range(posts))
+        )
+        seeded_posts = Post.objects.filter(author_id__in=user_ids)
+        spread_dates(seeded_posts, "pub_date", rng)
+        post_ids = list(seeded_posts.values_list("pk", flat=True))
+
+        if post_ids:
+            Comment.objects.bulk_create(
+                (Comment(text=f"Текст комментария {i}",
+                         post_id=rng.choice(post_ids),
+                         author_id=rng.choice(user_ids))
+                 for i in range(comments))
+            )
+            spread_dates(Comment.objects.filter(post_id__in=post_ids),
+                         "created", rng)
+
+        pairs = {(user_ids[0], author_id)
+                 for author_id in user_ids[1:READER_FOLLOWS + 1]}
+        limit = min(follows, len(user_ids) * (len(user_ids) - 1))
+        while len(pairs) < limit:
+            user_id, author_id = rng.sample(user_ids, 2)
+            pairs.add((user_id, author_id))
+        Follow.objects.bulk_create(
+            (Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in pairs)
+        )
+
+        # bulk_create skips signals, rebuild what they maintain
+        call_command("rebuild_user_stats", stdout=StringIO())
+        call_command("rebuild_timelines", stdout=StringIO())
+
+    return user_ids
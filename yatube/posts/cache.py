@@ -0,0 +1,67 @@
+""" Cache generation scopes of 'posts' application. """
+
+from django.urls import reverse
+
+# Bumped on every change of posts and comments.
+POSTS_SCOPE = "posts"
+
+
+def group_scope(slug):
+    return f"{POSTS_SCOPE}:group:{slug}"
+
+
+def author_scope(username):
+    return f"{POSTS_SCOPE}:author:{username}"
+
+
+def post_scope(pk):
+    """ Version of the cached card of a post, see 'posts.cards'. """
+    return f"{POSTS_SCOPE}:post:{pk}"
+
+
+def group_cards_scope(group_id):
+    """ Version of the cached cards of all posts of a group. """
+    return f"{POSTS_SCOPE}:group-cards:{group_id}"
+
+
+def follow_scope(user_id):
+    """ Follow feed of a user, bumped when the user follows or unfollows. """
+    return f"{POSTS_SCOPE}:follow:{user_id}"
+
+
+def feed_scopes(post):
+    """ Return scopes of the index, author and group feeds of the post. """
+    return named_feed_scopes(post.author.username,
+                             post.group.slug if post.group_id else None)
+
+
+def named_feed_scopes(username, slug=None):
+    """ Return feed scopes of a post by author username and group slug. """
+    scopes = [POSTS_SCOPE, author_scope(username)]
+    if slug:
+        scopes.append(group_scope(slug))
+    return scopes
+
+
+def post_scopes(post):
+    """
+    Return generation scopes of all the feeds showing the post and of
+    the post card.
+    """
+    return feed_scopes(post) + [post_scope(post.pk)]
+
+
+def page_scopes(request, *args, **kwargs):
+    """ Return generation scopes of a 'posts' page by its url kwargs. """
+    if kwargs.get("slug"):
+        return [group_scope(kwargs.get("slug"))]
+
+    if kwargs.get("username"):
+        return [author_scope(kwargs.get("username"))]
+
+    # new posts of followed authors bump the posts scope
+    if (request.path == reverse("follow_index")
+            and request.user.is_authenticated):
+        return [POSTS_SCOPE, follow_scope(request.user.pk)]
+
+    return [POSTS_SCOPE]
@@ -0,0 +1,90 @@
+"""
+Cache of rendered feed cards of :model:'posts.Post'.
+
+A card is 'post_card.html' rendered without the user, split around the
+slot of the user specific part into 'head' and 'tail'. It is stored
+under the post id with its version: generations of the post scope,
+bumped on post edit and on comment changes, and of the group cards
+scope, bumped on group changes. Cards of a page and their versions are
+read with a single 'get_many'.
+"""
+
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from common_lib.cache import CacheStats, generation_key, get_generations
+from common_lib.routers import may_fill_cache
+from yatube.settings import POSTS_CACHE_TIMEOUT
+
+from .cache import group_cards_scope, post_scope
+
+CARD_KEY_PREFIX = "post_card"
+CARD_TEMPLATE = "post_card.html"
+CARD_SLOT = mark_safe("<!-- post card slot -->")
+
+Card = namedtuple("Card", ("head", "tail"))
+
+# Statistics of cached cards in this process.
+card_stats = CacheStats()
+
+
+def card_key(pk):
+    return f"{CARD_KEY_PREFIX}:{pk}"
+
+
+def card_scopes(post):
+    scopes = [post_scope(post.pk)]
+    if post.group_id:
+        scopes.append(group_cards_scope(post.group_id))
+    return scopes
+
+
+def render_card(post):
+    """
+    Return '(head, tail)' of the post card, the post needs 'comment_count'
+    and 'comments_list' of the feed queryset.
+    """
+    head, tail = render_to_string(CARD_TEMPLATE, {
+        "post": post,
+        "card_slot": CARD_SLOT,
+    }).split(CARD_SLOT)
+    return head, tail
+
+
+def attach_cards(posts):
+    """
+    Set 'cached_card' of the posts to their cards, rendering and caching
+    missing and outdated ones.
+    """
+    scopes = {post.pk: card_scopes(post) for post in posts}
+    version_keys = {generation_key(scope): scope
+                    for post_scopes in scopes.values()
+                    for scope in post_scopes}
+    values = cache.get_many([card_key(pk) for pk in scopes]
+                            + list(version_keys))
+
+    missing = [scope for key, scope in version_keys.items()
+               if key not in values]
+    if missing:
+        for scope, value in zip(missing, get_generations(missing)):
+            values[generation_key(scope)] = value
+
+    rendered = {}
+    for post in posts:
+        version = [values[generation_key(scope)]
+                   for scope in scopes[post.pk]]
+        cached = values.get(card_key(post.pk))
+        if cached is not None and cached[0] == version:
+            card_stats.hit()
+            head, tail = cached[1:]
+        else:
+            card_stats.miss()
+            head, tail = render_card(post)
+            rendered[card_key(post.pk)] = (version, head, tail)
+        post.cached_card = Card(mark_safe(head), mark_safe(tail))
+
+    if rendered and may_fill_cache():
+        cache.set_many(rendered, POSTS_CACHE_TIMEOUT)
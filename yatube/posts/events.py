@@ -0,0 +1,184 @@
+"""
+Live updates of feeds and post pages over server-sent events.
+
+New posts and comment counts are published to the broker of
+:mod:'common_lib.pubsub' by signals in 'posts.models' after commit.
+:func:'event_stream' is the ASGI endpoint streaming them to open pages,
+it is routed in 'yatube/asgi.py'. Under WSGI the same URL answers 204,
+which tells 'EventSource' not to reconnect.
+
+Query string parameters of the stream:
+  feed  - 'index' for every new post, 'follow' for posts of authors
+          followed by the session user, omitted for no posts;
+  posts - comma separated ids of posts on the page, their comment
+          counts are sent when comments are added.
+"""
+
+import asyncio
+import json
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import connection
+from django.http import HttpRequest
+
+from common_lib.asgi import (cookies, query_params, sse_message,
+                             wait_for_disconnect)
+from common_lib.pubsub import get_broker
+
+CHANNEL = "posts"
+FEEDS = ("index", "follow")
+# 'EventSource' reconnection delay
+RETRY_MS = 5000
+# Comment counts are sent for at most this number of posts of a page.
+MAX_POSTS = 100
+
+
+def publish_post(post):
+    broker = get_broker()
+    if broker.has_subscribers(CHANNEL):
+        broker.publish(CHANNEL, {"type": "post", "id": post.pk,
+                                 "author_id": post.author_id})
+
+
+def publish_comment_count(comment):
+    broker = get_broker()
+    # no count query in processes without listeners, like WSGI ones
+    if broker.has_subscribers(CHANNEL):
+        count = type(comment).objects.filter(post_id=comment.post_id).count()
+        broker.publish(CHANNEL, {"type": "comments",
+                                 "post_id": comment.post_id,
+                                 "comment_count": count})
+
+
+def followed_authors(session_key):
+    """
+    Return ids of authors followed by the user of the session or None
+    for an anonymous session. Runs in a worker thread.
+    """
+    from .models import Follow
+
+    request = HttpRequest()
+    engine = import_module(settings.SESSION_ENGINE)
+    request.session = engine.SessionStore(session_key)
+    try:
+        user = get_user(request)
+        if not user.is_authenticated:
+            return None
+        return set(Follow.objects.filter(user=user)
+                                 .values_list("author_id", flat=True))
+    finally:
+        connection.close()
+
+
+def event_message(event, feed, authors, post_ids):
+    """ Return the message of a published event for a stream or None. """
+    if event["type"] == "post":
+        if feed == "index" or (feed == "follow"
+                               and event["author_id"] in authors):
+            return sse_message("post", json.dumps({"id": event["id"]}))
+    elif event["post_id"] in post_ids:
+        return sse_message("comments", json.dumps({
+            "post_id": event["post_id"],
+            "comment_count": event["comment_count"],
+        }))
+    return None
+
+
+def stream_params(params):
+    """
+    Return the feed and the set of post ids of stream query 'params',
+    raise ValueError with the error text for invalid ones.
+    """
+    feed = params.get("feed")
+    try:
+        post_ids = {int(pk) for pk in params.get("posts", "").split(",")
+                    if pk}
+    except ValueError:
+        raise ValueError("Неверный список постов")
+    if feed is not None and feed not in FEEDS:
+        raise ValueError("Неизвестная лента")
+    if len(post_ids) > MAX_POSTS:
+        raise ValueError("Слишком много постов")
+    return feed, post_ids
+
+
+async def session_followed_authors(scope):
+    """
+    Return ids of authors followed by the session user of the stream or
+    None for an anonymous one. They are read once, new follows apply on
+    reconnect.
+    """
+    session_key = cookies(scope).get(settings.SESSION_COOKIE_NAME)
+    return await asyncio.get_running_loop().run_in_executor(
+        None, followed_authors, session_key
+    )
+
+
+async def send_error(send, status, text):
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"text/plain; charset=utf-8")]})
+    await send({"type": "http.response.body", "body": text.encode()})
+
+
+async def send_events(send, subscription, feed, authors, post_ids):
+    """ Send the stream response with events of 'subscription'. """
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"),
+                    # no response buffering in nginx
+                    (b"x-accel-buffering", b"no"),
+                ]})
+    await send({"type": "http.response.body",
+                "body": f"retry: {RETRY_MS}\n\n".encode(),
+                "more_body": True})
+    while True:
+        try:
+            event = await asyncio.wait_for(
+                subscription.get(), settings.EVENTS_KEEPALIVE_SECONDS
+            )
+        except asyncio.TimeoutError:
+            message = sse_message(comment="keepalive")
+        else:
+            message = event_message(event, feed, authors, post_ids)
+        if message is not None:
+            await send({"type": "http.response.body", "body": message,
+                        "more_body": True})
+
+
+async def event_stream(scope, receive, send):
+    """
+    Stream events until the client disconnects. An idle stream is two
+    waiting tasks and a queue, with no thread, so a process holds
+    thousands of them; comment lines every 'EVENTS_KEEPALIVE_SECONDS'
+    keep proxies from closing it.
+    """
+    try:
+        feed, post_ids = stream_params(query_params(scope))
+    except ValueError as error:
+        return await send_error(send, 400, str(error))
+
+    authors = None
+    if feed == "follow":
+        authors = await session_followed_authors(scope)
+        if authors is None:
+            return await send_error(send, 403, "Требуется авторизация")
+
+    subscription = get_broker().subscribe(CHANNEL, settings.EVENTS_QUEUE_SIZE)
+
+    streaming = asyncio.ensure_future(
+        send_events(send, subscription, feed, authors, post_ids)
+    )
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await asyncio.wait((streaming, disconnected),
+                           return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        subscription.close()
+        streaming.cancel()
+        disconnected.cancel()
+    if streaming.done() and not streaming.cancelled():
+        # an error of 'send', the stream never ends by itself
+        streaming.result()
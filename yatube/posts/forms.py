@@ -2,6 +2,9 @@
 
 from django.forms import ModelForm
 
+from common_lib.images import normalize_upload
+from yatube.settings import IMAGE_UPLOAD_MAX_EDGE
+
 from .models import Post, Comment
 
 
@@ -20,6 +23,10 @@ class PostForm(ModelForm):
             "image": "Картинку выбирать не обязательно.",
         }
 
+    def clean_image(self):
+        return normalize_upload(self.cleaned_data.get("image"),
+                                IMAGE_UPLOAD_MAX_EDGE)
+
 
 class CommentForm(ModelForm):
     """ModelForm class for :model:'posts.Comment'. """
@@ -0,0 +1,211 @@
+""" Benchmark concurrent writes and reads under SQLite database profiles. """
+
+import logging
+import random
+import tempfile
+import threading
+import time
+from os import path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import override_settings
+from django.urls import reverse
+
+from common_lib.benchmark import WSGIClient, percentiles, write_results
+from posts.benchmark import seed_data
+from posts.models import Post
+from yatube.settings_production import SQLITE_PRAGMAS as PRODUCTION_PRAGMAS
+
+User = get_user_model()
+
+# Database settings compared by the benchmark: SQLite defaults with
+# a connection per request against the production profile.
+PROFILES = {
+    "default": {
+        "SQLITE_PRAGMAS": {"journal_mode": "DELETE", "synchronous": "FULL"},
+        "DATABASE_LOCKED_RETRIES": 0,
+        "CONN_MAX_AGE": 0,
+    },
+    "production": {
+        "SQLITE_PRAGMAS": PRODUCTION_PRAGMAS,
+        "DATABASE_LOCKED_RETRIES": 5,
+        "CONN_MAX_AGE": 60,
+    },
+}
+
+# Requests of every writer in turn, the follows go to a random author.
+WRITES = ("add_comment", "profile_follow", "profile_unfollow", "post_new")
+READS = ("post", "index")
+
+
+class Command(BaseCommand):
+    help = ("Run concurrent writer and reader threads against a temporary "
+            "SQLite file database under the default and production "
+            "database profiles and report throughput, latency and errors.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=100,
+                            help="Requests made by every thread.")
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--posts", type=int, default=1000)
+        parser.add_argument(
+            "--profile", action="append", dest="profiles",
+            choices=list(PROFILES), metavar="NAME",
+            help="Run only this profile, may be repeated."
+        )
+        parser.add_argument("--output", default="benchmark_concurrency.json",
+                            help="Path of the JSON results file.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Database profiles are SQLite specific.")
+        if options["users"] < options["writers"] + options["readers"] + 1:
+            raise CommandError("Every thread needs its own seeded user.")
+
+        test_settings = connection.settings_dict["TEST"]
+        old_name, old_test_name = (connection.settings_dict["NAME"],
+                                   test_settings["NAME"])
+        with tempfile.TemporaryDirectory() as directory:
+            # WAL needs a file, the default test database is in memory
+            test_settings["NAME"] = path.join(directory, "benchmark.sqlite3")
+            connection.creation.create_test_db(verbosity=0, serialize=False)
+            try:
+                document = self.run(options)
+            finally:
+                connections.close_all()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                test_settings["NAME"] = old_test_name
+
+        for result in document["results"]:
+            self.stdout.write(
+                "{profile:<11} {kind:<6} {throughput:>8.1f} req/s "
+                "p50 {p50_ms:>8.2f}ms p95 {p95_ms:>8.2f}ms "
+                "p99 {p99_ms:>8.2f}ms {errors:>4} errors".format(**result)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Results written to {options['output']}."
+        ))
+
+    def run(self, options):
+        threads = options["writers"] + options["readers"]
+        user_ids = seed_data(users=options["users"], posts=options["posts"],
+                             comments=0, follows=0)
+        users = list(User.objects.filter(pk__in=user_ids).order_by("pk"))
+        posts = list(Post.objects.select_related("author")
+                                 .order_by("?")[:100])
+        post_kwargs = [{"username": post.author.username, "post_id": post.pk}
+                       for post in posts]
+        clients = [WSGIClient(user) for user in users[1:threads + 1]]
+        # author followed and unfollowed by every writer
+        author = users[0].username
+
+        results = []
+        for name in options["profiles"] or PROFILES:
+            profile = PROFILES[name]
+            connections.close_all()
+            cache.clear()
+            connection.settings_dict["CONN_MAX_AGE"] = profile["CONN_MAX_AGE"]
+            with override_settings(
+                SQLITE_PRAGMAS=profile["SQLITE_PRAGMAS"],
+                DATABASE_LOCKED_RETRIES=profile["DATABASE_LOCKED_RETRIES"],
+            ):
+                samples = self.load(clients, options["writers"],
+                                    options["requests"], post_kwargs, author)
+            connections.close_all()
+            results.extend(self.summarize(name, samples))
+
+        return write_results(
+            options["output"], results,
+            options={key: options[key] for key in
+                     ("writers", "readers", "requests", "users", "posts")},
+            profiles=PROFILES,
+        )
+
+    @staticmethod
+    def requests(kind, index, count, post_kwargs, author):
+        """ Yield '(method, url, data)' of requests of a thread. """
+        rng = random.Random(index)
+        for number in range(count):
+            if kind == "read":
+                name = READS[number % len(READS)]
+            else:
+                name = WRITES[number % len(WRITES)]
+            kwargs = rng.choice(post_kwargs)
+            if name in ("post", "add_comment"):
+                url = reverse(name, kwargs=kwargs)
+            elif name in ("profile_follow", "profile_unfollow"):
+                url = reverse(name, kwargs={"username": author})
+            else:
+                url = reverse(name)
+            if name == "add_comment":
+                yield "POST", url, {"text": f"Комментарий {number}"}
+            elif name == "post_new":
+                yield "POST", url, {"text": f"Пост бенчмарка {number}"}
+            else:
+                yield "GET", url, None
+
+    def load(self, clients, writers, count, post_kwargs, author):
+        """ Run all threads at once, return '(kind, ms, status)' samples. """
+        samples = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(clients))
+
+        def worker(index, client):
+            kind = "write" if index < writers else "read"
+            requests = list(self.requests(kind, index, count, post_kwargs,
+                                          author))
+            local = []
+            barrier.wait()
+            try:
+                for method, url, data in requests:
+                    start = time.perf_counter()
+                    status = client.request(method, url, data)
+                    local.append((kind, (time.perf_counter() - start) * 1000,
+                                  status))
+            finally:
+                connections.close_all()
+            with lock:
+                samples.extend(local)
+
+        # failed requests are counted, not logged with tracebacks
+        request_logger = logging.getLogger("django.request")
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        started = time.perf_counter()
+        try:
+            threads = [threading.Thread(target=worker, args=(index, client))
+                       for index, client in enumerate(clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            request_logger.setLevel(level)
+        self.elapsed = time.perf_counter() - started
+        return samples
+
+    def summarize(self, profile, samples):
+        results = []
+        for kind in ("write", "read"):
+            timings = [ms for sample_kind, ms, _ in samples
+                       if sample_kind == kind]
+            if not timings:
+                continue
+            p50, p95, p99 = percentiles(timings)
+            results.append({
+                "profile": profile,
+                "kind": kind,
+                "requests": len(timings),
+                "throughput": round(len(timings) / self.elapsed, 1),
+                "p50_ms": round(p50, 3),
+                "p95_ms": round(p95, 3),
+                "p99_ms": round(p99, 3),
+                "errors": sum(1 for sample_kind, _, status in samples
+                              if sample_kind == kind and status >= 500),
+            })
+        return results
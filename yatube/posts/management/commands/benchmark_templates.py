@@ -0,0 +1,119 @@
+""" Benchmark feed rendering with and without cached template loaders. """
+
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.template import engines
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from common_lib.benchmark import percentiles, write_results
+from common_lib.warmup import warm_templates
+from posts.benchmark import seed_data
+from posts.views import PostsListView
+from yatube.settings_production import TEMPLATES as PRODUCTION_TEMPLATES
+
+# Template settings compared by the benchmark, the production profile is
+# warmed up before it is measured.
+PROFILES = {
+    "default": settings.TEMPLATES,
+    "production": PRODUCTION_TEMPLATES,
+}
+
+# Fragments are not cached, every render runs the whole feed template.
+NO_CACHE = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+    }
+}
+
+
+class Command(BaseCommand):
+    help = ("Render the first page of the index feed from a prepared "
+            "context under the default and production template settings "
+            "and report render time percentiles as JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=100)
+        parser.add_argument("--comments", type=int, default=500)
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--output", default="benchmark_templates.json",
+                            help="Path of the JSON results file.")
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            document = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for result in document["results"]:
+            self.stdout.write(
+                "{profile:<11} p50 {p50_ms:>8.2f}ms p95 {p95_ms:>8.2f}ms "
+                "p99 {p99_ms:>8.2f}ms warm-up {warmup_ms:>8.2f}ms "
+                "({templates} templates)".format(**result)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Results written to {options['output']}."
+        ))
+
+    def run(self, options):
+        seed_data(users=20, groups=5, posts=options["posts"],
+                  comments=options["comments"], follows=0)
+
+        results = []
+        for name, templates in PROFILES.items():
+            with override_settings(TEMPLATES=templates, CACHES=NO_CACHE):
+                results.append(self.measure(name, options["iterations"]))
+
+        return write_results(
+            options["output"], results,
+            options={key: options[key] for key in
+                     ("posts", "comments", "iterations")},
+        )
+
+    @staticmethod
+    def feed_response():
+        """
+        Return the unrendered index response with its posts loaded, so
+        rendering makes no SQL queries.
+        """
+        request = RequestFactory().get(reverse("index"))
+        request.user = AnonymousUser()
+        response = PostsListView.as_view()(request)
+        page = response.context_data["page"]
+        page.object_list = list(page.object_list)
+        page.paginator.count
+        response.context_data["posts"] = page.object_list
+        response.context_data["object_list"] = page.object_list
+        return response
+
+    def measure(self, profile, iterations):
+        start = time.perf_counter()
+        count = warm_templates()
+        warmup = (time.perf_counter() - start) * 1000
+
+        response = self.feed_response()
+        engine = engines["django"]
+        timings = []
+        for _ in range(iterations):
+            # the template is looked up on every request, like the view does
+            start = time.perf_counter()
+            template = engine.get_template(response.template_name[0])
+            template.render(response.context_data, response._request)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        p50, p95, p99 = percentiles(timings)
+        return {
+            "profile": profile,
+            "iterations": iterations,
+            "p50_ms": round(p50, 3),
+            "p95_ms": round(p95, 3),
+            "p99_ms": round(p99, 3),
+            "warmup_ms": round(warmup, 3),
+            "templates": count,
+        }
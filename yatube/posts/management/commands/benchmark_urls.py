@@ -0,0 +1,142 @@
+""" Benchmark named URLs of 'posts' application on synthetic data. """
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.urls import reverse
+
+from common_lib.benchmark import WSGIClient, measure, write_results
+from posts.benchmark import seed_data
+from posts.models import Group, Post
+
+User = get_user_model()
+
+# (url name, HTTP method, clients) of benchmarked views, 'add_comment'
+# is the last one since it adds a comment on every request.
+SCENARIOS = (
+    ("index", "GET", ("anonymous", "reader")),
+    ("group", "GET", ("anonymous", "reader")),
+    ("profile", "GET", ("anonymous", "reader")),
+    ("post", "GET", ("anonymous", "reader")),
+    ("follow_index", "GET", ("reader",)),
+    ("post_new", "GET", ("reader",)),
+    ("post_edit", "GET", ("reader",)),
+    ("add_comment", "POST", ("reader",)),
+)
+
+
+class Command(BaseCommand):
+    help = ("Seed synthetic data and report latency percentiles, query "
+            "count and peak memory of every named URL as JSON.")
+
+    def add_arguments(self, parser):
+        volumes = parser.add_argument_group("data volumes")
+        volumes.add_argument("--users", type=int, default=200)
+        volumes.add_argument("--groups", type=int, default=20)
+        volumes.add_argument("--posts", type=int, default=5000)
+        volumes.add_argument("--comments", type=int, default=20000)
+        volumes.add_argument("--follows", type=int, default=2000)
+        volumes.add_argument("--seed", type=int, default=0,
+                             help="Random seed of the synthetic data.")
+
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--cold", action="store_true",
+            help="Clear the cache before every measured request."
+        )
+        parser.add_argument(
+            "--url", action="append", dest="urls", metavar="NAME",
+            help="Benchmark only this URL name, may be repeated."
+        )
+        parser.add_argument("--output", default="benchmark.json",
+                            help="Path of the JSON results file.")
+        parser.add_argument(
+            "--in-place", action="store_true",
+            help="Seed the configured database instead of a test database."
+        )
+
+    def handle(self, *args, **options):
+        names = [name for name, _, _ in SCENARIOS]
+        unknown = set(options["urls"] or ()) - set(names)
+        if unknown:
+            raise CommandError(f"Unknown URL names: {', '.join(unknown)}")
+
+        old_name = None
+        if not options["in_place"]:
+            old_name = connection.settings_dict["NAME"]
+            connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            document = self.run(options)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for result in document["results"]:
+            self.stdout.write(
+                "{url:<14} {client:<10} p50 {p50_ms:>8.2f}ms "
+                "p95 {p95_ms:>8.2f}ms p99 {p99_ms:>8.2f}ms "
+                "{queries:>3} queries {peak_memory_kib:>9.1f}KiB".format(
+                    **result
+                )
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Results written to {options['output']}."
+        ))
+
+    def run(self, options):
+        volumes = {key: options[key] for key in
+                   ("users", "groups", "posts", "comments", "follows",
+                    "seed")}
+        user_ids = seed_data(**volumes)
+        if not user_ids:
+            raise CommandError("At least one user is required.")
+
+        reader = User.objects.get(pk=user_ids[0])
+        post = (Post.objects.filter(author=reader)
+                            .annotate(comments_total=Count("comments"))
+                            .order_by("-comments_total")
+                            .first())
+        if post is None:
+            post = Post.objects.create(text="Текст поста", author=reader)
+        group = (Group.objects.annotate(posts_total=Count("posts"))
+                              .order_by("-posts_total")
+                              .first())
+
+        post_kwargs = {"username": reader.username, "post_id": post.pk}
+        kwargs = {
+            "group": {"slug": group.slug} if group else None,
+            "profile": {"username": reader.username},
+            "post": post_kwargs,
+            "post_edit": post_kwargs,
+            "add_comment": post_kwargs,
+        }
+        data = {"add_comment": {"text": "Комментарий бенчмарка"}}
+        clients = {"anonymous": WSGIClient(), "reader": WSGIClient(reader)}
+
+        results = []
+        for name, method, client_names in SCENARIOS:
+            if options["urls"] and name not in options["urls"]:
+                continue
+            if name in kwargs and kwargs[name] is None:
+                continue
+            url = reverse(name, kwargs=kwargs.get(name))
+            for client_name in client_names:
+                cache.clear()
+                result = measure(
+                    clients[client_name], method, url, data.get(name),
+                    iterations=options["iterations"],
+                    warmup=options["warmup"],
+                    before=cache.clear if options["cold"] else None,
+                )
+                results.append({"url": name, "client": client_name,
+                                "method": method, "path": url, **result})
+
+        return write_results(
+            options["output"], results,
+            volumes=volumes,
+            options={key: options[key] for key in
+                     ("iterations", "warmup", "cold")},
+        )
@@ -0,0 +1,35 @@
+""" Export users, groups, posts, comments and follows as JSON Lines. """
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import export_lines
+
+
+class Command(BaseCommand):
+    help = ("Stream users, groups, posts, comments and follows as JSON "
+            "Lines in constant memory, the format read by 'import_posts'.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", nargs="?", default="-",
+                            help="Path of the output file, '-' for stdout.")
+        parser.add_argument("--chunk-size", type=int, default=2000,
+                            help="Rows fetched from the database at once.")
+
+    def handle(self, *args, **options):
+        to_stdout = options["output"] == "-"
+        output = (self.stdout if to_stdout
+                  else open(options["output"], "w", encoding="utf-8"))
+        counts = {}
+        try:
+            for model, line in export_lines(options["chunk_size"]):
+                output.write(line + "\n")
+                counts[model] = counts.get(model, 0) + 1
+        finally:
+            if not to_stdout:
+                output.close()
+
+        summary = ", ".join(f"{model}: {count}"
+                            for model, count in counts.items())
+        # keep stdout clean when it carries the export itself
+        report = self.stderr if to_stdout else self.stdout
+        report.write(f"Exported {summary or 'nothing'}.", self.style.SUCCESS)
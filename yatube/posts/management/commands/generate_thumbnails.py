@@ -0,0 +1,51 @@
+""" Generate missing thumbnails of :model:'posts.Post' images. """
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from common_lib.cache import bump_generation
+from common_lib.thumbnails import generate_thumbnails
+from posts.cache import post_scopes
+from posts.models import Post
+from yatube.settings import POST_THUMBNAIL_GEOMETRIES, THUMBNAIL_WORKERS
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnails of all post images in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=max(THUMBNAIL_WORKERS, 1),
+            help="Number of parallel worker threads."
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=500,
+            help="Posts processed before their pages are invalidated."
+        )
+
+    def handle(self, *args, **options):
+        posts = (Post.objects.exclude(image="")
+                             .exclude(image__isnull=True)
+                             .select_related("author", "group")
+                             .only("id", "image", "group_id", "author_id",
+                                   "author__username", "group__slug"))
+
+        chunk_size = max(options["chunk_size"], 1)
+        rows = posts.iterator(chunk_size=chunk_size)
+        count = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            for chunk in iter(lambda: list(islice(rows, chunk_size)), []):
+                wait([executor.submit(generate_thumbnails, post.image.name,
+                                      POST_THUMBNAIL_GEOMETRIES)
+                      for post in chunk])
+                # feeds, pages and cards cached with placeholders of the
+                # chunk are rendered again
+                bump_generation(*{scope for post in chunk
+                                  for scope in post_scopes(post)})
+                count += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed thumbnails of {count} post images."
+        ))
@@ -0,0 +1,84 @@
+""" Import JSON Lines written by 'export_posts' command. """
+
+import sys
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from common_lib.cache import bump_generation
+from common_lib.paginators import invalidate_counts
+from posts import search
+from posts.transfer import Importer
+
+
+class Command(BaseCommand):
+    help = ("Bulk import users, groups, posts, comments and follows from "
+            "JSON Lines in batches, one transaction per batch. Model "
+            "signals are not sent, data they maintain is rebuilt once "
+            "at the end.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", nargs="?", default="-",
+                            help="Path of the input file, '-' for stdin.")
+        parser.add_argument("--batch-size", type=int, default=5000,
+                            help="Rows inserted per transaction.")
+        parser.add_argument("--progress-every", type=int, default=100000,
+                            help="Report progress every N rows of a model.")
+        parser.add_argument(
+            "--skip-rebuild", action="store_true",
+            help="Do not rebuild user stats, timelines and search index."
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size should be positive.")
+
+        every = options["progress_every"]
+        reported = {}
+
+        def progress(model, count, rate):
+            if count // every > reported.get(model, 0) // every:
+                self.stdout.write(f"{model}: {count} rows, {rate:.0f} rows/s")
+            reported[model] = count
+
+        importer = Importer(options["batch_size"], progress)
+        started = time.monotonic()
+        source = (sys.stdin if options["input"] == "-"
+                  else open(options["input"], encoding="utf-8"))
+        try:
+            counts = importer.run(source)
+        except (KeyError, ValueError) as error:
+            raise CommandError(f"Invalid import file: {error!r}")
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        elapsed = time.monotonic() - started
+
+        total = sum(counts.values())
+        self.stdout.write(
+            ", ".join(f"{model}: {count}" for model, count in counts.items())
+            + f" rows in {elapsed:.1f}s, {total / max(elapsed, 1e-9):.0f} "
+              f"rows/s."
+        )
+
+        if not options["skip_rebuild"]:
+            self.rebuild()
+        scopes = importer.changed_scopes()
+        bump_generation(*scopes)
+        invalidate_counts(*scopes)
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {total} rows."))
+
+    def rebuild(self):
+        """ Restore what skipped signals keep up to date. """
+        commands = ["rebuild_user_stats", "rebuild_timelines"]
+        if search.is_available():
+            commands.append("rebuild_search_index")
+        for name in commands:
+            started = time.monotonic()
+            call_command(name, stdout=StringIO())
+            self.stdout.write(
+                f"{name}: {time.monotonic() - started:.1f}s"
+            )
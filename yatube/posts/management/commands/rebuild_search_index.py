@@ -0,0 +1,21 @@
+""" Rebuild the full-text search table of posts and comments. """
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = "Refill the FTS5 search table from all posts and comments."
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError("Full-text search requires SQLite FTS5.")
+
+        with transaction.atomic():
+            count = search.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} posts and comments."
+        ))
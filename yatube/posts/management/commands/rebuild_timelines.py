@@ -0,0 +1,31 @@
+""" Rebuild materialized follow feeds of :model:'posts.TimelineEntry'. """
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Follow, TimelineEntry
+from users.models import UserProfile
+from yatube.settings import TIMELINE_FANOUT_LIMIT
+
+
+class Command(BaseCommand):
+    help = ("Recreate follow feed timelines of every user from Follow rows "
+            "and fan-out modes of authors from their followers counts.")
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.values_list("user_id", "author_id")
+        popular = UserProfile.objects.filter(
+            followers_count__gt=TIMELINE_FANOUT_LIMIT
+        )
+
+        with transaction.atomic():
+            popular.update(timeline_merged=True)
+            UserProfile.objects.exclude(pk__in=popular.values("pk")) \
+                               .update(timeline_merged=False)
+            TimelineEntry.objects.all().delete()
+            for user_id, author_id in follows.iterator():
+                TimelineEntry.objects.backfill(user_id, author_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {TimelineEntry.objects.count()} timeline entries."
+        ))
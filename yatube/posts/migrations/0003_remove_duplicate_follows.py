@@ -0,0 +1,28 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    """ Keep the earliest of every duplicated (user, author) follow. """
+    Follow = apps.get_model("posts", "Follow")
+    duplicates = (Follow.objects.values("user_id", "author_id")
+                                .annotate(keep_id=Min("id"), count=Count("id"))
+                                .filter(count__gt=1)
+                                .order_by())
+    for item in duplicates.iterator():
+        (Follow.objects.filter(user_id=item["user_id"],
+                               author_id=item["author_id"])
+                       .exclude(id=item["keep_id"])
+                       .delete())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0002_timelineentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_follows,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# SQL is inlined, so later changes of 'posts.search' do not change
+# this migration.
+CREATE_SEARCH_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5("
+    "text, kind UNINDEXED, post_id UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+FILL_SEARCH_TABLE = (
+    "DELETE FROM posts_search",
+    "INSERT INTO posts_search (rowid, text, kind, post_id) "
+    "SELECT id * 2, text, 'post', id FROM posts_post",
+    "INSERT INTO posts_search (rowid, text, kind, post_id) "
+    "SELECT id * 2 + 1, text, 'comment', post_id FROM posts_comment",
+    "INSERT INTO posts_search (posts_search) VALUES ('optimize')",
+)
+
+
+def create_search_table(apps, schema_editor):
+    """ Create and fill the FTS5 search table, SQLite only. """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(CREATE_SEARCH_TABLE)
+    for sql in FILL_SEARCH_TABLE:
+        schema_editor.execute(sql)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS posts_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_indexes_and_follow_constraint'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
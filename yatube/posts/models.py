@@ -1,10 +1,36 @@
 """ Database entry models for 'posts' application. """
 
+import threading
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.core.signals import request_started
+from django.db import models, transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from common_lib.cache import invalidate_generations
+from common_lib.paginators import invalidate_counts
+from users.models import UserProfile, update_user_stats
+from yatube.settings import TIMELINE_FANOUT_LIMIT
+
+from . import events, search
+from .cache import (POSTS_SCOPE, author_scope, feed_scopes, follow_scope,
+                    group_cards_scope, group_scope, named_feed_scopes,
+                    post_scope, post_scopes)
 
 User = get_user_model()
 
+# Primary keys of posts being deleted by the current thread, their
+# comments are deleted by cascade before them.
+_deleting = threading.local()
+
+
+def deleting_posts():
+    if not hasattr(_deleting, "posts"):
+        _deleting.posts = set()
+    return _deleting.posts
+
 
 class Group(models.Model):
     """ Stores a single group entry, related to :model:'posts.Post'. """
@@ -54,6 +80,14 @@ class Post(models.Model):
     class Meta:
         # Posts by descending pub_date.
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(fields=("-pub_date",),
+                         name="posts_post_date_idx"),
+            models.Index(fields=("author", "-pub_date"),
+                         name="posts_post_author_date_idx"),
+            models.Index(fields=("group", "-pub_date"),
+                         name="posts_post_group_date_idx"),
+        ]
 
     def __str__(self):
         """ Return first 15 chars of post's text. """
@@ -82,6 +116,10 @@ class Comment(models.Model):
     class Meta:
         # Comments by descending pub_date.
         ordering = ("-created",)
+        indexes = [
+            models.Index(fields=("post", "-created"),
+                         name="posts_comment_post_date_idx"),
+        ]
 
     def __str__(self):
         """ Return first 15 chars of comment's text. """
@@ -99,6 +137,313 @@ class Follow(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name="following")
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=("user", "author"),
+                                    name="posts_follow_unique"),
+        ]
+        indexes = [
+            models.Index(fields=("author", "user"),
+                         name="posts_follow_author_user_idx"),
+        ]
+
     def __str__(self):
         """ Return string in format '{user} - {author}'. """
         return f"{self.user} - {self.author}"
+
+
+class TimelineManager(models.Manager):
+    """
+    Maintains materialized follow feeds of :model:'posts.TimelineEntry'.
+
+    Posts of authors with more than 'TIMELINE_FANOUT_LIMIT' followers are
+    not fanned out on write, they are merged into the feed at read time,
+    see 'posts.timeline'. The mode of an author is stored in the profile
+    flag 'timeline_merged' and switched together with the timelines when
+    the followers count crosses the limit.
+    """
+    batch_size = 1000
+
+    def is_fanout_author(self, author_id):
+        """ Return True if posts of the author are written to timelines. """
+        return not UserProfile.objects.filter(user_id=author_id,
+                                              timeline_merged=True).exists()
+
+    def update_fanout(self, author_id):
+        """
+        Switch the author to merging at read time once the followers count
+        is above the limit, removing the author's posts from timelines, or
+        back to fan-out once it is not, copying all the author's posts to
+        timelines of all followers. Each switch is done by a single
+        conditional update of the flag, so it happens once.
+        """
+        profiles = UserProfile.objects.filter(user_id=author_id)
+        with transaction.atomic():
+            if profiles.filter(
+                timeline_merged=False,
+                followers_count__gt=TIMELINE_FANOUT_LIMIT
+            ).update(timeline_merged=True):
+                self.filter(post__author_id=author_id).delete()
+            elif profiles.filter(
+                timeline_merged=True,
+                followers_count__lte=TIMELINE_FANOUT_LIMIT
+            ).update(timeline_merged=False):
+                self.backfill_followers(author_id)
+
+    def fan_out(self, post):
+        """ Add the post to timelines of every follower of its author. """
+        if not self.is_fanout_author(post.author_id):
+            return
+
+        followers = (Follow.objects.filter(author_id=post.author_id)
+                                   .values_list("user_id", flat=True))
+        self.bulk_create(
+            (self.model(user_id=user_id, post_id=post.pk,
+                        pub_date=post.pub_date)
+             for user_id in followers.iterator()),
+            batch_size=self.batch_size,
+            ignore_conflicts=True
+        )
+
+    def backfill(self, user_id, author_id):
+        """ Add all posts of the author to the user's timeline. """
+        if not self.is_fanout_author(author_id):
+            return
+
+        posts = (Post.objects.filter(author_id=author_id)
+                             .values_list("pk", "pub_date"))
+        self.bulk_create(
+            (self.model(user_id=user_id, post_id=post_id, pub_date=pub_date)
+             for post_id, pub_date in posts.iterator()),
+            batch_size=self.batch_size,
+            ignore_conflicts=True
+        )
+
+    def backfill_followers(self, author_id):
+        """ Add all posts of the author to timelines of all followers. """
+        posts = list(Post.objects.filter(author_id=author_id)
+                                 .values_list("pk", "pub_date"))
+        followers = (Follow.objects.filter(author_id=author_id)
+                                   .values_list("user_id", flat=True))
+        self.bulk_create(
+            (self.model(user_id=user_id, post_id=post_id, pub_date=pub_date)
+             for user_id in followers.iterator()
+             for post_id, pub_date in posts),
+            batch_size=self.batch_size,
+            ignore_conflicts=True
+        )
+
+    def prune(self, user_id, author_id):
+        """ Remove all posts of the author from the user's timeline. """
+        self.filter(user_id=user_id, post__author_id=author_id).delete()
+
+
+class TimelineEntry(models.Model):
+    """
+    Stores a single :model:'posts.Post' in the follow feed
+    of :model:'auth.User'.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="timeline")
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="timeline_entries")
+
+    # Copy of post's pub_date to read the feed from a single index.
+    pub_date = models.DateTimeField("дата публикации")
+
+    objects = TimelineManager()
+
+    class Meta:
+        ordering = ("-pub_date",)
+        unique_together = ("user", "post")
+        indexes = [
+            # covers the feed pages and their keyset cursors
+            models.Index(fields=("user", "-pub_date", "-post"),
+                         name="posts_timeline_user_date_idx"),
+        ]
+
+    def __str__(self):
+        """ Return string in format '{user} - {post}'. """
+        return f"{self.user} - {self.post}"
+
+
+@receiver(post_save, sender=Post)
+def increment_posts_count(sender, instance, created, **kwargs):
+    if created:
+        update_user_stats(instance.author_id, "posts_count", 1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        TimelineEntry.objects.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def decrement_posts_count(sender, instance, **kwargs):
+    update_user_stats(instance.author_id, "posts_count", -1)
+
+
+@receiver(post_save, sender=Comment)
+def increment_comments_count(sender, instance, created, **kwargs):
+    if created:
+        update_user_stats(instance.author_id, "comments_count", 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comments_count(sender, instance, **kwargs):
+    update_user_stats(instance.author_id, "comments_count", -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_generations(sender, instance, **kwargs):
+    invalidate_generations(*post_scopes(instance))
+
+
+@receiver(pre_delete, sender=Post)
+def mark_deleting_post(sender, instance, **kwargs):
+    deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def unmark_deleting_post(sender, instance, **kwargs):
+    deleting_posts().discard(instance.pk)
+
+
+@receiver(request_started)
+def reset_deleting_posts(sender, **kwargs):
+    # keys of a failed delete are not kept for later requests
+    _deleting.posts = set()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_generations(sender, instance, **kwargs):
+    # scopes of a deleted post are bumped by 'bump_post_generations'
+    if instance.post_id in deleting_posts():
+        return
+    names = (Post.objects.filter(pk=instance.post_id)
+                         .values_list("author__username", "group__slug")
+                         .first())
+    if names is not None:
+        invalidate_generations(*named_feed_scopes(*names),
+                               post_scope(instance.post_id))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_feed_counts(sender, instance, **kwargs):
+    invalidate_counts(*feed_scopes(instance))
+
+
+@receiver(pre_save, sender=Post)
+def invalidate_previous_group(sender, instance, **kwargs):
+    # an edited post may move out of its group
+    if instance._state.adding:
+        return
+    previous = (Group.objects.filter(posts__pk=instance.pk)
+                             .exclude(pk=instance.group_id)
+                             .values_list("slug", flat=True).first())
+    if previous is not None:
+        invalidate_generations(group_scope(previous))
+        invalidate_counts(group_scope(previous))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed_count(sender, instance, **kwargs):
+    invalidate_counts(follow_scope(instance.user_id))
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def bump_group_generations(sender, instance, **kwargs):
+    # group title and slug are rendered in the cards of its posts, on
+    # every feed and post page showing them; before a delete the posts
+    # are still in the group
+    usernames = (User.objects.filter(posts__group=instance)
+                             .values_list("username", flat=True)
+                             .distinct())
+    invalidate_generations(POSTS_SCOPE, group_scope(instance.slug),
+                           group_cards_scope(instance.pk),
+                           *map(author_scope, usernames))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follow_generations(sender, instance, **kwargs):
+    # follower counters are shown on the pages of both users
+    invalidate_generations(author_scope(instance.user.username),
+                           author_scope(instance.author.username),
+                           follow_scope(instance.user_id))
+
+
+@receiver(post_save, sender=Follow)
+def increment_follow_counts(sender, instance, created, **kwargs):
+    if created:
+        update_user_stats(instance.author_id, "followers_count", 1)
+        update_user_stats(instance.user_id, "following_count", 1)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_follow_counts(sender, instance, **kwargs):
+    update_user_stats(instance.author_id, "followers_count", -1)
+    update_user_stats(instance.user_id, "following_count", -1)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def update_author_fanout(sender, instance, **kwargs):
+    # runs after the followers count is updated
+    TimelineEntry.objects.update_fanout(instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        TimelineEntry.objects.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    TimelineEntry.objects.prune(instance.user_id, instance.author_id)
+
+
+def text_changed(created, update_fields):
+    return created or update_fields is None or "text" in update_fields
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, created, update_fields, **kwargs):
+    if text_changed(created, update_fields):
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post_text(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment_text(sender, instance, created, update_fields, **kwargs):
+    if text_changed(created, update_fields):
+        search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment_text(sender, instance, **kwargs):
+    search.unindex_comment(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def publish_new_post(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: events.publish_post(instance))
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment_count(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: events.publish_comment_count(instance))
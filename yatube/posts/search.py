@@ -0,0 +1,222 @@
+"""
+Full-text search over texts of :model:'posts.Post' and :model:'posts.Comment'
+in a SQLite FTS5 table.
+
+Every post and comment is a row of 'posts_search' with a rowid derived
+from its primary key, so a row is replaced or deleted without a lookup.
+The table is kept in sync by signals in 'posts.models' and can be filled
+from scratch with 'rebuild_search_index' management command.
+"""
+
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from common_lib.paginators import (CursorPage, InvalidCursor,
+                                   decode_cursor_token, encode_cursor_token)
+
+SEARCH_TABLE = "posts_search"
+
+POST = "post"
+COMMENT = "comment"
+
+# Snippet highlight markers, replaced with '<mark>' after escaping.
+MARK_START, MARK_END = "\x02", "\x03"
+SNIPPET_TOKENS = 24
+
+
+def is_available():
+    return connection.vendor == "sqlite"
+
+
+def post_rowid(pk):
+    return pk * 2
+
+
+def comment_rowid(pk):
+    return pk * 2 + 1
+
+
+def _replace(rowid, text, kind, post_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s",
+                       [rowid])
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, text, kind, post_id) "
+            f"VALUES (%s, %s, %s, %s)", [rowid, text, kind, post_id]
+        )
+
+
+def _delete(rowid):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s",
+                       [rowid])
+
+
+def index_post(post):
+    if is_available():
+        _replace(post_rowid(post.pk), post.text, POST, post.pk)
+
+
+def index_comment(comment):
+    if is_available():
+        _replace(comment_rowid(comment.pk), comment.text, COMMENT,
+                 comment.post_id)
+
+
+def unindex_post(pk):
+    if is_available():
+        _delete(post_rowid(pk))
+
+
+def unindex_comment(pk):
+    if is_available():
+        _delete(comment_rowid(pk))
+
+
+def rebuild():
+    """ Refill the search table from posts and comments tables. """
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, text, kind, post_id) "
+            f"SELECT id * 2, text, %s, id FROM posts_post", [POST]
+        )
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, text, kind, post_id) "
+            f"SELECT id * 2 + 1, text, %s, post_id FROM posts_comment",
+            [COMMENT]
+        )
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"
+        )
+        cursor.execute(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def match_expression(query):
+    """
+    Turn user input into an FTS5 query matching all its words as prefixes,
+    the tokenizer has no stemming, so 'лес' should also find 'лесу'.
+    Every word is quoted, operators and punctuation never reach the query
+    parser.
+    """
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def matching_posts_sql(query, kind=POST):
+    """ Return SQL with params selecting ids of posts matching 'query'. """
+    return (
+        f"SELECT post_id FROM {SEARCH_TABLE} "
+        f"WHERE {SEARCH_TABLE} MATCH %s AND kind = %s",
+        [match_expression(query), kind]
+    )
+
+
+def highlight(snippet):
+    """ Escape a snippet and turn highlight markers into '<mark>' tags. """
+    return mark_safe(escape(snippet).replace(MARK_START, "<mark>")
+                                    .replace(MARK_END, "</mark>"))
+
+
+class SearchHit:
+    """ A post or a comment matching the query, with highlighted snippet. """
+
+    def __init__(self, kind, post, snippet, rank, rowid):
+        self.kind = kind
+        self.post = post
+        self.snippet = snippet
+        self.rank = rank
+        self.rowid = rowid
+
+    @property
+    def is_comment(self):
+        return self.kind == COMMENT
+
+
+class SearchPaginator:
+    """
+    Keyset paginator over search hits ordered by relevance, 'bm25' rank
+    and rowid. Every page is a single 'LIMIT per_page + 1' FTS query plus
+    one query loading posts of the hits from 'queryset'.
+    """
+    after_kwarg = "after"
+    before_kwarg = "before"
+
+    def __init__(self, queryset, query, per_page):
+        self.queryset = queryset
+        self.query = query
+        self.per_page = int(per_page)
+
+    @staticmethod
+    def encode_cursor(rank, rowid):
+        return encode_cursor_token(repr(rank), rowid)
+
+    @staticmethod
+    def decode_cursor(token):
+        value, rowid = decode_cursor_token(token)
+        try:
+            return float(value), rowid
+        except ValueError:
+            raise InvalidCursor("Неверный курсор страницы")
+
+    def cursor_for(self, row):
+        return self.encode_cursor(row[3], row[4])
+
+    def fetch(self, after=None, before=None):
+        """ Return '(kind, post_id, snippet, rank, rowid)' rows of a page. """
+        expression = match_expression(self.query)
+        if not expression or not is_available():
+            return []
+
+        sql = (f"SELECT kind, post_id, snippet({SEARCH_TABLE}, 0, %s, %s, "
+               f"'…', {SNIPPET_TOKENS}), rank, rowid FROM {SEARCH_TABLE} "
+               f"WHERE {SEARCH_TABLE} MATCH %s")
+        params = [MARK_START, MARK_END, expression]
+
+        cursor_token, operator, direction = after, ">", "ASC"
+        if before:
+            cursor_token, operator, direction = before, "<", "DESC"
+        if cursor_token:
+            rank, rowid = self.decode_cursor(cursor_token)
+            sql += (f" AND (rank {operator} %s "
+                    f"OR (rank = %s AND rowid {operator} %s))")
+            params += [rank, rank, rowid]
+
+        sql += f" ORDER BY rank {direction}, rowid {direction} LIMIT %s"
+        params.append(self.per_page + 1)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def page(self, after=None, before=None):
+        """ Return a :class:'CursorPage' of :class:'SearchHit' objects. """
+        rows = self.fetch(after, before)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if before:
+            rows.reverse()
+
+        posts = self.queryset.in_bulk({row[1] for row in rows})
+        hits = [
+            SearchHit(kind, posts[post_id], highlight(snippet), rank, rowid)
+            for kind, post_id, snippet, rank, rowid in rows
+            if post_id in posts
+        ]
+
+        if before:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(after)
+
+        next_cursor = (self.cursor_for(rows[-1])
+                       if has_next and rows else None)
+        previous_cursor = (self.cursor_for(rows[0])
+                           if has_previous and rows else None)
+
+        return CursorPage(hits, after or before or "", next_cursor,
+                          previous_cursor, self)
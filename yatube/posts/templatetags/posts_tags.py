@@ -0,0 +1,27 @@
+""" Template tags of 'posts' application. """
+
+from django import template
+
+from posts.cards import attach_cards
+from posts.thumbnails import ready_post_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def attach_post_cards(posts):
+    """
+    Load cached cards of the posts for 'post_profile.html', rendering
+    the missing ones. Outputs nothing.
+    """
+    attach_cards(list(posts))
+    return ""
+
+
+@register.simple_tag
+def post_thumbnail(post):
+    """
+    Return the generated card thumbnail of the post image or None, cached
+    pages with a placeholder are invalidated once it is ready.
+    """
+    return ready_post_thumbnail(post)
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+
+from posts.models import Comment, Follow, Post
+from yatube.settings import COMMENTS_PREVIEW_SIZE, PAGINATOR_PAGE_SIZE
+
+User = get_user_model()
+
+
+def fill_pages(user, group, post):
+    """
+    Fill every page showing posts of 'user', 'group' and the follow feed
+    of 'user' with posts of different authors, each with more comments
+    than the feed preview shows, and give 'post' the same comments.
+    """
+    authors = [
+        User.objects.create_user(username=f'{user.username}_author_{number}')
+        for number in range(COMMENTS_PREVIEW_SIZE + 1)
+    ]
+    for author in authors:
+        Follow.objects.get_or_create(user=user, author=author)
+
+    posts = [post]
+    for number in range(PAGINATOR_PAGE_SIZE):
+        author = user if number % 2 else authors[number % len(authors)]
+        posts.append(Post.objects.create(
+            text=f'Текст поста номер {number}', group=group, author=author
+        ))
+
+    for page_post in posts:
+        for author in authors:
+            Comment.objects.create(
+                post=page_post, author=author,
+                text=f'Комментарий пользователя {author.username}'
+            )
@@ -0,0 +1,135 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from common_lib.paginators import EstimatedCountPaginator, estimate_count
+from posts.models import Group, Post
+
+User = get_user_model()
+TEST_USER_NAME = 'TestUser'
+
+
+class PostAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Описание тестовой группы',
+            slug='test-group-slug',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+        # warm the cached request user, every measured request then
+        # starts from the same state
+        self.client.get(reverse('admin:index'))
+
+    def create_posts(self, count):
+        for number in range(count):
+            author = User.objects.create_user(
+                username=f'{TEST_USER_NAME}{Post.objects.count()}'
+            )
+            Post.objects.create(text=f'Текст поста {number}', author=author,
+                                group=self.group)
+
+    def changelist_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), params
+            )
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries]
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.create_posts(2)
+        queries = self.changelist_queries()
+
+        self.create_posts(10)
+        self.assertEqual(len(self.changelist_queries()), len(queries))
+
+    def test_changelist_does_not_count_whole_table(self):
+        self.create_posts(3)
+        queries = self.changelist_queries()
+        self.assertFalse([sql for sql in queries if 'COUNT(' in sql])
+
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertGreaterEqual(response.context['cl'].result_count, 3)
+
+    def test_filtered_changelist_counted_exactly(self):
+        self.create_posts(3)
+        year = timezone.localtime(Post.objects.first().pub_date).year
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'year': year}
+        )
+        self.assertEqual(response.context['cl'].result_count, 3)
+
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'year': year + 1}
+        )
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_date_filters_do_not_scan_table(self):
+        self.create_posts(3)
+        queries = self.changelist_queries()
+        self.assertFalse([sql for sql in queries
+                          if 'MIN(' in sql or 'django_datetime_trunc' in sql])
+
+        ends = [sql for sql in queries
+                if sql.endswith('"posts_post"."pub_date" ASC  LIMIT 1')
+                or sql.endswith('"posts_post"."pub_date" DESC  LIMIT 1')]
+        self.assertEqual(len(ends), 2)
+        with connection.cursor() as cursor:
+            for sql in ends:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                self.assertIn('posts_post_date_idx',
+                              ' '.join(row[-1] for row in cursor.fetchall()))
+
+    def test_foreign_keys_use_autocomplete(self):
+        self.create_posts(1)
+        post = Post.objects.first()
+        response = self.client.get(
+            reverse('admin:posts_post_change', args=(post.pk,))
+        )
+        form = response.context['adminform'].form
+        for field in ('author', 'group'):
+            with self.subTest(field=field):
+                self.assertEqual(
+                    type(form.fields[field].widget.widget).__name__,
+                    'AutocompleteSelect'
+                )
+
+        response = self.client.get(reverse('admin:posts_group_autocomplete'),
+                                   {'term': 'Тестовая'})
+        self.assertEqual(response.json()['results'][0]['id'],
+                         str(self.group.pk))
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def test_estimate_from_statistics(self):
+        user = User.objects.create_user(username=TEST_USER_NAME)
+        for number in range(5):
+            Post.objects.create(text=f'Текст поста {number}', author=user)
+        Post.objects.filter(text='Текст поста 0').delete()
+
+        self.assertGreaterEqual(estimate_count(Post), 4)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE posts_post')
+        self.assertEqual(estimate_count(Post), 4)
+
+        paginator = EstimatedCountPaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.num_pages, 2)
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(text='Текст поста 0'), 2
+        )
+        self.assertEqual(paginator.count, 0)
@@ -0,0 +1,157 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.api import LIST_FIELDS
+from posts.models import Comment, Follow, Group, Post
+from yatube.settings import COMMENTS_PREVIEW_SIZE, PAGINATOR_PAGE_SIZE
+
+User = get_user_model()
+TEST_USER_NAME = 'TestUser'
+TEST_GROUP_SLUG = 'test-group-slug'
+
+
+class PostsApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username=TEST_USER_NAME)
+        cls.author = User.objects.create_user(username=f'{TEST_USER_NAME}2')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Описание тестовой группы',
+            slug=TEST_GROUP_SLUG,
+        )
+
+        for number in range(PAGINATOR_PAGE_SIZE):
+            Post.objects.create(text=f'Текст поста номер {number}',
+                                author=cls.user, group=cls.group)
+        cls.post = Post.objects.create(text='Текст поста автора',
+                                       author=cls.author)
+        for number in range(COMMENTS_PREVIEW_SIZE + 1):
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text=f'Комментарий {number}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get_json(self, link, client=None, status=200, **params):
+        response = (client or self.client).get(link, params)
+        self.assertEqual(response.status_code, status)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(response.content)
+
+    def test_index_feed_with_cursor_pagination(self):
+        link = reverse('api:index')
+        first = self.get_json(link)
+
+        self.assertEqual(len(first['results']), PAGINATOR_PAGE_SIZE)
+        self.assertEqual(tuple(first['results'][0]), LIST_FIELDS)
+        self.assertEqual(first['results'][0]['id'], self.post.pk)
+        self.assertEqual(first['results'][0]['author'], self.author.username)
+        self.assertEqual(first['results'][0]['comment_count'],
+                         COMMENTS_PREVIEW_SIZE + 1)
+        self.assertIsNone(first['previous'])
+
+        second = json.loads(self.client.get(first['next']).content)
+        self.assertEqual(len(second['results']), 1)
+        self.assertEqual(second['results'][0]['group'],
+                         {'slug': TEST_GROUP_SLUG, 'title': 'Тестовая группа'})
+        self.assertIsNone(second['next'])
+        self.assertIsNotNone(second['previous'])
+
+    def test_fields_narrow_sql_projection(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get_json(reverse('api:index'), fields='id,text')
+
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        sql = ' '.join(query['sql'] for query in queries
+                       if 'posts_post' in query['sql'])
+        self.assertIn('"posts_post"."text"', sql)
+        for excluded in ('"posts_post"."image"', 'auth_user', 'posts_group',
+                         'posts_comment'):
+            self.assertNotIn(excluded, sql)
+
+    def test_comments_field_prefetches_preview(self):
+        data = self.get_json(reverse('api:profile', kwargs={
+            'username': self.author.username
+        }), fields='id,comments')
+
+        self.assertEqual(len(data['results']), 1)
+        self.assertEqual(len(data['results'][0]['comments']),
+                         COMMENTS_PREVIEW_SIZE)
+
+    def test_unknown_fields_rejected(self):
+        data = self.get_json(reverse('api:index'), status=400,
+                             fields='id,password')
+        self.assertIn('password', data['detail'])
+
+    def test_group_and_profile_feeds(self):
+        group = self.get_json(reverse('api:group', kwargs={
+            'slug': TEST_GROUP_SLUG
+        }))
+        self.assertEqual(len(group['results']), PAGINATOR_PAGE_SIZE)
+        self.assertNotIn(self.post.pk, [post['id']
+                                        for post in group['results']])
+
+        self.get_json(reverse('api:group', kwargs={'slug': 'unknown'}),
+                      status=404)
+        self.get_json(reverse('api:profile', kwargs={'username': 'unknown'}),
+                      status=404)
+
+    def test_follow_feed(self):
+        link = reverse('api:follow_index')
+        self.get_json(link, status=401)
+
+        data = self.get_json(link, self.authorized_client)
+        self.assertEqual([post['id'] for post in data['results']],
+                         [self.post.pk])
+
+    def test_post_detail_with_all_comments(self):
+        link = reverse('api:post', kwargs={
+            'username': self.author.username, 'post_id': self.post.pk
+        })
+        data = self.get_json(link)
+
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(len(data['comments']), COMMENTS_PREVIEW_SIZE + 1)
+        self.assertEqual(data['comments'][0]['author'], self.user.username)
+
+        self.get_json(reverse('api:post', kwargs={
+            'username': self.user.username, 'post_id': self.post.pk
+        }), status=404)
+
+    def test_compact_serialization(self):
+        response = self.client.get(reverse('api:index'))
+        self.assertNotIn(b'": ', response.content)
+        self.assertIn('Текст поста автора'.encode(), response.content)
+
+    def test_etag_revalidation(self):
+        link = reverse('api:index')
+        for client in (self.client, self.authorized_client):
+            with self.subTest(client=client):
+                etag = client.get(link)['ETag']
+                response = client.get(link, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_anonymous_responses_invalidated_by_new_post(self):
+        link = reverse('api:index')
+        etag = self.client.get(link)['ETag']
+
+        Post.objects.create(text='Новый пост', author=self.author)
+
+        response = self.client.get(link, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['results'][0]['text'],
+                         'Новый пост')
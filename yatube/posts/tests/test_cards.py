@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import cards
+from posts.cards import attach_cards, card_key, card_stats
+from posts.models import Comment, Group, Post
+from posts.views import PostsListView
+
+User = get_user_model()
+TEST_GROUP_SLUG = 'test-group-slug'
+
+
+class PostCardsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Описание тестовой группы',
+            slug=TEST_GROUP_SLUG,
+        )
+        cls.post = Post.objects.create(text='Текст поста', author=cls.author,
+                                       group=cls.group)
+        Post.objects.create(text='Другой пост', author=cls.reader)
+
+    def setUp(self):
+        cache.clear()
+        card_stats.reset()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed_posts(self):
+        return list(PostsListView().get_posts_queryset())
+
+    def test_page_assembled_with_single_get_many(self):
+        attach_cards(self.feed_posts())
+        posts = self.feed_posts()
+
+        with mock.patch.object(cache, 'get_many',
+                               wraps=cache.get_many) as get_many, \
+                mock.patch.object(cards, 'render_card') as render_card:
+            attach_cards(posts)
+
+        get_many.assert_called_once()
+        render_card.assert_not_called()
+        self.assertIn('Текст поста', posts[-1].cached_card.head)
+
+    def test_cards_shared_between_feeds(self):
+        self.author_client.get(reverse('index'))
+        self.assertEqual(card_stats.misses, 2)
+
+        for link in (reverse('group', kwargs={'slug': TEST_GROUP_SLUG}),
+                     reverse('profile', kwargs={'username': 'author'})):
+            self.author_client.get(link)
+        self.assertEqual((card_stats.hits, card_stats.misses), (2, 2))
+
+    def test_user_parts_rendered_after_lookup(self):
+        link = reverse('index')
+        edit_link = reverse('post_edit', kwargs={'username': 'author',
+                                                 'post_id': self.post.pk})
+
+        self.assertContains(self.author_client.get(link), edit_link)
+        response = self.reader_client.get(link)
+        self.assertNotContains(response, edit_link)
+        self.assertContains(response, 'Добавить комментарий')
+        self.assertNotContains(Client().get(link), 'Добавить комментарий')
+        self.assertGreater(card_stats.hits, 0)
+
+    def test_card_versions_bumped(self):
+        link = reverse('index')
+        self.reader_client.get(link)
+        cached = cache.get(card_key(self.post.pk))
+
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Новый комментарий')
+        self.assertContains(self.reader_client.get(link),
+                            'Новый комментарий')
+
+        self.post.text = 'Исправленный текст'
+        self.post.save()
+        self.assertContains(self.reader_client.get(link),
+                            'Исправленный текст')
+
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertContains(self.reader_client.get(link), 'Новое название')
+        self.assertNotEqual(cache.get(card_key(self.post.pk))[0], cached[0])
@@ -0,0 +1,219 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+from os import path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from common_lib.benchmark import percentiles
+from posts import search
+from posts.benchmark import USERNAME_PREFIX
+from posts.management.commands.benchmark_urls import SCENARIOS
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from users.models import UserProfile
+
+User = get_user_model()
+
+
+class BenchmarkUrlsCommandTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir, ignore_errors=True)
+
+    def test_results_of_every_url(self):
+        output = path.join(self.output_dir, 'benchmark.json')
+        with self.settings(MEDIA_ROOT=self.output_dir):
+            call_command(
+                'benchmark_urls', '--in-place', '--users=5', '--groups=2',
+                '--posts=30', '--comments=50', '--follows=10',
+                '--iterations=3', '--warmup=1', f'--output={output}',
+                stdout=StringIO()
+            )
+
+        with open(output, encoding='utf-8') as results_file:
+            document = json.load(results_file)
+
+        self.assertEqual(document['volumes']['posts'], 30)
+        self.assertEqual(
+            {result['url'] for result in document['results']},
+            {name for name, _, _ in SCENARIOS}
+        )
+        for result in document['results']:
+            with self.subTest(url=result['url'], client=result['client']):
+                self.assertIn(result['status'], (200, 302))
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertGreater(result['peak_memory_kib'], 0)
+
+        reader = document['results'][1]
+        self.assertEqual(reader['client'], 'reader')
+        self.assertGreater(reader['queries'], 0)
+
+        self.assertEqual(
+            Post.objects.filter(
+                author__username__startswith=USERNAME_PREFIX
+            ).count(), 30
+        )
+        self.assertEqual(
+            UserProfile.objects.filter(
+                user__username__startswith=USERNAME_PREFIX
+            ).count(), 5
+        )
+
+    def test_nearest_rank_percentiles(self):
+        self.assertEqual(percentiles([]), (0.0, 0.0, 0.0))
+        self.assertEqual(percentiles([3.0]), (3.0, 3.0, 3.0))
+        self.assertEqual(percentiles(list(range(100, 0, -1))), (50, 95, 99))
+        self.assertEqual(percentiles([1, 2, 3, 4]), (2, 4, 4))
+
+
+class RebuildSearchIndexCommandTest(TestCase):
+    def test_rebuild_restores_missing_rows(self):
+        user = User.objects.create_user(username='TestUser')
+        post = Post.objects.create(text='Осенний лес', author=user)
+        Comment.objects.create(text='Красивый лес', post=post, author=user)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.SEARCH_TABLE}')
+
+        paginator = search.SearchPaginator(Post.objects.all(), 'лес', 10)
+        self.assertEqual(len(paginator.page()), 0)
+
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 2', out.getvalue())
+        self.assertCountEqual(
+            [hit.kind for hit in paginator.page()],
+            [search.POST, search.COMMENT]
+        )
+
+
+class ExportImportPostsCommandTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir, ignore_errors=True)
+        self.path = path.join(self.output_dir, 'export.jsonl')
+
+        self.reader = User.objects.create_user(username='Reader')
+        self.author = User.objects.create_user(username='Author',
+                                               email='author@test.ru')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.pub_date = timezone.now() - timezone.timedelta(days=30,
+                                                            microseconds=7)
+        for i in range(3):
+            post = Post.objects.create(text=f'Осенний лес {i}',
+                                       author=self.author, group=self.group)
+        Post.objects.filter(pk=post.pk).update(pub_date=self.pub_date)
+        comment = Comment.objects.create(text='Красивый лес', post=post,
+                                         author=self.reader)
+        Comment.objects.filter(pk=comment.pk).update(created=self.pub_date)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def export(self):
+        with self.settings(MEDIA_ROOT=self.output_dir):
+            call_command('export_posts', self.path, stdout=StringIO())
+
+    def import_(self, **options):
+        sent = []
+
+        def receiver(sender, **kwargs):
+            sent.append(sender)
+
+        post_save.connect(receiver)
+        self.addCleanup(post_save.disconnect, receiver)
+        out = StringIO()
+        with self.settings(MEDIA_ROOT=self.output_dir):
+            call_command('import_posts', self.path, stdout=out, **options)
+        self.assertEqual(sent, [], 'Импорт не должен отправлять post_save')
+        return out.getvalue()
+
+    def test_export_writes_json_line_per_row(self):
+        self.export()
+        with open(self.path, encoding='utf-8') as export:
+            records = [json.loads(line) for line in export]
+
+        self.assertEqual(
+            [record['model'] for record in records],
+            ['user'] * 2 + ['group'] + ['post'] * 3 + ['comment', 'follow']
+        )
+        self.assertEqual(records[1]['fields']['email'], 'author@test.ru')
+        self.assertEqual(records[5]['fields']['pub_date'],
+                         self.pub_date.isoformat())
+
+    def test_round_trip_into_empty_database(self):
+        self.export()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            output = self.import_(batch_size=2, progress_every=1)
+        self.assertFalse(
+            [query['sql'] for query in queries
+             if query['sql'].startswith(('UPDATE "posts_post"',
+                                         'UPDATE "posts_comment"'))],
+            'Даты должны записываться при вставке'
+        )
+
+        self.assertIn('post: 2 rows', output)
+        self.assertIn('rows/s', output)
+        author = User.objects.get(username='Author')
+        reader = User.objects.get(username='Reader')
+        self.assertEqual(author.email, 'author@test.ru')
+        post = Post.objects.get(text='Осенний лес 2')
+        self.assertEqual(post.pub_date, self.pub_date)
+        self.assertEqual(post.author, author)
+        self.assertEqual(post.group.slug, 'group')
+        self.assertEqual(post.comments.get().author, reader)
+        self.assertEqual(post.comments.get().created, self.pub_date)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+        self.assertTrue(
+            Follow.objects.filter(user=reader, author=author).exists()
+        )
+
+        # data of skipped signals is rebuilt
+        self.assertEqual(author.profile.posts_count, 3)
+        self.assertEqual(reader.profile.following_count, 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=reader).count(), 3
+        )
+        paginator = search.SearchPaginator(Post.objects.all(), 'лес', 10)
+        self.assertEqual(len(paginator.page()), 4)
+
+        # new rows still get fresh keys after explicit ones
+        new_post = Post.objects.create(text='Новый пост', author=author)
+        self.assertGreater(new_post.pk, post.pk)
+
+    def test_existing_users_and_groups_are_reused(self):
+        self.export()
+        self.import_()
+
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(self.author.posts.count(), 6)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_cached_feed_counts_dropped(self):
+        self.client.force_login(self.reader)
+        links = ['/', '/Author/', '/group/group/', '/follow/']
+        for link in links:
+            self.assertEqual(
+                self.client.get(link).context['paginator'].count, 3
+            )
+
+        self.export()
+        self.import_()
+
+        for link in links:
+            with self.subTest(link=link):
+                self.assertEqual(
+                    self.client.get(link).context['paginator'].count, 6
+                )
@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TransactionTestCase
+from django.urls import reverse
+
+from common_lib.pubsub import get_broker
+from common_lib.testutils import AsgiConnection
+from posts.events import CHANNEL
+from posts.models import Comment, Follow, Post
+from yatube.asgi import EVENTS_PATH, application
+
+User = get_user_model()
+
+
+def events(body):
+    """ Return '(event, data)' pairs of server-sent events in 'body'. """
+    result = []
+    for message in body.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in message.splitlines()
+                      if line.startswith(('event:', 'data:')))
+        if 'event' in fields:
+            result.append((fields['event'], json.loads(fields['data'])))
+    return result
+
+
+class EventStreamTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='author')
+        self.other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.user, author=self.author)
+        self.post = Post.objects.create(text='Текст поста',
+                                        author=self.author)
+
+        client = Client()
+        client.force_login(self.user)
+        self.cookie = ('cookie', '{}={}'.format(
+            settings.SESSION_COOKIE_NAME,
+            client.cookies[settings.SESSION_COOKIE_NAME].value
+        ))
+
+    async def open_stream(self, query, headers=()):
+        connection = AsgiConnection(application, EVENTS_PATH, query,
+                                    headers).start()
+        self.assertIn('retry:', await connection.next_body())
+        return connection
+
+    async def read_events(self, connection, count):
+        received = []
+        while len(received) < count:
+            received.extend(events(await connection.next_body()))
+        return received
+
+    def test_index_stream_sends_new_posts_and_comment_counts(self):
+        async def scenario():
+            connection = await self.open_stream(
+                f'feed=index&posts={self.post.pk}'
+            )
+            post = Post.objects.create(text='Новый пост', author=self.other)
+            Comment.objects.create(post=post, author=self.user, text='Нет')
+            Comment.objects.create(post=self.post, author=self.user,
+                                   text='Комментарий')
+            received = await self.read_events(connection, 2)
+            connection.disconnect()
+            await connection.finish()
+            return connection, post, received
+
+        connection, post, received = asyncio.run(scenario())
+        self.assertEqual(connection.headers['content-type'],
+                         'text/event-stream; charset=utf-8')
+        self.assertEqual(received, [
+            ('post', {'id': post.pk}),
+            ('comments', {'post_id': self.post.pk, 'comment_count': 1}),
+        ])
+        self.assertFalse(get_broker().has_subscribers(CHANNEL))
+
+    def test_follow_stream_sends_posts_of_followed_authors(self):
+        async def scenario():
+            connection = await self.open_stream('feed=follow', [self.cookie])
+            Post.objects.create(text='Чужой пост', author=self.other)
+            post = Post.objects.create(text='Пост автора',
+                                       author=self.author)
+            received = await self.read_events(connection, 1)
+            connection.disconnect()
+            await connection.finish()
+            return post, received
+
+        post, received = asyncio.run(scenario())
+        self.assertEqual(received, [('post', {'id': post.pk})])
+
+    def test_invalid_streams_rejected(self):
+        async def scenario(query):
+            connection = AsgiConnection(application, EVENTS_PATH,
+                                        query).start()
+            await connection.finish()
+            return connection.status
+
+        for query, status in (('feed=follow', 403), ('feed=unknown', 400),
+                              ('posts=1,a', 400)):
+            with self.subTest(query=query):
+                self.assertEqual(asyncio.run(scenario(query)), status)
+
+    def test_thousands_of_idle_streams(self):
+        count = 2000
+
+        async def scenario():
+            connections = [
+                AsgiConnection(application, EVENTS_PATH,
+                               'feed=index').start()
+                for _ in range(count)
+            ]
+            for connection in connections:
+                await connection.next_body()
+            get_broker().publish(CHANNEL, {'type': 'post', 'id': 1,
+                                           'author_id': 1})
+            received = [events(await connection.next_body())
+                        for connection in connections]
+            for connection in connections:
+                connection.disconnect()
+            await asyncio.gather(*(connection.finish()
+                                   for connection in connections))
+            return received
+
+        received = asyncio.run(scenario())
+        self.assertEqual(received, [[('post', {'id': 1})]] * count)
+        self.assertFalse(get_broker().has_subscribers(CHANNEL))
+
+    def test_other_paths_served_by_django(self):
+        async def scenario():
+            connection = AsgiConnection(application,
+                                        reverse('index')).start()
+            body = await connection.next_body()
+            await connection.finish()
+            return connection.status, body
+
+        status, body = asyncio.run(scenario())
+        self.assertEqual(status, 200)
+        self.assertIn(f'data-post-id="{self.post.pk}"', body)
+
+    def test_wsgi_stops_event_source_reconnects(self):
+        response = Client().get(reverse('events'))
+        self.assertEqual(response.status_code, 204)
@@ -81,7 +81,7 @@ class PostsFormsTests(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group, self.group)
         self.assertEqual(post.author, self.user)
-        self.assertEqual(post.image.name, 'posts/small.gif')
+        self.assertEqual(post.image.name, 'posts/small.webp')
 
     def test_post_edit(self):
         post_new = Post.objects.create(
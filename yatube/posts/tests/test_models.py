@@ -1,8 +1,21 @@
+from io import StringIO
+from unittest import mock, skipUnless
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
+from common_lib.cache import get_generations
+from common_lib.paginators import CursorPaginator
 from common_lib.testutils import AppModelsTestBase
-from posts.models import Group, Post
+from posts.cache import post_scopes
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.timeline import TimelineFeed
+from users.models import UserProfile
 
 User = get_user_model()
 TEST_GROUP_SLUG = 'test-group-slug'
@@ -56,3 +69,260 @@ class PostsModelsTest(TestCase, AppModelsTestBase):
                 }
             }
         ]
+
+
+class UserStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username=TEST_USER_NAME)
+        cls.author = User.objects.create_user(username=f'{TEST_USER_NAME}_1')
+
+    def assertStats(self, user, **expected):
+        profile = UserProfile.objects.get(user=user)
+        for field, value in expected.items():
+            with self.subTest(user=user, field=field):
+                self.assertEqual(getattr(profile, field), value)
+
+    def test_counters_follow_creates_and_deletes(self):
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Текст поста', author=self.author)
+        Comment.objects.create(text='Комментарий', post=post, author=self.user)
+
+        self.assertStats(self.author, followers_count=1, posts_count=1)
+        self.assertStats(self.user, following_count=1, comments_count=1)
+
+        follow.delete()
+        post.delete()
+
+        self.assertStats(self.author, followers_count=0, posts_count=0)
+        self.assertStats(self.user, following_count=0, comments_count=0)
+
+    def test_rebuild_user_stats_command(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.create(text='Текст поста', author=self.author)
+        UserProfile.objects.update(followers_count=10, posts_count=0)
+
+        call_command('rebuild_user_stats', stdout=StringIO())
+
+        self.assertStats(self.author, followers_count=1, following_count=0,
+                         posts_count=1, comments_count=0)
+        self.assertStats(self.user, followers_count=0, following_count=1)
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username=TEST_USER_NAME)
+        cls.author = User.objects.create_user(username=f'{TEST_USER_NAME}_1')
+
+    def feed(self):
+        return list(TimelineFeed(Post.objects, self.user)[:100])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        old_post = Post.objects.create(text='Старый пост', author=self.author)
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+
+        self.assertEqual(
+            set(self.user.timeline.values_list('post_id', flat=True)),
+            {old_post.id, new_post.id}
+        )
+        self.assertEqual(set(self.feed()), {old_post, new_post})
+
+        follow.delete()
+
+        self.assertFalse(self.user.timeline.exists())
+        self.assertEqual(self.feed(), [])
+
+    def test_popular_author_merged_at_read_time(self):
+        with mock.patch('posts.models.TIMELINE_FANOUT_LIMIT', 0):
+            Follow.objects.create(user=self.user, author=self.author)
+            post = Post.objects.create(text='Текст поста', author=self.author)
+
+            self.assertFalse(self.user.timeline.exists())
+            self.assertEqual(self.feed(), [post])
+
+    def test_feed_pages_merged_by_date(self):
+        popular = User.objects.create_user(username='popular')
+        Follow.objects.create(user=self.user, author=self.author)
+        with mock.patch('posts.models.TIMELINE_FANOUT_LIMIT', 0):
+            Follow.objects.create(user=self.user, author=popular)
+        posts = [Post.objects.create(text=f'Пост {number}',
+                                     author=(popular if number % 3
+                                             else self.author))
+                 for number in range(7)]
+        posts.reverse()
+
+        feed = TimelineFeed(Post.objects, self.user)
+        self.assertEqual(feed.count(), 7)
+        self.assertEqual(list(feed[2:5]), posts[2:5])
+
+        paginator = CursorPaginator(feed, 3)
+        first = paginator.page()
+        second = paginator.page(after=first.next_cursor)
+        self.assertEqual(first.object_list + second.object_list, posts[:6])
+        self.assertEqual(
+            paginator.page(before=second.previous_cursor).object_list,
+            posts[:3]
+        )
+
+    @mock.patch('posts.models.TIMELINE_FANOUT_LIMIT', 1)
+    def test_fanout_switched_when_limit_crossed(self):
+        reader = User.objects.create_user(username='reader')
+        reader_follow = Follow.objects.create(user=reader, author=self.author)
+        old_post = Post.objects.create(text='Старый пост', author=self.author)
+
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertTrue(UserProfile.objects.get(user=self.author)
+                                           .timeline_merged)
+        self.assertFalse(TimelineEntry.objects.exists())
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(self.feed(), [new_post, old_post])
+
+        reader_follow.delete()
+        self.assertFalse(UserProfile.objects.get(user=self.author)
+                                            .timeline_merged)
+        self.assertEqual(
+            set(self.user.timeline.values_list('post_id', flat=True)),
+            {old_post.id, new_post.id}
+        )
+        self.assertEqual(self.feed(), [new_post, old_post])
+
+    def test_rebuild_timelines_command(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Текст поста', author=self.author)
+        TimelineEntry.objects.all().delete()
+
+        call_command('rebuild_timelines', stdout=StringIO())
+
+        self.assertEqual(self.feed(), [post])
+
+
+class PostsIndexesTest(TestCase):
+    INDEX_NOT_USED_MSG = 'Запрос страницы не использует индекс {}.'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username=TEST_USER_NAME)
+        cls.follower = User.objects.create_user(
+            username=f'{TEST_USER_NAME}_1'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Описание тестовой группы',
+            slug=TEST_GROUP_SLUG,
+        )
+        cls.post = Post.objects.create(
+            text='Текст тестового поста', group=cls.group, author=cls.user
+        )
+        Comment.objects.create(text='Комментарий', post=cls.post,
+                               author=cls.user)
+        Follow.objects.create(user=cls.follower, author=cls.user)
+
+    def query_plans(self, url):
+        client = Client()
+        client.force_login(self.follower)
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+                plans.extend(row[-1] for row in cursor.fetchall())
+        return plans
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN')
+    def test_views_use_indexes(self):
+        cache.clear()
+        urls_indexes = [
+            (reverse('index'), 'posts_post_date_idx'),
+            (reverse('group', kwargs={'slug': TEST_GROUP_SLUG}),
+             'posts_post_group_date_idx'),
+            (reverse('profile', kwargs={'username': TEST_USER_NAME}),
+             'posts_post_author_date_idx'),
+            (reverse('post', kwargs={'username': TEST_USER_NAME,
+                                     'post_id': self.post.id}),
+             'posts_comment_post_date_idx'),
+            (reverse('follow_index'), 'posts_timeline_user_date_idx'),
+        ]
+        for url, index_name in urls_indexes:
+            with self.subTest(url=url, index_name=index_name):
+                plans = self.query_plans(url)
+                self.assertTrue(
+                    any(index_name in plan for plan in plans),
+                    self.INDEX_NOT_USED_MSG.format(index_name)
+                )
+
+    def test_follow_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.follower, author=self.user)
+
+
+class GenerationsAfterCommitTest(TransactionTestCase):
+    def test_generations_bumped_again_after_commit(self):
+        user = User.objects.create_user(username=TEST_USER_NAME)
+        post = Post.objects.create(text='Текст поста', author=user)
+        scopes = post_scopes(post)
+
+        with transaction.atomic():
+            before = get_generations(scopes)
+            Comment.objects.create(text='Комментарий', post=post, author=user)
+            # a concurrent reader would cache the old rows under these
+            during = get_generations(scopes)
+
+        self.assertNotEqual(during, before)
+        self.assertNotEqual(get_generations(scopes), during)
+
+
+class CommentGenerationsTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username=TEST_USER_NAME)
+        group = Group.objects.create(title='Группа', slug='group')
+        self.post = Post.objects.create(text='Текст поста', author=user,
+                                        group=group)
+        self.comments = [
+            Comment.objects.create(text=f'Комментарий {i}', post=self.post,
+                                   author=user)
+            for i in range(3)
+        ]
+
+    def test_scopes_read_by_one_query(self):
+        comment = Comment.objects.get(pk=self.comments[0].pk)
+        scopes = post_scopes(self.post)
+        before = get_generations(scopes)
+
+        with CaptureQueriesContext(connection) as queries:
+            comment.save()
+
+        self.assertEqual(
+            len([query for query in queries
+                 if query['sql'].startswith('SELECT')
+                 and ('"auth_user"' in query['sql']
+                      or '"posts_group"' in query['sql'])]), 1
+        )
+        self.assertTrue(all(
+            new != old for new, old in zip(get_generations(scopes), before)
+        ))
+
+    def test_post_delete_does_not_bump_per_comment(self):
+        with mock.patch('posts.models.invalidate_generations') as bump:
+            Post.objects.get(pk=self.post.pk).delete()
+
+        bump.assert_called_once_with(*post_scopes(self.post))
+        self.assertFalse(Comment.objects.exists())
+
+        comment = Comment.objects.create(
+            text='Комментарий', author=self.post.author,
+            post=Post.objects.create(text='Новый пост',
+                                     author=self.post.author)
+        )
+        with mock.patch('posts.models.invalidate_generations') as bump:
+            comment.delete()
+        bump.assert_called_once()
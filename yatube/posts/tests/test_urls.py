@@ -1,9 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
 from common_lib.testutils import AppUrlsTestBase
 from posts.models import Group, Post
+from posts.tests.fixtures import fill_pages
 
 User = get_user_model()
 TEST_GROUP_SLUG = 'test-group-slug'
@@ -38,25 +40,33 @@ class PostsUrlsTests(TestCase, AppUrlsTestBase):
                 'url': reverse('index'),
                 'link': '/',
                 'login_required': None,
-                'template': 'posts_view.html'
+                'template': 'posts_view.html',
+                'max_queries': 3,
+                'max_time': 0.5
             },
             {
                 'url': reverse('post_new'),
                 'link': '/new/',
                 'login_required': True,
-                'template': 'post_form.html'
+                'template': 'post_form.html',
+                'max_queries': 4,
+                'max_time': 0.5
             },
             {
                 'url': reverse('group', kwargs={'slug': TEST_GROUP_SLUG}),
                 'link': f'/group/{TEST_GROUP_SLUG}/',
                 'login_required': None,
-                'template': 'posts_view.html'
+                'template': 'posts_view.html',
+                'max_queries': 5,
+                'max_time': 0.5
             },
             {
                 'url': reverse('profile', kwargs={'username': TEST_USER_NAME}),
                 'link': f'/{TEST_USER_NAME}/',
                 'login_required': None,
-                'template': 'posts_view.html'
+                'template': 'posts_view.html',
+                'max_queries': 4,
+                'max_time': 0.5
             },
             {
                 'url': reverse('post', kwargs={
@@ -65,7 +75,9 @@ class PostsUrlsTests(TestCase, AppUrlsTestBase):
                 }),
                 'link': f'/{TEST_USER_NAME}/{cls.post.id}/',
                 'login_required': None,
-                'template': 'post_view.html'
+                'template': 'post_view.html',
+                'max_queries': 2,
+                'max_time': 0.5
             },
             {
                 'url': reverse('post_edit', kwargs={
@@ -74,16 +86,22 @@ class PostsUrlsTests(TestCase, AppUrlsTestBase):
                 }),
                 'link': f'/{TEST_USER_NAME}/{cls.post.id}/edit/',
                 'login_required': True,
-                'template': 'post_form.html'
+                'template': 'post_form.html',
+                'max_queries': 6,
+                'max_time': 0.5
             },
         ]
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
+    def add_page_objects(self):
+        fill_pages(self.user, self.group, self.post)
+
     def test_post_edit_page_redirect_not_author(self):
         self.authorized_client.force_login(self.not_author)
 
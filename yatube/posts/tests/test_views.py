@@ -1,17 +1,29 @@
 import shutil
 import tempfile
+import time
+from io import StringIO
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.core.paginator import Page
 from django.test import Client, TestCase
 from django.urls import reverse
+from django.utils.http import http_date
 
+from common_lib.cache import fragment_stats, get_generations
+from common_lib.paginators import CursorPage
 from common_lib.testutils import AppViewsTestBase
 from posts.forms import PostForm, CommentForm
-from posts.models import Group, Post, Follow
+from posts.cache import post_scopes
+from posts.models import Comment, Follow, Group, Post
+from posts.tests.fixtures import fill_pages
+from posts.thumbnails import schedule_post_thumbnails
+from posts.views import PostsListView
+from yatube.settings import COMMENTS_PREVIEW_SIZE, PAGINATOR_PAGE_SIZE
 
 User = get_user_model()
 TEST_USER_NAME = 'TestUser'
@@ -79,7 +91,9 @@ class PostsViewsTests(TestCase, AppViewsTestBase):
                     ('page', Page)
                 ],
                 'excepted_objs': [cls.post],
-                'login_required': None
+                'login_required': None,
+                'max_queries': 4,
+                'max_time': 0.5
             },
             {
                 'url': reverse('follow_index'),
@@ -88,7 +102,9 @@ class PostsViewsTests(TestCase, AppViewsTestBase):
                     ('page', Page)
                 ],
                 'excepted_objs': [cls.post_following],
-                'login_required': True
+                'login_required': True,
+                'max_queries': 8,
+                'max_time': 0.5
             },
             {
                 'url': reverse('group', kwargs={'slug': TEST_GROUP_SLUG}),
@@ -98,7 +114,9 @@ class PostsViewsTests(TestCase, AppViewsTestBase):
                     ('page', Page)
                 ],
                 'excepted_objs': [cls.post, cls.group],
-                'login_required': None
+                'login_required': None,
+                'max_queries': 6,
+                'max_time': 0.5
             },
             {
                 'url': reverse('profile', kwargs={'username': TEST_USER_NAME}),
@@ -108,7 +126,9 @@ class PostsViewsTests(TestCase, AppViewsTestBase):
                     ('page', Page)
                 ],
                 'excepted_objs': [cls.post, cls.post.author],
-                'login_required': None
+                'login_required': None,
+                'max_queries': 5,
+                'max_time': 0.5
             },
             {
                 'url': reverse(
@@ -121,13 +141,17 @@ class PostsViewsTests(TestCase, AppViewsTestBase):
                     ('post', Post), ('comment_form', CommentForm)
                 ],
                 'excepted_objs': [cls.post],
-                'login_required': None
+                'login_required': None,
+                'max_queries': 3,
+                'max_time': 0.5
             },
             {
                 'url': reverse('post_new'),
                 'context_names_obj_types': [('form', PostForm)],
                 'excepted_objs': None,
-                'login_required': True
+                'login_required': True,
+                'max_queries': 4,
+                'max_time': 0.5
             },
             {
                 'url': reverse(
@@ -138,7 +162,9 @@ class PostsViewsTests(TestCase, AppViewsTestBase):
                 ),
                 'context_names_obj_types': [('form', PostForm)],
                 'excepted_objs': None,
-                'login_required': True
+                'login_required': True,
+                'max_queries': 6,
+                'max_time': 0.5
             }
         ]
 
@@ -149,11 +175,15 @@ class PostsViewsTests(TestCase, AppViewsTestBase):
         shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
+    def add_page_objects(self):
+        fill_pages(self.user, self.group, self.post)
+
     def test_another_group_page_post_with_group(self):
         response = self.guest_client.get(
             reverse(
@@ -164,7 +194,13 @@ class PostsViewsTests(TestCase, AppViewsTestBase):
         self.assertNotIn(self.post, response.context.get('posts'))
 
     def test_index_page_cache(self):
-        start_response = self.guest_client.get(reverse('index'))
+        fragment_stats.reset()
+        start_response = self.authorized_client.get(reverse('index'))
+        response_from_cache = self.authorized_client.get(reverse('index'))
+
+        self.assertEqual(start_response.content, response_from_cache.content)
+        self.assertEqual(fragment_stats.as_dict()['hits'], 1)
+        self.assertEqual(fragment_stats.as_dict()['misses'], 1)
 
         Post.objects.create(
             text='Текст еще одного тестового поста',
@@ -172,16 +208,170 @@ class PostsViewsTests(TestCase, AppViewsTestBase):
             author=self.user
         )
 
-        response_from_cache = self.guest_client.get(reverse('index'))
+        response_after_post = self.authorized_client.get(reverse('index'))
+        self.assertNotEqual(
+            response_from_cache.content, response_after_post.content
+        )
+
+    def test_anonymous_page_cache(self):
+        link = reverse('profile', kwargs={'username': TEST_USER_NAME})
+        start_response = self.guest_client.get(link)
+        etag = start_response['ETag']
+
+        with self.assertNumQueries(0):
+            response_from_cache = self.guest_client.get(link)
         self.assertEqual(start_response.content, response_from_cache.content)
 
+        response = self.guest_client.get(link, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # whole seconds can not tell apart changes within one second
+        self.assertFalse(start_response.has_header('Last-Modified'))
+        response = self.guest_client.get(
+            link, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.authorized_client.get(link, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.context)
+
+        Post.objects.create(text='Текст еще одного тестового поста',
+                            author=self.user)
+
+        response = self.guest_client.get(link, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_group_page_cache_invalidated_by_comment(self):
         cache.clear()
+        link = reverse('group', kwargs={'slug': TEST_GROUP_SLUG})
+        start_response = self.guest_client.get(link)
+
+        self.authorized_client.post(
+            reverse('add_comment', kwargs={
+                'username': TEST_USER_NAME,
+                'post_id': self.post.id
+            }),
+            data={'text': 'Новый комментарий'}
+        )
+
+        response = self.guest_client.get(link)
+        self.assertNotEqual(start_response.content, response.content)
+        self.assertContains(response, 'Новый комментарий')
+
+    def test_follow_page_cache_invalidated_by_follow(self):
+        link = reverse('follow_index')
+        self.assertContains(self.authorized_client.get(link),
+                            self.post_following.text)
+
+        Follow.objects.filter(user=self.user).delete()
+        self.assertNotContains(self.authorized_client.get(link),
+                               self.post_following.text)
 
-        response_cache_clear = self.guest_client.get(reverse('index'))
+        Follow.objects.create(user=self.user, author=self.user_following)
+        self.assertContains(self.authorized_client.get(link),
+                            self.post_following.text)
+
+    def test_group_page_cache_invalidated_by_moved_post(self):
+        link = reverse('group', kwargs={'slug': TEST_GROUP_SLUG})
+        self.assertContains(self.guest_client.get(link), self.post.text)
+        self.assertContains(self.authorized_client.get(link), self.post.text)
+
+        self.post.group = self.another_group
+        self.post.save()
+
+        self.assertNotContains(self.guest_client.get(link), self.post.text)
+        self.assertNotContains(self.authorized_client.get(link),
+                               self.post.text)
+
+    def test_author_pages_cache_invalidated_by_group_rename(self):
+        links = [
+            reverse('profile', kwargs={'username': TEST_USER_NAME}),
+            reverse('post', kwargs={'username': TEST_USER_NAME,
+                                    'post_id': self.post.id}),
+        ]
+        for link in links:
+            self.assertContains(self.guest_client.get(link),
+                                self.group.title)
+            self.assertContains(self.authorized_client.get(link),
+                                self.group.title)
+
+        self.group.title = 'Новое название группы'
+        self.group.save()
+
+        for link in links:
+            with self.subTest(link=link):
+                self.assertContains(self.guest_client.get(link),
+                                    'Новое название группы')
+                self.assertContains(self.authorized_client.get(link),
+                                    'Новое название группы')
+
+    @mock.patch('common_lib.thumbnails.THUMBNAIL_WORKERS', 0)
+    @mock.patch('common_lib.thumbnails.transaction.on_commit',
+                lambda func: func())
+    @mock.patch('common_lib.thumbnails.get_thumbnail')
+    def test_post_thumbnail_generated_in_background(self, get_thumbnail):
+        link = reverse('group', kwargs={'slug': TEST_GROUP_SLUG})
+
+        generations = get_generations(post_scopes(self.post))
+        schedule_post_thumbnails(self.post)
+
+        get_thumbnail.assert_called_once_with(
+            self.post.image.name, '960x339', crop='center', upscale=True
+        )
         self.assertNotEqual(
-            response_from_cache.content, response_cache_clear.content
+            get_generations(post_scopes(self.post)), generations
         )
 
+        get_thumbnail.reset_mock()
+        response = self.authorized_client.get(link)
+        self.assertContains(response, 'card-img bg-light')
+        get_thumbnail.assert_called_once()
+
+    @mock.patch('common_lib.thumbnails.THUMBNAIL_WORKERS', 0)
+    @mock.patch('common_lib.thumbnails.transaction.on_commit',
+                lambda func: func())
+    @mock.patch('common_lib.thumbnails.get_thumbnail')
+    def test_placeholder_pages_invalidated_by_thumbnail(self, get_thumbnail):
+        generations = get_generations(post_scopes(self.post))
+
+        response = self.guest_client.get(
+            reverse('group', kwargs={'slug': TEST_GROUP_SLUG})
+        )
+
+        self.assertContains(response, 'card-img bg-light')
+        get_thumbnail.assert_called_once()
+        self.assertNotEqual(
+            get_generations(post_scopes(self.post)), generations
+        )
+
+    @mock.patch('common_lib.thumbnails.get_thumbnail')
+    def test_generate_thumbnails_command(self, get_thumbnail):
+        generations = get_generations(post_scopes(self.post))
+
+        call_command('generate_thumbnails', stdout=StringIO())
+
+        get_thumbnail.assert_any_call(
+            self.post.image.name, '960x339', crop='center', upscale=True
+        )
+        self.assertNotEqual(
+            get_generations(post_scopes(self.post)), generations
+        )
+
+    @mock.patch('common_lib.thumbnails.get_thumbnail')
+    def test_generate_thumbnails_command_in_chunks(self, get_thumbnail):
+        Post.objects.create(text='Текст поста с картинкой',
+                            author=self.user, image=self.post.image.name)
+        bump = 'posts.management.commands.generate_thumbnails.bump_generation'
+
+        with mock.patch(bump) as bump_generation:
+            call_command('generate_thumbnails', '--chunk-size=1',
+                         stdout=StringIO())
+
+        self.assertEqual(get_thumbnail.call_count, 2)
+        self.assertEqual(bump_generation.call_count, 2)
+
     def test_user_unfollow(self):
         unfollow_link = reverse(
             'profile_unfollow', kwargs={
@@ -230,3 +420,196 @@ class PostsViewsTests(TestCase, AppViewsTestBase):
         self.assertNotIn(
             self.post_following, response.context.get('posts')
         )
+
+    def test_profile_stats_loaded_with_author(self):
+        response = self.guest_client.get(
+            reverse('profile', kwargs={'username': TEST_USER_NAME})
+        )
+        author = response.context.get('author')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(author.profile.posts_count, 1)
+            self.assertEqual(author.profile.followers_count, 0)
+
+    def test_feed_shows_latest_comments_only(self):
+        post = Post.objects.create(text='Пост с комментариями',
+                                   author=self.user)
+        comments = [
+            Comment.objects.create(text=f'Комментарий {i}', post=post,
+                                   author=self.user)
+            for i in range(COMMENTS_PREVIEW_SIZE + 2)
+        ]
+        cache.clear()
+
+        response = self.guest_client.get(reverse('index'))
+        feed_post = response.context.get('posts')[0]
+        self.assertEqual(feed_post.comment_count, len(comments))
+        self.assertEqual(
+            feed_post.comments_list,
+            comments[::-1][:COMMENTS_PREVIEW_SIZE]
+        )
+
+        response = self.guest_client.get(
+            reverse('post', kwargs={
+                'username': TEST_USER_NAME,
+                'post_id': post.id
+            })
+        )
+        detail_post = response.context.get('post')
+        self.assertEqual(detail_post.comment_count, len(comments))
+        self.assertEqual(detail_post.comments_list, comments[::-1])
+
+
+class PostsCursorPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username=TEST_USER_NAME)
+
+        cls.posts = [
+            Post.objects.create(text=f'Текст тестового поста {i}',
+                                author=cls.user)
+            for i in range(PAGINATOR_PAGE_SIZE * 2 + 3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+        patcher = mock.patch.object(PostsListView, 'cursor_pagination', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cursor_pages_walk_all_posts(self):
+        response = self.guest_client.get(reverse('index'))
+        page = response.context.get('page')
+        self.assertIsInstance(page, CursorPage)
+        self.assertFalse(page.has_previous())
+
+        seen = list(page)
+        while page.has_next():
+            response = self.guest_client.get(
+                reverse('index'), {'after': page.next_cursor}
+            )
+            page = response.context.get('page')
+            seen.extend(page)
+
+        self.assertEqual(seen, sorted(self.posts, key=lambda p: (
+            p.pub_date, p.id), reverse=True))
+
+        response = self.guest_client.get(
+            reverse('index'), {'before': page.previous_cursor}
+        )
+        self.assertEqual(
+            list(response.context.get('page')),
+            seen[PAGINATOR_PAGE_SIZE:PAGINATOR_PAGE_SIZE * 2]
+        )
+
+    def test_page_number_links_still_work(self):
+        response = self.guest_client.get(reverse('index'), {'page': 2})
+        self.assertIsInstance(response.context.get('page'), Page)
+        self.assertEqual(response.context.get('page').number, 2)
+
+    def test_invalid_cursor(self):
+        response = self.guest_client.get(reverse('index'), {'after': '!!'})
+        self.assertEqual(response.status_code, 404)
+
+
+class PostsSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username=TEST_USER_NAME)
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+
+        cls.post = Post.objects.create(
+            text='Прогулка по осеннему лесу', author=cls.user
+        )
+        cls.frequent_post = Post.objects.create(
+            text='Лес, лес и снова лес', author=cls.user
+        )
+        cls.other_post = Post.objects.create(
+            text='Рецепт яблочного пирога', author=cls.user
+        )
+        cls.comment = Comment.objects.create(
+            text='Пирог получился <b>отличный</b>', post=cls.post,
+            author=cls.user
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def search(self, query, **params):
+        response = self.guest_client.get(reverse('search'),
+                                         {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.context.get('page')
+
+    def test_hits_ranked_by_relevance(self):
+        hits = list(self.search('ЛЕС'))
+        self.assertEqual([hit.post for hit in hits],
+                         [self.frequent_post, self.post])
+        self.assertIn('<mark>Лес</mark>', hits[0].snippet)
+        self.assertIn('<mark>лесу</mark>', hits[1].snippet)
+
+    def test_comment_hits_escaped(self):
+        hits = list(self.search('отличный'))
+        self.assertEqual(len(hits), 1)
+        self.assertTrue(hits[0].is_comment)
+        self.assertEqual(hits[0].post, self.post)
+        self.assertIn('&lt;b&gt;<mark>отличный</mark>&lt;/b&gt;',
+                      hits[0].snippet)
+
+    def test_index_follows_changes(self):
+        self.other_post.text = 'Рецепт грибного супа'
+        self.other_post.save()
+        self.assertEqual(list(self.search('яблочного')), [])
+        self.assertEqual(len(self.search('грибного')), 1)
+
+        self.post.delete()
+        self.assertEqual(list(self.search('отличный')), [])
+        self.assertEqual(len(self.search('лес')), 1)
+
+    def test_query_syntax_ignored(self):
+        self.assertEqual(list(self.search('"лес* OR (')), [])
+        self.assertEqual(len(self.search('лес AND')), 0)
+        self.assertIsNone(self.search('  '))
+
+    def test_cursor_pages_walk_all_hits(self):
+        posts = [
+            Post.objects.create(text=f'Грибы номер {i}', author=self.user)
+            for i in range(7)
+        ]
+        with mock.patch('posts.views.PAGINATOR_PAGE_SIZE', 3):
+            page = self.search('грибы')
+            seen = list(page)
+            while page.has_next():
+                page = self.search('грибы', after=page.next_cursor)
+                seen.extend(page)
+
+            previous = self.search('грибы', before=page.previous_cursor)
+
+        self.assertCountEqual([hit.post for hit in seen], posts)
+        self.assertEqual(len(seen), len(posts))
+        self.assertEqual([hit.rowid for hit in previous],
+                         [hit.rowid for hit in seen[3:6]])
+
+    def test_invalid_cursor(self):
+        response = self.guest_client.get(reverse('search'),
+                                         {'q': 'лес', 'after': '!!'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_admin_search(self):
+        client = Client()
+        client.force_login(self.admin)
+        response = client.get(reverse('admin:posts_post_changelist'),
+                              {'q': 'лес'})
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.post, self.frequent_post}
+        )
@@ -0,0 +1,42 @@
+""" Background thumbnails of :model:'posts.Post' images. """
+
+import logging
+
+from common_lib.cache import bump_generation
+from common_lib.thumbnails import cached_thumbnail, schedule_thumbnails
+from yatube.settings import POST_THUMBNAIL_GEOMETRIES
+
+from .cache import post_scopes
+
+logger = logging.getLogger(__name__)
+
+
+def schedule_post_thumbnails(post):
+    """
+    Queue thumbnails of the post image, cached feeds showing the post
+    with a placeholder are invalidated once the thumbnails are ready.
+    """
+    if not post.image:
+        return
+
+    scopes = post_scopes(post)
+    schedule_thumbnails(post.image, POST_THUMBNAIL_GEOMETRIES,
+                        callback=lambda: bump_generation(*scopes))
+
+
+def ready_post_thumbnail(post):
+    """
+    Return the card thumbnail of the post image if it is already generated,
+    otherwise queue thumbnails of the post and return None.
+    """
+    if not post.image:
+        return None
+    geometry_string, options = POST_THUMBNAIL_GEOMETRIES[0]
+    try:
+        thumbnail = cached_thumbnail(post.image, geometry_string, **options)
+    except Exception:
+        logger.exception("Thumbnail lookup failed for '%s'", post.image)
+        return None
+    if thumbnail is None:
+        schedule_post_thumbnails(post)
+    return thumbnail
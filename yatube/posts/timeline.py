@@ -0,0 +1,102 @@
+"""
+Follow feed of a user read from :model:'posts.TimelineEntry'.
+
+A page is read from the user's timeline by 'posts_timeline_user_date_idx'
+with a LIMIT, from an offset or a '(pub_date, post)' keyset cursor. Posts
+of followed authors which are not fanned out are read by
+'posts_post_author_date_idx' with the same bounds, one author at a time,
+and merged with the timeline by date. Only posts of the page are loaded,
+by their primary keys.
+"""
+
+import heapq
+from itertools import islice
+
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .models import Follow, Post, TimelineEntry
+
+
+class TimelineFeed:
+    """
+    Sliceable follow feed of 'user' for paginators, posts are loaded
+    from 'queryset'. :class:'CursorPaginator' pages it by 'keyset'.
+    """
+    # posts are ordered by '(-pub_date, -pk)'
+    ordered = True
+
+    def __init__(self, queryset, user):
+        self.queryset = queryset
+        self.user = user
+
+    @cached_property
+    def merged_authors(self):
+        """ Return ids of followed authors whose posts are not fanned out. """
+        return list(
+            Follow.objects.filter(
+                user=self.user, author__profile__timeline_merged=True
+            ).values_list("author_id", flat=True)
+        )
+
+    def sources(self):
+        """ Return '(queryset, pk field)' pairs of posts of the feed. """
+        sources = [(TimelineEntry.objects.filter(user=self.user), "post_id")]
+        sources.extend((Post.objects.filter(author_id=author_id), "pk")
+                       for author_id in self.merged_authors)
+        return sources
+
+    def count(self):
+        count = TimelineEntry.objects.filter(user=self.user).count()
+        if self.merged_authors:
+            count += Post.objects.filter(
+                author_id__in=self.merged_authors
+            ).count()
+        return count
+
+    @staticmethod
+    def source_keys(queryset, pk_field, limit, after=None, before=None):
+        if before:
+            value, pk = before
+            queryset = (queryset.filter(Q(pub_date__gt=value)
+                                        | Q(pub_date=value,
+                                            **{f"{pk_field}__gt": pk}))
+                                .order_by("pub_date", pk_field))
+        else:
+            queryset = queryset.order_by("-pub_date", f"-{pk_field}")
+            if after:
+                value, pk = after
+                queryset = queryset.filter(Q(pub_date__lt=value)
+                                           | Q(pub_date=value,
+                                               **{f"{pk_field}__lt": pk}))
+        return list(queryset.values_list("pub_date", pk_field)[:limit])
+
+    def keys(self, limit, offset=0, after=None, before=None):
+        """
+        Return '(pub_date, pk)' keys of 'limit' posts from 'offset',
+        following the key 'after' in descending order or preceding the key
+        'before' in ascending order.
+        """
+        merged = heapq.merge(
+            *(self.source_keys(queryset, pk_field, offset + limit,
+                               after, before)
+              for queryset, pk_field in self.sources()),
+            reverse=not before
+        )
+        return list(islice(merged, offset, offset + limit))
+
+    def load(self, keys, descending=True):
+        """ Return a queryset of posts of 'keys' in the feed order. """
+        ordering = ("-pub_date", "-pk") if descending else ("pub_date", "pk")
+        return (self.queryset.filter(pk__in=[pk for _, pk in keys])
+                             .order_by(*ordering))
+
+    def keyset(self, limit, after=None, before=None):
+        keys = self.keys(limit, after=after, before=before)
+        return list(self.load(keys, descending=not before))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start = index.start or 0
+            return self.load(self.keys(index.stop - start, offset=start))
+        return self[index:index + 1][0]
@@ -0,0 +1,273 @@
+"""
+Streaming JSON Lines export and import of users, groups, posts, comments
+and follows, used by 'export_posts' and 'import_posts' commands.
+
+Every line is '{"model": ..., "pk": ..., "fields": {...}}', models follow
+in dependency order, so an import needs a single pass over the file.
+"""
+
+import json
+import time
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import F, Max
+from django.utils.dateparse import parse_datetime
+
+from users.models import UserProfile
+
+from .cache import POSTS_SCOPE, author_scope, follow_scope, group_scope
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+USER = "user"
+GROUP = "group"
+POST = "post"
+COMMENT = "comment"
+FOLLOW = "follow"
+
+USER_FIELDS = ("username", "email", "first_name", "last_name", "password",
+               "is_active", "is_staff", "is_superuser", "date_joined",
+               "last_login")
+
+
+def export_querysets():
+    """ Return '(model name, values queryset)' pairs in dependency order. """
+    return (
+        (USER, User.objects.order_by("pk").values(
+            "pk", *USER_FIELDS, avatar=F("profile__avatar")
+        )),
+        (GROUP, Group.objects.order_by("pk").values(
+            "pk", "title", "slug", "description"
+        )),
+        (POST, Post.objects.order_by("pk").values(
+            "pk", "text", "pub_date", "author", "group", "image"
+        )),
+        (COMMENT, Comment.objects.order_by("pk").values(
+            "pk", "text", "created", "post", "author"
+        )),
+        (FOLLOW, Follow.objects.order_by("pk").values(
+            "pk", "user", "author"
+        )),
+    )
+
+
+class Encoder(json.JSONEncoder):
+    """ JSON encoder keeping microseconds of dates, unlike Django's one. """
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def export_lines(chunk_size=2000):
+    """ Yield '(model name, JSON line)' pairs of all exported rows. """
+    encoder = Encoder(ensure_ascii=False)
+    for model, queryset in export_querysets():
+        for values in queryset.iterator(chunk_size=chunk_size):
+            pk = values.pop("pk")
+            yield model, encoder.encode(
+                {"model": model, "pk": pk, "fields": values}
+            )
+
+
+def bulk_create_dated(model, objects):
+    """
+    'bulk_create' the objects keeping their values of 'auto_now_add'
+    fields. Rows are inserted raw, like 'loaddata' does, so no field
+    fills in its value on save and the imported dates are written by the
+    INSERT itself. Changing the field definition instead would affect
+    other writers.
+    """
+    objects = list(objects)
+    fields = model._meta.local_concrete_fields
+    batch_size = max(connection.ops.bulk_batch_size(fields, objects), 1)
+    for start in range(0, len(objects), batch_size):
+        model._base_manager._insert(objects[start:start + batch_size],
+                                    fields=fields, raw=True)
+
+
+def max_pk(model):
+    return model.objects.aggregate(value=Max("pk"))["value"] or 0
+
+
+class Importer:
+    """
+    Import rows of 'export_lines' with batched 'bulk_create', one
+    transaction per batch and no model signals.
+
+    Users and groups matching existing ones by username or slug are
+    reused. New rows get primary keys shifted past the current maximum,
+    'old pk + offset', so foreign keys of posts, comments and follows are
+    remapped without keeping maps of them in memory.
+    """
+
+    def __init__(self, batch_size=5000, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress or (lambda model, count, rate: None)
+        self.offsets = {model: max_pk(model_class) for model, model_class in
+                        ((USER, User), (GROUP, Group), (POST, Post),
+                         (COMMENT, Comment), (FOLLOW, Follow))}
+        self.users = {}
+        self.groups = {}
+        # Authors and groups with imported posts, to invalidate their pages.
+        self.authors = set()
+        self.posted_groups = set()
+        self.followers = set()
+        self.counts = dict.fromkeys(self.offsets, 0)
+
+    def run(self, lines):
+        model, batch = None, []
+        started = time.monotonic()
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["model"] != model or len(batch) >= self.batch_size:
+                self.flush(model, batch, started)
+                model, batch = record["model"], []
+            batch.append(record)
+        self.flush(model, batch, started)
+
+        self.reset_sequences()
+        return self.counts
+
+    def flush(self, model, batch, started):
+        if not batch:
+            return
+        handler = getattr(self, f"import_{model}", None)
+        if handler is None:
+            raise ValueError(f"Unknown model '{model}' in import file")
+
+        with transaction.atomic():
+            handler(batch)
+
+        self.counts[model] += len(batch)
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.progress(model, self.counts[model],
+                      sum(self.counts.values()) / elapsed)
+
+    def new_pk(self, model, pk):
+        return pk + self.offsets[model]
+
+    def import_user(self, batch):
+        existing = dict(
+            User.objects.filter(
+                username__in=[record["fields"]["username"]
+                              for record in batch]
+            ).values_list("username", "pk")
+        )
+        users, profiles = [], []
+        for record in batch:
+            fields = record["fields"]
+            avatar = fields.pop("avatar", None)
+            pk = existing.get(fields["username"])
+            if pk is None:
+                pk = self.new_pk(USER, record["pk"])
+                for name in ("date_joined", "last_login"):
+                    fields[name] = parse_datetime(fields[name] or "")
+                users.append(User(pk=pk, **fields))
+                profile = UserProfile(user_id=pk)
+                if avatar:
+                    profile.avatar = avatar
+                profiles.append(profile)
+            self.users[record["pk"]] = pk
+
+        User.objects.bulk_create(users)
+        UserProfile.objects.bulk_create(profiles)
+
+    def import_group(self, batch):
+        existing = dict(
+            Group.objects.filter(
+                slug__in=[record["fields"]["slug"] for record in batch]
+            ).values_list("slug", "pk")
+        )
+        groups = []
+        for record in batch:
+            pk = existing.get(record["fields"]["slug"])
+            if pk is None:
+                pk = self.new_pk(GROUP, record["pk"])
+                groups.append(Group(pk=pk, **record["fields"]))
+            self.groups[record["pk"]] = pk
+
+        Group.objects.bulk_create(groups)
+
+    def import_post(self, batch):
+        for record in batch:
+            self.authors.add(self.users[record["fields"]["author"]])
+            if record["fields"]["group"] is not None:
+                self.posted_groups.add(self.groups[record["fields"]["group"]])
+
+        bulk_create_dated(Post, (
+            Post(pk=self.new_pk(POST, record["pk"]),
+                 text=record["fields"]["text"],
+                 pub_date=parse_datetime(record["fields"]["pub_date"]),
+                 author_id=self.users[record["fields"]["author"]],
+                 group_id=self.groups.get(record["fields"]["group"]),
+                 image=record["fields"]["image"] or "")
+            for record in batch
+        ))
+
+    def import_comment(self, batch):
+        bulk_create_dated(Comment, (
+            Comment(pk=self.new_pk(COMMENT, record["pk"]),
+                    text=record["fields"]["text"],
+                    created=parse_datetime(record["fields"]["created"]),
+                    post_id=self.new_pk(POST, record["fields"]["post"]),
+                    author_id=self.users[record["fields"]["author"]])
+            for record in batch
+        ))
+
+    def import_follow(self, batch):
+        self.followers.update(self.users[record["fields"]["user"]]
+                              for record in batch)
+        # an existing (user, author) pair wins over the imported one
+        Follow.objects.bulk_create(
+            (Follow(pk=self.new_pk(FOLLOW, record["pk"]),
+                    user_id=self.users[record["fields"]["user"]],
+                    author_id=self.users[record["fields"]["author"]])
+             for record in batch),
+            ignore_conflicts=True
+        )
+
+    def changed_scopes(self, chunk_size=500):
+        """
+        Return cache generation scopes of pages showing new posts, also
+        names of their cached counts.
+        """
+        scopes = [POSTS_SCOPE]
+        followers = set(self.followers)
+        authors = sorted(self.authors)
+        for start in range(0, len(authors), chunk_size):
+            followers.update(
+                Follow.objects.filter(
+                    author_id__in=authors[start:start + chunk_size]
+                ).values_list("user_id", flat=True)
+            )
+        scopes.extend(map(follow_scope, sorted(followers)))
+        for queryset, ids, scope in (
+            (User.objects.values_list("username", flat=True),
+             sorted(self.authors), author_scope),
+            (Group.objects.values_list("slug", flat=True),
+             sorted(self.posted_groups), group_scope),
+        ):
+            for start in range(0, len(ids), chunk_size):
+                scopes.extend(
+                    scope(name) for name in
+                    queryset.filter(pk__in=ids[start:start + chunk_size])
+                )
+        return scopes
+
+    @staticmethod
+    def reset_sequences():
+        """ Move database sequences past the explicitly inserted keys. """
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, UserProfile, Group, Post, Comment, Follow]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
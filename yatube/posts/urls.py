@@ -2,7 +2,8 @@
 
 from django.urls import path
 
-from .views import add_comment, profile_follow, profile_unfollow
+from .views import (add_comment, events_unavailable, profile_follow,
+                    profile_unfollow, search_posts)
 from .views import PostDetailView as PostDetail
 from .views import PostFormCreateView as PostCreate
 from .views import PostFormUpdateView as PostUpdate
@@ -12,6 +13,8 @@ urlpatterns = [
     path("", PostsList.as_view(), name="index"),
     path("new/", PostCreate.as_view(), name="post_new"),
     path("follow/", PostsList.as_view(), name="follow_index"),
+    path("search/", search_posts, name="search"),
+    path("events/", events_unavailable, name="events"),
     path("group/<slug:slug>/", PostsList.as_view(), name="group"),
     path("<str:username>/", PostsList.as_view(), name="profile"),
     path("<str:username>/follow/", profile_follow, name="profile_follow"),
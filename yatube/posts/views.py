@@ -1,21 +1,75 @@
 """ Class based views for 'posts' application. """
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.db.models.query import Prefetch
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
 from django.utils.decorators import method_decorator
+from django.utils.http import urlencode
 from django.views.generic import DetailView, CreateView, UpdateView, ListView
 
-from common_lib.decorators import author_required, login_required_for_page
-from yatube.settings import PAGINATOR_PAGE_SIZE
+from common_lib.decorators import (anonymous_page_cache, author_required,
+                                   login_required_for_page, retry_on_locked)
+from common_lib.paginators import (CachedCountPaginator, CursorPaginator,
+                                   InvalidCursor)
+from yatube.settings import (COMMENTS_PREVIEW_SIZE, PAGE_CACHE_TIMEOUT,
+                             PAGINATOR_CURSOR_MODE,
+                             PAGINATOR_FOLLOW_COUNT_TIMEOUT,
+                             PAGINATOR_PAGE_SIZE, POSTS_CACHE_TIMEOUT)
 
+from .cache import follow_scope, page_scopes
 from .forms import PostForm, CommentForm
-from .models import Group, Post, Comment
+from .models import Comment, Follow, Group, Post
+from .search import SearchPaginator
+from .thumbnails import schedule_post_thumbnails
+from .timeline import TimelineFeed
 
 User = get_user_model()
 
+# Profile counters rendered in 'author_profile.html'
+AUTHOR_STATS_FIELDS = (
+    "profile__id",
+    "profile__followers_count",
+    "profile__following_count",
+    "profile__posts_count",
+)
+
+
+def comments_prefetch(limit=None):
+    """
+    Return a Prefetch of post comments into 'comments_list' attribute.
+    With 'limit' only the latest 'limit' comments of every post are
+    fetched, selected by a per-post correlated subquery.
+    """
+    comments = (Comment.objects
+                       .select_related("author")
+                       .only("id", "post_id", "text", "created",
+                             "author__id", "author__username")
+                       .order_by("-created", "-pk"))
+    if limit is not None:
+        latest = (Comment.objects
+                         .filter(post_id=OuterRef("post_id"))
+                         .order_by("-created", "-pk")
+                         .values("pk")[:limit])
+        comments = comments.filter(pk__in=Subquery(latest))
+    return Prefetch("comments", queryset=comments, to_attr="comments_list")
+
+
+def comment_count_annotation():
+    """ Return a subquery counting comments of every post. """
+    count = (Comment.objects
+                    .filter(post_id=OuterRef("pk"))
+                    .order_by()
+                    .values("post_id")
+                    .annotate(count=Count("pk"))
+                    .values("count"))
+    return Coalesce(Subquery(count, output_field=IntegerField()), 0)
+
 
 @method_decorator(login_required_for_page(
     reverse_address_list=[
@@ -23,37 +77,44 @@ User = get_user_model()
     ]),
     name="dispatch"
 )
+@method_decorator(anonymous_page_cache(page_scopes, PAGE_CACHE_TIMEOUT),
+                  name="dispatch")
 class PostsListView(ListView):
     """ ListView class for :model:'posts.Post'. """
     template_name = "posts_view.html"
     paginate_by = PAGINATOR_PAGE_SIZE
+    paginator_class = CachedCountPaginator
+    cursor_pagination = PAGINATOR_CURSOR_MODE
     context_object_name = "posts"
 
-    def get_queryset(self):
+    def get_posts_queryset(self):
         """
-        Override 'get_queryset' to get the list depending on the url parameters
-        - If no parameters, take all posts
-        - If there is a slug, take posts filtered by group
-        - If there is a username, take posts filtered by user
+        Return posts with their author, group, comment count and latest
+        comments, the fields rendered in 'posts_view.html' only.
         """
-        postsManager = (
+        return (
             Post.objects.select_related("author", "group")
+                        .annotate(comment_count=comment_count_annotation())
                         .prefetch_related(
-                            Prefetch(
-                                "comments",
-                                queryset=Comment.objects
-                                                .select_related("author")
-                                                .only(
-                                                    "id", "post_id", "text",
-                                                    "created", "author__id",
-                                                    "author__username"
-                                                )))
+                            comments_prefetch(limit=COMMENTS_PREVIEW_SIZE))
                         .only("id", "text", "pub_date", "group_id",
                               "author_id", "image", "group__id",
                               "group__title", "group__slug", "author__id",
                               "author__username")
         )
 
+    def is_follow_feed(self):
+        return self.request.path == reverse_lazy("follow_index")
+
+    def get_queryset(self):
+        """
+        Override 'get_queryset' to get the list depending on the url parameters
+        - If no parameters, take all posts
+        - If there is a slug, take posts filtered by group
+        - If there is a username, take posts filtered by user
+        """
+        postsManager = self.get_posts_queryset()
+
         # process Group page request
         if self.kwargs.get("slug"):
             slug = self.kwargs.get("slug")
@@ -65,14 +126,49 @@ class PostsListView(ListView):
             return postsManager.filter(author__username=username)
 
         # process Follow page request
-        if self.request.path == reverse_lazy("follow_index"):
-            return postsManager.filter(
-                author__following__user=self.request.user
-            )
+        if self.is_follow_feed():
+            return TimelineFeed(postsManager, self.request.user)
 
         # process Index page request
         return postsManager
 
+    def get_paginator(self, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True, **kwargs):
+        """
+        Override 'get_paginator' to cache the posts count of the feed,
+        it is invalidated by signals in 'posts.models'.
+        """
+        if self.is_follow_feed():
+            count_name = follow_scope(self.request.user.pk)
+            count_timeout = PAGINATOR_FOLLOW_COUNT_TIMEOUT
+        else:
+            count_name = page_scopes(self.request, **self.kwargs)[0]
+            count_timeout = POSTS_CACHE_TIMEOUT
+        return super().get_paginator(
+            queryset, per_page, orphans, allow_empty_first_page,
+            count_name=count_name, count_timeout=count_timeout,
+            estimate_above=settings.PAGINATOR_ESTIMATE_ABOVE, **kwargs
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Override 'paginate_queryset' to paginate by '(pub_date, id)' cursor
+        when the cursor mode is on. Old '?page=' links are still served
+        by the default paginator.
+        """
+        if not self.cursor_pagination or self.page_kwarg in self.request.GET:
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.page(
+                after=self.request.GET.get(paginator.after_kwarg),
+                before=self.request.GET.get(paginator.before_kwarg)
+            )
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
     def get_context_data(self, **kwargs):
         """
         Override 'get_context_data' to add data to the context
@@ -82,6 +178,8 @@ class PostsListView(ListView):
         """
         data = super().get_context_data(**kwargs)
         data["page"] = data.pop("page_obj")  # hot fix for paginator tests :)
+        data["cache_scopes"] = page_scopes(self.request, **self.kwargs)
+        data["cache_timeout"] = POSTS_CACHE_TIMEOUT
 
         # process Group page request
         if self.kwargs.get("slug"):
@@ -93,7 +191,9 @@ class PostsListView(ListView):
         if self.kwargs.get("username"):
             username = self.kwargs.get("username")
             author = get_object_or_404(
-                User.objects.only("username", "first_name", "last_name"),
+                User.objects.select_related("profile")
+                            .only("username", "first_name", "last_name",
+                                  *AUTHOR_STATS_FIELDS),
                 username=username
             )
             params = {
@@ -106,40 +206,45 @@ class PostsListView(ListView):
             data.update(params)
             return data
 
-        # process Index page request
+        # process Index page request, new posts are announced on the
+        # first page, see 'live_updates.html'
+        if not data["page"].has_previous():
+            data["live_feed"] = "follow" if self.is_follow_feed() else "index"
         return data
 
 
+@method_decorator(anonymous_page_cache(page_scopes, PAGE_CACHE_TIMEOUT),
+                  name="dispatch")
 class PostDetailView(DetailView):
     """ DetailView class for :model:'posts.Post'. """
     template_name = "post_view.html"
     context_object_name = "post"
     pk_url_kwarg = "post_id"
 
-    def get_queryset(self):
+    def get_posts_queryset(self):
         """
-        Override 'get_queryset' to get the object depending on
-        :model:'posts.Post' id and :model:'auth.User' username parameters
+        Return posts with their author and profile, group and all comments,
+        the fields rendered in 'post_view.html' only.
         """
-        username = self.kwargs.get("username")
         return (Post.objects
-                    .select_related("author", "group")
-                    .prefetch_related(
-                        Prefetch(
-                            "comments",
-                            queryset=Comment.objects
-                                            .select_related("author")
-                                            .only(
-                                                "id", "post_id", "text",
-                                                "created", "author__id",
-                                                "author__username"
-                                            )))
+                    .select_related("author__profile", "group")
+                    .annotate(comment_count=comment_count_annotation())
+                    .prefetch_related(comments_prefetch())
                     .only("id", "text", "pub_date", "group_id",
                           "author_id", "image", "group__id",
                           "group__title", "group__slug", "author__id",
                           "author__username", "author__first_name",
-                          "author__last_name")
-                    .filter(author__username=username))
+                          "author__last_name",
+                          *(f"author__{field}"
+                            for field in AUTHOR_STATS_FIELDS)))
+
+    def get_queryset(self):
+        """
+        Override 'get_queryset' to get the object depending on
+        :model:'posts.Post' id and :model:'auth.User' username parameters
+        """
+        username = self.kwargs.get("username")
+        return self.get_posts_queryset().filter(author__username=username)
 
     def get_context_data(self, **kwargs):
         """
@@ -163,6 +268,7 @@ class PostDetailView(DetailView):
 
 
 @method_decorator(login_required, name="dispatch")
+@method_decorator(retry_on_locked, name="form_valid")
 class PostFormCreateView(CreateView):
     """ CreateView class for :model:'posts.Post'. """
     form_class = PostForm
@@ -176,6 +282,7 @@ class PostFormCreateView(CreateView):
         post = form.save(commit=False)
         post.author = self.request.user
         post.save()
+        schedule_post_thumbnails(post)
         return redirect(reverse_lazy("index"))
 
 
@@ -194,6 +301,15 @@ class PostFormUpdateView(UpdateView):
         username = self.kwargs.get("username")
         return (Post.objects.filter(author__username=username))
 
+    def form_valid(self, form):
+        """
+        Override 'form_valid' to queue thumbnails of a changed image.
+        """
+        response = super().form_valid(form)
+        if "image" in form.changed_data:
+            schedule_post_thumbnails(self.object)
+        return response
+
     def get_success_url(self):
         """
         Override 'get_success_url' to get the url depending on
@@ -202,7 +318,37 @@ class PostFormUpdateView(UpdateView):
         return reverse_lazy("post", kwargs=self.kwargs)
 
 
+def search_posts(request):
+    """
+    Full-text search over posts and comments, ranked by relevance and
+    paginated with cursors.
+    """
+    query = request.GET.get("q", "").strip()
+    page = None
+
+    if query:
+        paginator = SearchPaginator(
+            Post.objects.select_related("author", "group"),
+            query,
+            PAGINATOR_PAGE_SIZE
+        )
+        try:
+            page = paginator.page(
+                after=request.GET.get(paginator.after_kwarg),
+                before=request.GET.get(paginator.before_kwarg)
+            )
+        except InvalidCursor as e:
+            raise Http404(str(e))
+
+    return render(request, "search.html", {
+        "query": query,
+        "page": page,
+        "cursor_query": urlencode({"q": query}),
+    })
+
+
 @login_required
+@retry_on_locked
 def add_comment(request, **kwargs):
     form = CommentForm(request.POST or None)
 
@@ -222,13 +368,13 @@ def add_comment(request, **kwargs):
 
 
 @login_required
+@retry_on_locked
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
 
-    is_following = author.following.filter(user=request.user).exists()
-
-    if author != request.user and not is_following:
-        author.following.create(user=request.user, author=author)
+    # unique (user, author) constraint makes 'get_or_create' race safe
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
 
     return redirect("profile", username)
 
@@ -236,14 +382,19 @@ def profile_follow(request, username):
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    following = author.following.filter(user=request.user)
-
-    if following.exists():
-        following.delete()
+    author.following.filter(user=request.user).delete()
 
     return redirect("profile", username)
 
 
+def events_unavailable(request):
+    """
+    Answer the event stream URL when the site runs under WSGI, 'No
+    Content' stops 'EventSource' reconnects. See 'posts.events'.
+    """
+    return HttpResponse(status=204)
+
+
 def page_not_found(request, exception):
     return render(
         request,
@@ -1,14 +1,47 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+
+USER_CACHE_KEY_PREFIX = "auth_user"
+
+
+def user_cache_key(user_id):
+    return f"{USER_CACHE_KEY_PREFIX}:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    """
+    Drop the cached user right away and once more after commit, so
+    a request reading the old row meanwhile can't cache it back.
+    """
+    key = user_cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
 
 
 class ModelBackendUserWithProfile(ModelBackend):
+    """
+    Load the user together with the profile shown in navigation. The pair
+    is cached for 'AUTH_USER_CACHE_TIMEOUT' seconds, 0 disables caching.
+    Saving a user or a profile invalidates the entry, changes made with
+    'QuerySet.update' are picked up when it expires.
+    """
 
     def get_user(self, user_id):
-        try:
-            user = (get_user_model()._default_manager
-                                    .select_related("profile")
-                                    .get(pk=user_id))
-        except get_user_model().DoesNotExist:
-            return None
+        timeout = settings.AUTH_USER_CACHE_TIMEOUT
+        key = user_cache_key(user_id)
+        user = cache.get(key) if timeout else None
+
+        if user is None:
+            try:
+                user = (get_user_model()._default_manager
+                                        .select_related("profile")
+                                        .get(pk=user_id))
+            except get_user_model().DoesNotExist:
+                return None
+            if timeout:
+                cache.set(key, user, timeout)
+
         return user if self.user_can_authenticate(user) else None
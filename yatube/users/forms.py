@@ -3,6 +3,13 @@
 from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
+from django.db import transaction
+from django.urls import Resolver404, resolve, reverse
+
+from common_lib.images import normalize_upload
+from yatube.settings import AVATAR_MAX_EDGE
+
+from .models import UserProfile
 
 User = get_user_model()
 
@@ -20,14 +27,38 @@ class CreationForm(UserCreationForm):
         model = User
         fields = ("first_name", "last_name", "username", "email")
 
+    def clean_username(self):
+        """
+        Reject names whose profile address is taken by another page of
+        the site, like 'search' or 'events'.
+        """
+        username = self.cleaned_data.get("username")
+        try:
+            match = resolve(reverse("profile", args=[username]))
+        except Resolver404:
+            match = None
+        if match is None or match.url_name != "profile":
+            raise forms.ValidationError(
+                "Это имя совпадает с адресом страницы сайта, выберите "
+                "другое."
+            )
+        return username
+
+    def clean_avatar(self):
+        return normalize_upload(self.cleaned_data.get("avatar"),
+                                AVATAR_MAX_EDGE)
+
     def save(self, commit=True):
         user = super().save(commit=False)
 
+        # the profile with an uploaded avatar is inserted together with
+        # the user, see 'users.models.create_user_profile'
+        _avatar = self.cleaned_data.get("avatar")
+        if _avatar:
+            user.profile = UserProfile(avatar=_avatar)
+
         if commit:
-            user.save()
-            _avatar = self.files.get("avatar")
-            if _avatar:
-                user.profile.avatar = _avatar
-                user.profile.save()
+            with transaction.atomic():
+                user.save()
 
         return user
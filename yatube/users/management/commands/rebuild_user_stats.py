@@ -0,0 +1,44 @@
+""" Rebuild denormalized counters of :model:'users.UserProfile'. """
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Comment, Follow, Post
+from users.models import UserProfile
+
+User = get_user_model()
+
+
+def count_by(queryset, field):
+    """ Return a correlated subquery counting 'queryset' rows per user. """
+    subquery = (queryset.filter(**{field: OuterRef("user_id")})
+                        .order_by()
+                        .values(field)
+                        .annotate(count=Count("pk"))
+                        .values("count"))
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = "Recount followers, following, posts and comments of every user."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            missing = User.objects.filter(profile__isnull=True)
+            UserProfile.objects.bulk_create(
+                UserProfile(user=user) for user in missing.iterator()
+            )
+
+            updated = UserProfile.objects.update(
+                followers_count=count_by(Follow.objects, "author"),
+                following_count=count_by(Follow.objects, "user"),
+                posts_count=count_by(Post.objects, "author"),
+                comments_count=count_by(Comment.objects, "author"),
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt stats of {updated} user profiles."
+        ))
@@ -0,0 +1,57 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_by(queryset, field):
+    subquery = (queryset.filter(**{field: OuterRef("user_id")})
+                        .order_by()
+                        .values(field)
+                        .annotate(count=Count("pk"))
+                        .values("count"))
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    """ Count followers, following, posts and comments of every user. """
+    Follow = apps.get_model("posts", "Follow")
+    apps.get_model("users", "UserProfile").objects.update(
+        followers_count=count_by(Follow.objects, "author"),
+        following_count=count_by(Follow.objects, "user"),
+        posts_count=count_by(apps.get_model("posts", "Post").objects,
+                             "author"),
+        comments_count=count_by(apps.get_model("posts", "Comment").objects,
+                                "author"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0001_initial'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,11 @@
 from django.contrib.auth.models import User
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from .backend import invalidate_cached_user
+
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE,
@@ -10,13 +13,54 @@ class UserProfile(models.Model):
     avatar = models.ImageField(upload_to='users/', blank=True, null=True,
                                default='users/default.jpg')
 
+    # Denormalized counters, kept up to date by 'posts' signals and
+    # rebuilt by 'rebuild_user_stats' management command.
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    posts_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+
+    # Posts of the user are merged into follow feeds at read time instead
+    # of being fanned out to timelines, see 'posts.models.TimelineManager'.
+    timeline_merged = models.BooleanField(default=False)
+
+
+def update_user_stats(user_id, field, delta):
+    """
+    Atomically shift 'field' counter of the user's profile by 'delta'
+    without letting it drop below zero.
+    """
+    profiles = UserProfile.objects.filter(user_id=user_id)
+    if delta < 0:
+        profiles = profiles.filter(**{f"{field}__gte": -delta})
+    profiles.update(**{field: F(field) + delta})
+
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
-    if created:
+    """
+    Insert the profile of a new user. A profile assigned to the user
+    before saving, like the one with an avatar from the signup form, is
+    inserted as is. Saving a user never writes the profile, it is saved
+    on its own when its fields change.
+    """
+    if not created:
+        return
+    if User.profile.related.is_cached(instance):
+        profile = instance.profile
+        profile.user = instance
+        profile.save(force_insert=True)
+    else:
         UserProfile.objects.create(user=instance)
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.user_id)
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from common_lib.benchmark import QueryCounter
+from users.backend import ModelBackendUserWithProfile, user_cache_key
+
+User = get_user_model()
+
+
+class ModelBackendUserWithProfileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.backend = ModelBackendUserWithProfile()
+        self.user = User.objects.create_user(username='TestUser')
+
+    def test_user_with_profile_cached(self):
+        with self.assertNumQueries(1):
+            self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            self.assertEqual(user, self.user)
+            self.assertEqual(user.profile.avatar, 'users/default.jpg')
+
+    def test_saving_user_or_profile_invalidates(self):
+        self.backend.get_user(self.user.pk)
+        self.user.first_name = 'Иван'
+        self.user.save()
+        self.assertEqual(self.backend.get_user(self.user.pk).first_name,
+                         'Иван')
+
+        profile = self.user.profile
+        profile.avatar = 'users/other.jpg'
+        profile.save()
+        self.assertEqual(self.backend.get_user(self.user.pk).profile.avatar,
+                         'users/other.jpg')
+
+    def test_deactivated_user_rejected_right_away(self):
+        self.backend.get_user(self.user.pk)
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    def test_deleted_user_not_returned(self):
+        self.backend.get_user(self.user.pk)
+        user_id = self.user.pk
+        self.user.delete()
+        self.assertIsNone(self.backend.get_user(user_id))
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=0)
+    def test_cache_disabled(self):
+        self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(1):
+            self.backend.get_user(self.user.pk)
+
+    def test_logged_in_page_saves_a_query(self):
+        client = Client()
+        client.force_login(self.user)
+        link = reverse('about:author')
+        client.get(link)
+
+        def count_queries():
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                client.get(link)
+            return len(counter.queries)
+
+        cache.delete(user_cache_key(self.user.pk))
+        uncached = count_queries()
+        self.assertEqual(count_queries(), uncached - 1)
@@ -0,0 +1,24 @@
+from django.test import TestCase
+
+from users.forms import CreationForm
+
+
+class CreationFormTests(TestCase):
+    def form(self, username):
+        return CreationForm(data={
+            'username': username,
+            'password1': 'Tr0ub4dor&3x',
+            'password2': 'Tr0ub4dor&3x',
+        })
+
+    def test_username_of_site_page_rejected(self):
+        for username in ('search', 'events', 'new', 'follow'):
+            with self.subTest(username=username):
+                form = self.form(username)
+                self.assertFalse(form.is_valid())
+                self.assertIn('username', form.errors)
+
+    def test_username_with_free_profile_address_accepted(self):
+        for username in ('searcher', 'group', 'Search'):
+            with self.subTest(username=username):
+                self.assertTrue(self.form(username).is_valid())
@@ -0,0 +1,43 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class ProfileCountersMigrationTest(TransactionTestCase):
+    before = [('posts', '0001_initial'), ('users', '0001_initial')]
+    after = [('users', '0002_profile_counters')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_counters_filled_from_existing_rows(self):
+        apps = self.migrate(self.before)
+        User = apps.get_model('auth', 'User')
+        Profile = apps.get_model('users', 'UserProfile')
+        Post = apps.get_model('posts', 'Post')
+        author = User.objects.create(username='Author')
+        reader = User.objects.create(username='Reader')
+        for user in (author, reader):
+            Profile.objects.create(user=user)
+        post = Post.objects.create(text='Текст поста', author=author)
+        apps.get_model('posts', 'Comment').objects.create(
+            text='Комментарий', post=post, author=reader
+        )
+        apps.get_model('posts', 'Follow').objects.create(user=reader,
+                                                         author=author)
+
+        apps = self.migrate(self.after)
+
+        self.assertEqual(
+            list(apps.get_model('users', 'UserProfile').objects
+                     .order_by('user__username')
+                     .values_list('followers_count', 'following_count',
+                                  'posts_count', 'comments_count')),
+            [(1, 0, 1, 0), (0, 1, 0, 1)]
+        )
@@ -0,0 +1,93 @@
+import re
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from common_lib.benchmark import QueryCounter
+from users.models import UserProfile
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+WRITE_RE = re.compile(r'^\s*(INSERT INTO|UPDATE|DELETE FROM) "(\w+)"')
+
+
+class UserWritesTests(TestCase):
+    """ Writes of users and profiles tables on signup and login. """
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = self.settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def user_writes(self, method, link, data):
+        """ Return '(statement, table)' writes to users and profiles. """
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = method(link, data)
+        self.assertEqual(response.status_code, 302)
+        writes = [WRITE_RE.match(sql) for sql in counter.queries]
+        return [
+            match.groups() for match in writes
+            if match and match.group(2) in (User._meta.db_table,
+                                            UserProfile._meta.db_table)
+        ]
+
+    def signup_data(self, **extra):
+        return {
+            'first_name': 'Иван',
+            'last_name': 'Иванов',
+            'username': 'NewUser',
+            'email': 'new@test.ru',
+            'password1': 'Tr0ub4dor&3x',
+            'password2': 'Tr0ub4dor&3x',
+            **extra,
+        }
+
+    def test_signup_inserts_user_and_profile_once(self):
+        writes = self.user_writes(self.client.post, reverse('signup'),
+                                  self.signup_data())
+
+        self.assertEqual(writes, [('INSERT INTO', User._meta.db_table),
+                                  ('INSERT INTO', UserProfile._meta.db_table)])
+        profile = UserProfile.objects.get(user__username='NewUser')
+        self.assertEqual(profile.avatar, 'users/default.jpg')
+
+    def test_signup_with_avatar_inserts_profile_with_it(self):
+        avatar = SimpleUploadedFile('avatar.gif', SMALL_GIF,
+                                    content_type='image/gif')
+        writes = self.user_writes(self.client.post, reverse('signup'),
+                                  self.signup_data(avatar=avatar))
+
+        self.assertEqual(writes, [('INSERT INTO', User._meta.db_table),
+                                  ('INSERT INTO', UserProfile._meta.db_table)])
+        profile = UserProfile.objects.get(user__username='NewUser')
+        self.assertEqual(profile.avatar, 'users/avatar.webp')
+
+    def test_login_updates_last_login_only(self):
+        User.objects.create_user(username='TestUser', password='secret')
+
+        writes = self.user_writes(self.client.post, reverse('login'),
+                                  {'username': 'TestUser',
+                                   'password': 'secret'})
+
+        self.assertEqual(writes, [('UPDATE', User._meta.db_table)])
+        self.assertIsNotNone(User.objects.get(username='TestUser').last_login)
@@ -0,0 +1,40 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no ASGI handler, the WSGI application is run in a thread pool
+by :class:'common_lib.asgi.WsgiToAsgi' and only the event stream of
+'posts.events' is served by coroutines, run it with an ASGI server:
+
+    uvicorn yatube.asgi:application
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+django_application = get_wsgi_application()
+
+from django.urls import reverse  # noqa: E402 needs configured settings
+
+from common_lib.asgi import WsgiToAsgi, lifespan  # noqa: E402
+from common_lib.warmup import warm_templates  # noqa: E402
+from posts.events import event_stream  # noqa: E402
+
+warm_templates()
+
+wsgi_application = WsgiToAsgi(django_application)
+EVENTS_PATH = reverse('events')
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    elif scope['type'] != 'http':
+        raise ValueError(f"Unsupported connection type '{scope['type']}'")
+    elif scope['path'] == EVENTS_PATH:
+        await event_stream(scope, receive, send)
+    else:
+        await wsgi_application(scope, receive, send)
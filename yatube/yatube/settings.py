@@ -57,6 +57,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'common_lib.middleware.RequestTimingMiddleware',
+    'common_lib.routers.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -106,6 +108,26 @@ DATABASES = {
     }
 }
 
+# Reads go to a random replica alias, writes and reads of a client for
+# REPLICA_PIN_SECONDS after its write go to 'default'
+
+DATABASE_ROUTERS = ['common_lib.routers.PrimaryReplicaRouter']
+
+DATABASE_REPLICAS = []
+
+REPLICA_PIN_SECONDS = 5
+
+# PRAGMA statements run on every new SQLite connection
+
+SQLITE_PRAGMAS = {}
+
+# Write views run in 'BEGIN IMMEDIATE' transactions retried on 'database
+# is locked', sleeping up to BACKOFF * 2 ** attempt seconds before each
+# retry; 0 retries leave the views in autocommit mode
+
+DATABASE_LOCKED_RETRIES = 5
+DATABASE_LOCKED_BACKOFF = 0.02
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -172,6 +194,28 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 PAGINATOR_PAGE_SIZE = 10
 
+# Paginate feeds by '(pub_date, id)' cursor instead of page numbers
+
+PAGINATOR_CURSOR_MODE = False
+
+# Posts counts of page number links are cached until a post of the feed
+# is created or deleted, counts of follow feeds for a short time only.
+# With a limit, the whole index of a larger table is estimated instead
+# of counted
+
+PAGINATOR_FOLLOW_COUNT_TIMEOUT = 60
+
+PAGINATOR_ESTIMATE_ABOVE = None
+
+# Number of latest comments shown under a post in feeds
+
+COMMENTS_PREVIEW_SIZE = 3
+
+# Posts of authors with more followers are not fanned out to follow feeds
+# on write but merged into them at read time
+
+TIMELINE_FANOUT_LIMIT = 1000
+
 # Cache
 
 CACHES = {
@@ -179,3 +223,56 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+# Authenticated user with profile, loaded on every request, saving either
+# of them invalidates the entry
+
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Feed fragments are invalidated by generation counters, the timeout only
+# bounds the lifetime of unused entries
+
+POSTS_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Whole pages for anonymous users, invalidated by the same counters
+
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Uploaded images are checked by file size, format and pixel count, then
+# re-encoded to WebP with the longest edge capped, see 'common_lib.images'
+
+IMAGE_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+
+IMAGE_UPLOAD_MAX_PIXELS = 50 * 10 ** 6
+
+IMAGE_UPLOAD_FORMATS = ("JPEG", "PNG", "GIF", "WEBP")
+
+IMAGE_UPLOAD_MAX_EDGE = 1920
+
+IMAGE_UPLOAD_QUALITY = 82
+
+AVATAR_MAX_EDGE = 512
+
+# Thumbnails generated in background when a post image is saved,
+# 0 workers generate them inline
+
+POST_THUMBNAIL_GEOMETRIES = (
+    ("960x339", {"crop": "center", "upscale": True}),
+)
+
+THUMBNAIL_WORKERS = 2
+
+# Request timings: 'Server-Timing' header, JSON lines are logged
+# to 'common_lib.timing' logger
+
+REQUEST_TIMING_HEADER = True
+
+# Live updates over server-sent events, see 'yatube/asgi.py'. The broker
+# delivers events within one process, a shared one is needed to run
+# several processes
+
+EVENTS_BROKER = 'common_lib.pubsub.InProcessBroker'
+
+EVENTS_KEEPALIVE_SECONDS = 15
+
+EVENTS_QUEUE_SIZE = 100
@@ -0,0 +1,105 @@
+"""
+Production settings for yatube project.
+
+Extends 'yatube.settings', select with
+DJANGO_SETTINGS_MODULE=yatube.settings_production.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import (BASE_DIR, DATABASES, INSTALLED_APPS, MIDDLEWARE,
+                       TEMPLATES, os)
+
+DEBUG = False
+
+# Requests come through nginx on the server address only
+ALLOWED_HOSTS = [
+    "178.154.254.253",
+    "localhost",
+    "127.0.0.1",
+]
+
+# Database
+# Persistent connections; WAL lets readers go on while a comment or
+# a follow is written, NORMAL sync is durable enough with WAL
+
+DATABASES = {
+    **DATABASES,
+    'default': {
+        **DATABASES['default'],
+        'CONN_MAX_AGE': 60,
+    },
+}
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # in KiB when negative
+    'temp_store': 'MEMORY',
+}
+
+# Templates
+# Compiled once per process, 'yatube/wsgi.py' and 'yatube/asgi.py' compile
+# all of them on startup with 'common_lib.warmup.warm_templates'
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('django.template.loaders.cached.Loader',
+                 TEMPLATES[0]['OPTIONS']['loaders']),
+            ],
+        },
+    },
+]
+
+# Pagination
+# The index of a large table is not counted on every new post
+
+PAGINATOR_ESTIMATE_ABOVE = 100000
+
+# Cache
+# Per-process LRU in front of a SQLite file shared by all workers
+
+CACHES = {
+    'default': {
+        'BACKEND': 'common_lib.cache_backends.TwoTierCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 1,
+        },
+    }
+}
+
+# Profiling
+# debug_toolbar is for development only, its urls are added under DEBUG
+# only, request timings stay on
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'debug_toolbar']
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if not middleware.startswith('debug_toolbar.')
+]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'common_lib.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
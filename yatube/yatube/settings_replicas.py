@@ -0,0 +1,26 @@
+"""
+Settings of yatube project with local read replicas.
+
+Extends 'yatube.settings' with two SQLite files standing in for replicas
+of 'db.sqlite3', select with DJANGO_SETTINGS_MODULE=yatube.settings_replicas.
+Replicas are refreshed from the primary by 'sync_replicas' management
+command, '--interval' keeps doing it to imitate replication lag.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES, os
+
+DATABASE_REPLICAS = ['replica_1', 'replica_2']
+
+DATABASES = {
+    **DATABASES,
+    **{
+        alias: {
+            **DATABASES['default'],
+            'NAME': os.path.join(BASE_DIR, f'db_{alias}.sqlite3'),
+            # tests run against the primary only
+            'TEST': {'MIRROR': 'default'},
+        }
+        for alias in DATABASE_REPLICAS
+    },
+}